@@ -0,0 +1,246 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.timing import record_stage
+
+INTERACTIVE = "interactive"
+GENERATION = "generation"
+INGESTION = "ingestion"
+
+# (method, path prefix) -> class of work; unlisted requests are not limited
+ROUTE_CLASSES: List[Tuple[str, str, str]] = [
+    ("POST", "/tutor/ask", INTERACTIVE),
+    ("POST", "/tutor/end-session", INTERACTIVE),
+    ("POST", "/generate-quiz/", GENERATION),
+    ("POST", "/flash-card/", GENERATION),
+    ("POST", "/tutor/upload-knowledge", INGESTION),
+    ("POST", "/tutor/reembed", INGESTION),
+]
+
+# Concurrent requests, queued requests (and per user) and seconds a request may
+# wait for a slot; override with ADMISSION_LIMITS, e.g. '{"ingestion": {"concurrency": 4}}'
+DEFAULT_LIMITS: Dict[str, dict] = {
+    INTERACTIVE: {"concurrency": 32, "queue": 256, "user_queue": 8, "timeout": 10.0},
+    GENERATION: {"concurrency": 8, "queue": 32, "user_queue": 4, "timeout": 30.0},
+    INGESTION: {"concurrency": 2, "queue": 8, "user_queue": 2, "timeout": 60.0},
+}
+
+# Client addresses (e.g. the frontend server or a reverse proxy) whose X-User-ID
+# header is believed; comma-separated in ADMISSION_TRUSTED_PROXIES
+TRUSTED_PROXIES = frozenset(
+    address.strip() for address in os.environ.get("ADMISSION_TRUSTED_PROXIES", "").split(",") if address.strip()
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionClass:
+    """Concurrency limit with a bounded, per-user fair queue for one class of work.
+
+    Waiting requests are grouped by user and granted slots round-robin across
+    users, so one client's burst queues behind its own requests instead of
+    everyone else's. Requests beyond the queue bounds are rejected at once
+    (429); requests that wait longer than ``timeout`` are dropped (503).
+    Lives on the event loop; not thread-safe.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, user_queue: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue
+        self.user_queue = user_queue
+        self.timeout = timeout
+        self.active = 0
+        self.queued = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        # Running mean of how long an admitted request holds its slot
+        self._service_s = 1.0
+
+    async def acquire(self, user: str) -> float:
+        """Wait for a slot and return the milliseconds spent queued."""
+        if self.active < self.concurrency and not self.queued:
+            self.active += 1
+            self._admitted(0.0)
+            return 0.0
+        waiting = self._waiters.get(user)
+        if self.queued >= self.queue_size or (waiting and len(waiting) >= self.user_queue):
+            self.stats["rejected"] += 1
+            raise AdmissionRejected(429, f"Too many {self.name} requests queued", self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user, deque()).append(future)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            if not self._withdraw(user, future):
+                # Granted just as the deadline passed; the slot is ours
+                return self._admitted((time.perf_counter() - start) * 1000)
+            self.stats["timed_out"] += 1
+            raise AdmissionRejected(503, f"Timed out waiting for a {self.name} slot", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if not self._withdraw(user, future):
+                self.release(0.0)
+            raise
+        return self._admitted((time.perf_counter() - start) * 1000)
+
+    def release(self, held_s: float) -> None:
+        """Free a slot, handing it straight to the next user in round-robin order."""
+        if held_s:
+            self._service_s += 0.1 * (held_s - self._service_s)
+        while self._waiters:
+            user, waiting = next(iter(self._waiters.items()))
+            future = waiting.popleft()
+            self.queued -= 1
+            if waiting:
+                self._waiters.move_to_end(user)
+            else:
+                del self._waiters[user]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = (self.queued + self.active) / max(1, self.concurrency)
+        return max(1, min(60, math.ceil(backlog * self._service_s)))
+
+    def get_stats(self) -> dict:
+        admitted = self.stats["admitted"]
+        return {
+            **self.stats,
+            "active": self.active,
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "mean_wait_ms": round(self._wait_total_ms / admitted, 3) if admitted else 0.0,
+            "max_wait_ms": round(self._wait_max_ms, 3),
+        }
+
+    def _admitted(self, waited_ms: float) -> float:
+        self.stats["admitted"] += 1
+        self._wait_total_ms += waited_ms
+        self._wait_max_ms = max(self._wait_max_ms, waited_ms)
+        return waited_ms
+
+    def _withdraw(self, user: str, future: asyncio.Future) -> bool:
+        """Remove a still-queued waiter; False if it was already granted a slot."""
+        waiting = self._waiters.get(user)
+        if waiting is None or future not in waiting:
+            return False
+        waiting.remove(future)
+        self.queued -= 1
+        if not waiting:
+            del self._waiters[user]
+        return True
+
+
+def _limits_from_env() -> Dict[str, dict]:
+    limits = {name: dict(values) for name, values in DEFAULT_LIMITS.items()}
+    raw = os.environ.get("ADMISSION_LIMITS")
+    if not raw:
+        return limits
+    try:
+        for name, values in json.loads(raw).items():
+            if name not in limits:
+                raise KeyError(name)
+            limits[name].update({key: type(limits[name][key])(value) for key, value in values.items()})
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring invalid ADMISSION_LIMITS: {e}")
+        return {name: dict(values) for name, values in DEFAULT_LIMITS.items()}
+    return limits
+
+
+_classes: Dict[str, AdmissionClass] = {
+    name: AdmissionClass(name, **values) for name, values in _limits_from_env().items()
+}
+
+
+def get_admission_stats() -> Dict[str, dict]:
+    return {name: admission.get_stats() for name, admission in _classes.items()}
+
+
+def classify_request(method: str, path: str) -> Optional[str]:
+    for route_method, prefix, name in ROUTE_CLASSES:
+        if method == route_method and path.startswith(prefix):
+            return name
+    return None
+
+
+def _user_key(scope, trusted_proxies=TRUSTED_PROXIES) -> str:
+    """Who a request counts against: the client address.
+
+    Any client can put anything in X-User-ID, so the header only tells apart
+    users behind a trusted proxy, which forwards it for everyone sharing its address.
+    """
+    client = scope.get("client")
+    address = client[0] if client else ""
+    if address in trusted_proxies:
+        for name, value in scope.get("headers", []):
+            if name == b"x-user-id" and value:
+                return "user:" + value.decode("latin-1")
+    return "addr:" + address
+
+
+class AdmissionMiddleware:
+    """Admit expensive requests per class of work (interactive, generation, ingestion).
+
+    Each class has its own concurrency limit and bounded per-user fair queue,
+    so an upload storm queues (or is turned away with ``Retry-After``) without
+    taking slots, threads or API quota from tutor questions. The time spent
+    queued is recorded as the ``admission_wait`` stage.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = classify_request(scope.get("method", ""), scope.get("path", "")) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        admission = _classes[name]
+        try:
+            waited_ms = await admission.acquire(_user_key(scope))
+        except AdmissionRejected as e:
+            await _reject(send, e)
+            return
+        record_stage("admission_wait", waited_ms)
+        start = time.perf_counter()
+        try:
+            # Held until the response, including a streamed body, is fully sent
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(time.perf_counter() - start)
+
+
+async def _reject(send, rejected: AdmissionRejected) -> None:
+    body = orjson.dumps({"detail": rejected.detail})
+    await send({
+        "type": "http.response.start",
+        "status": rejected.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(rejected.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -4,4 +4,75 @@ class Settings:
     PROJECT_NAME: str = "FastAPI Base Project"
     VERSION: str = "0.1.0"
 
+    # Vector store backend: "pinecone" (default) or "local" (in-process index)
+    VECTOR_BACKEND: str = os.environ.get("VECTOR_BACKEND", "pinecone")
+    # Embedding model for new knowledge-base indexes; switching it requires a re-embedding run
+    EMBED_MODEL: str = os.environ.get("EMBED_MODEL", "text-embedding-3-small")
+    # Vector dimension; 0 uses the model's native size (text-embedding-3 models can shorten)
+    EMBED_DIMENSION: int = int(os.environ.get("EMBED_DIMENSION", "0"))
+    # Where new serverless Pinecone indexes are created
+    PINECONE_CLOUD: str = os.environ.get("PINECONE_CLOUD", "aws")
+    PINECONE_REGION: str = os.environ.get("PINECONE_REGION", "us-east-1")
+    # Directory used to persist the local index; empty keeps it in memory only
+    LOCAL_INDEX_DIR: str = os.environ.get("LOCAL_INDEX_DIR", "")
+    # Local index vector storage: "none" (float32), "int8" or "binary" codes with exact rescoring
+    LOCAL_INDEX_QUANTIZATION: str = os.environ.get("LOCAL_INDEX_QUANTIZATION", "none")
+    # Candidates rescored per requested result; 0 picks a default for the quantization
+    LOCAL_INDEX_RESCORE_FACTOR: int = int(os.environ.get("LOCAL_INDEX_RESCORE_FACTOR", "0"))
+    # Directory of the memory-mapped chunk text cache
+    CHUNK_STORE_DIR: str = os.environ.get("CHUNK_STORE_DIR", ".chunk_store")
+    # SQLite file holding session summaries and document records
+    METADATA_DB_PATH: str = os.environ.get("METADATA_DB_PATH", ".metadata.db")
+    # Seconds a vector index health check result is reused
+    HEALTH_CHECK_TTL: float = float(os.environ.get("HEALTH_CHECK_TTL", "30"))
+    # Seconds between checks for an index version activated by another process (e.g. the re-embedding CLI)
+    INDEX_VERSION_TTL: float = float(os.environ.get("INDEX_VERSION_TTL", "30"))
+    # Query embeddings wait up to this long to share one API call; 0 disables batching
+    EMBED_BATCH_WINDOW_MS: float = float(os.environ.get("EMBED_BATCH_WINDOW_MS", "2"))
+    # A batched call carries at most this many inputs
+    EMBED_BATCH_MAX_INPUTS: int = int(os.environ.get("EMBED_BATCH_MAX_INPUTS", "64"))
+    # Cached centroids for the local medical-question gate
+    MEDICAL_GATE_CACHE: str = os.environ.get("MEDICAL_GATE_CACHE", ".medical_gate.json")
+    # Scores closer than this to the boundary are left to the answer prompt
+    MEDICAL_GATE_MARGIN: float = float(os.environ.get("MEDICAL_GATE_MARGIN", "0.02"))
+    # Returning-user profiles (recent summaries, topics) kept in memory
+    USER_PROFILE_CACHE_SIZE: int = int(os.environ.get("USER_PROFILE_CACHE_SIZE", "1024"))
+    # Token budget for verbatim recent turns; older turns are folded into a summary
+    CONVERSATION_RECENT_TOKENS: int = int(os.environ.get("CONVERSATION_RECENT_TOKENS", "800"))
+    # Parallel per-chunk generation calls for flash cards from uploads
+    FLASHCARD_CONCURRENCY: int = int(os.environ.get("FLASHCARD_CONCURRENCY", "4"))
+    # Polled JSON responses smaller than this are sent uncompressed
+    HTTP_COMPRESSION_MIN_BYTES: int = int(os.environ.get("HTTP_COMPRESSION_MIN_BYTES", "1024"))
+    # Serialized quiz/history responses kept for ETag revalidation
+    RESPONSE_CACHE_SIZE: int = int(os.environ.get("RESPONSE_CACHE_SIZE", "1024"))
+    # OCR for scanned pages and images; only used when pytesseract and tesseract are installed
+    OCR_ENABLED: bool = os.environ.get("OCR_ENABLED", "1").lower() not in ("0", "false", "no")
+    OCR_WORKERS: int = int(os.environ.get("OCR_WORKERS", "2"))
+    OCR_LANG: str = os.environ.get("OCR_LANG", "eng")
+    OCR_CACHE_DIR: str = os.environ.get("OCR_CACHE_DIR", ".ocr_cache")
+    # Uploaded documents whose /generate-quiz/ indexes stay in memory for reuse
+    QUIZ_DOCUMENT_CACHE_SIZE: int = int(os.environ.get("QUIZ_DOCUMENT_CACHE_SIZE", "64"))
+    # Lecture video transcription; only used when ffmpeg and faster-whisper are installed
+    TRANSCRIBE_ENABLED: bool = os.environ.get("TRANSCRIBE_ENABLED", "1").lower() not in ("0", "false", "no")
+    TRANSCRIBE_WORKERS: int = int(os.environ.get("TRANSCRIBE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+    WHISPER_MODEL: str = os.environ.get("WHISPER_MODEL", "base.en")
+    WHISPER_COMPUTE_TYPE: str = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
+    WHISPER_CPU_THREADS: int = int(os.environ.get("WHISPER_CPU_THREADS", "2"))
+    WHISPER_LANGUAGE: str = os.environ.get("WHISPER_LANGUAGE", "")
+    # Memory the transcription workers may use together; fewer workers are started if their models don't fit.
+    # 0 allows half of the physical memory
+    TRANSCRIBE_MEMORY_MB: int = int(os.environ.get("TRANSCRIBE_MEMORY_MB", "0"))
+    # Generated quizzes: SQLite file, quizzes kept in memory and idle seconds before one is dropped
+    QUIZ_DB_PATH: str = os.environ.get("QUIZ_DB_PATH", ".quizzes.db")
+    QUIZ_CACHE_SIZE: int = int(os.environ.get("QUIZ_CACHE_SIZE", "512"))
+    QUIZ_CACHE_TTL: float = float(os.environ.get("QUIZ_CACHE_TTL", "3600"))
+    # SQLite file of cached completions for call sites that opt in; empty disables the cache
+    COMPLETION_CACHE_PATH: str = os.environ.get("COMPLETION_CACHE_PATH", ".completion_cache.db")
+    COMPLETION_CACHE_MAX_MB: float = float(os.environ.get("COMPLETION_CACHE_MAX_MB", "64"))
+    # Tutor sessions kept in memory, and seconds an idle one is kept before it is dropped unsummarized
+    TUTOR_SESSION_CACHE_SIZE: int = int(os.environ.get("TUTOR_SESSION_CACHE_SIZE", "10000"))
+    TUTOR_SESSION_TTL: float = float(os.environ.get("TUTOR_SESSION_TTL", "86400"))
+    # Shared secret for maintenance endpoints (X-Admin-Token header); empty disables them
+    ADMIN_TOKEN: str = os.environ.get("ADMIN_TOKEN", "")
+
 settings = Settings()
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import orjson
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Content codings we can produce, in order of preference at equal q
+_ENCODERS = {
+    "br": lambda body: brotli.compress(body, quality=5),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+}
+_ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+class CachedJSON:
+    """One revision of a stored object, serialized once with orjson.
+
+    The strong ETag is a hash of the JSON bytes. Compressed bodies are built
+    on first request per coding and kept, each with its own ETag variant.
+    """
+
+    __slots__ = ("revision", "body", "etag", "_encoded", "_lock")
+
+    def __init__(self, payload, revision: Hashable = None):
+        self.revision = revision
+        self.body = orjson.dumps(payload)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, coding: str) -> bytes:
+        body = self._encoded.get(coding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(coding)
+                if body is None:
+                    body = self._encoded[coding] = _ENCODERS[coding](self.body)
+        return body
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Weak comparison against an If-None-Match header, as RFC 9110 requires."""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            tag = tag.removeprefix("W/").strip('"')
+            for suffix in _ETAG_SUFFIXES.values():
+                tag = tag.removesuffix(suffix)
+            if tag == self.etag:
+                return True
+        return False
+
+
+class ResponseCache:
+    """LRU of serialized representations keyed by object, valid for one revision."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, CachedJSON]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, revision: Hashable, build: Callable[[], object]) -> CachedJSON:
+        """Return the cached representation of ``key`` at ``revision``, serializing on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.revision == revision:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        return self.put(key, revision, build())
+
+    def put(self, key: Hashable, revision: Hashable, payload) -> CachedJSON:
+        entry = CachedJSON(payload, revision)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values."""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        candidates = [coding] if coding in _ENCODERS else list(_ENCODERS) if coding == "*" else []
+        for candidate in candidates:
+            if candidate == "br" and brotli is None:
+                continue
+            if q > best_q:
+                best, best_q = candidate, q
+    return best
+
+
+def cached_json_response(request: Request, entry: CachedJSON) -> Response:
+    """Serve ``entry`` with a strong ETag, a 304 on a match and compression above the threshold."""
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    coding = None
+    if len(entry.body) >= settings.HTTP_COMPRESSION_MIN_BYTES:
+        coding = _choose_encoding(request.headers.get("accept-encoding", ""))
+    headers["ETag"] = f'"{entry.etag}{_ETAG_SUFFIXES.get(coding, "")}"'
+    if entry.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if coding is None:
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = coding
+    return Response(content=entry.encoded(coding), media_type="application/json", headers=headers)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+        return _response_cache
@@ -0,0 +1,92 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Per-request stage durations in milliseconds, set up by whoever serves the request
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+class _StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+_stats: Dict[str, _StageStats] = {}
+_stats_lock = threading.Lock()
+
+
+def record_stage(name: str, elapsed_ms: float) -> None:
+    """Add a stage duration to the process totals and to the current request, if any."""
+    with _stats_lock:
+        _stats.setdefault(name, _StageStats()).add(elapsed_ms)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + elapsed_ms
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block of work as the named stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, (time.perf_counter() - start) * 1000)
+
+
+def begin_request() -> Dict[str, float]:
+    """Start collecting stage durations for the current request context."""
+    stages: Dict[str, float] = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def get_stage_stats() -> Dict[str, dict]:
+    with _stats_lock:
+        return {
+            name: {
+                "count": s.count,
+                "total_ms": round(s.total_ms, 3),
+                "mean_ms": round(s.total_ms / s.count, 3) if s.count else 0.0,
+                "max_ms": round(s.max_ms, 3),
+            }
+            for name, s in _stats.items()
+        }
+
+
+class ServerTimingMiddleware:
+    """Collect each request's stages and report them in a ``Server-Timing`` header.
+
+    ``app`` is the time from receiving the request to starting the response.
+    Sync endpoints run in a copy of the request context, so stages they record
+    land in the same per-request dict.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stages = begin_request()
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                entries = [f"{name};dur={ms:.1f}" for name, ms in stages.items()]
+                entries.append(f"app;dur={(time.perf_counter() - start) * 1000:.1f}")
+                headers = list(message.get("headers", [])) + [(b"server-timing", ", ".join(entries).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
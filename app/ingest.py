@@ -0,0 +1,260 @@
+"""Bulk offline ingestion of a directory into the tutor knowledge base.
+
+    python -m app.ingest path/to/corpus [--workers 8] [--embed-workers 2]
+
+Files are deduplicated by content hash, extracted in a process pool with
+``file_processing.extract_text`` (PDFs are chunked there too, page by page),
+chunked by the RAG pipeline otherwise, and embedded and upserted in large
+batches. Finished files are appended to a checkpoint file,
+so an interrupted run resumes where it stopped.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.services.file_processing import extract_pdf_chunks, extract_text
+from app.services import ocr, transcription
+from app.services.openai_governor import estimate_tokens
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".csv": "text/csv",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+}
+# Checkpoint statuses that mean a file never needs another look
+DONE_STATUSES = {"ingested", "duplicate", "empty"}
+
+
+def discover(root: str) -> List[Tuple[str, str]]:
+    """Return (path, content_type) for every supported file under ``root``."""
+    files = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            content_type = CONTENT_TYPES.get(os.path.splitext(filename)[1].lower())
+            if content_type:
+                files.append((os.path.join(directory, filename), content_type))
+    return files
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _init_worker() -> None:
+    ocr.run_inline()
+    transcription.run_inline()
+
+
+def _extract(path: str, content_type: str) -> dict:
+    """Worker-process side: extract one file's text and count its pages.
+
+    PDFs are also chunked here, page by page as the pages are read.
+    """
+    try:
+        if content_type == "application/pdf":
+            text, chunks, pages = extract_pdf_chunks(path)
+            return {"text": text, "chunks": chunks, "pages": pages, "error": None}
+        return {"text": extract_text(path, content_type), "chunks": None, "pages": 1, "error": None}
+    except Exception as e:
+        return {"text": "", "chunks": None, "pages": 0, "error": str(e)}
+
+
+class Checkpoint:
+    """Append-only JSON-lines record of files already handled."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted run
+                    if entry.get("status") in DONE_STATUSES:
+                        self.done[entry["hash"]] = entry
+        self._file = open(path, "a")
+
+    def record(self, digest: str, path: str, status: str, **extra) -> None:
+        entry = {"hash": digest, "path": path, "status": status, **extra}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if status in DONE_STATUSES:
+            self.done[digest] = entry
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class IngestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.files = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.pages = 0
+        self.chunks = 0
+        self.tokens = 0
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (
+            f"Ingested {self.files} files ({self.skipped} already done, {self.duplicates} duplicates, "
+            f"{self.errors} errors) in {elapsed:.1f}s\n"
+            f"  pages:  {self.pages:>10}  {self.pages / elapsed:10.1f}/s\n"
+            f"  chunks: {self.chunks:>10}  {self.chunks / elapsed:10.1f}/s\n"
+            f"  tokens: {self.tokens:>10}  {self.tokens / elapsed:10.1f}/s"
+        )
+
+
+class Ingester:
+    """Feeds extracted documents to the RAG pipeline in large embed/upsert batches."""
+
+    def __init__(self, rag, root: str, checkpoint: Checkpoint, workers: int, embed_workers: int,
+                 flush_chunks: int, upsert_batch: int):
+        self._rag = rag
+        self._root = root
+        self._checkpoint = checkpoint
+        self.workers = workers
+        self.flush_chunks = flush_chunks
+        self.upsert_batch = upsert_batch
+        self.stats = IngestStats()
+        self._embed_pool = ThreadPoolExecutor(max_workers=embed_workers, thread_name_prefix="ingest-embed")
+        self._embed_slots = embed_workers
+        self._pending_flushes: deque = deque()
+        self._buffer: List[tuple] = []
+        self._buffered_chunks = 0
+        self._fingerprints = set()
+
+    def run(self) -> IngestStats:
+        files = self._unseen_files()
+        print(f"Extracting {len(files)} files with {self.workers} workers")
+        # Workers OCR and transcribe themselves rather than each starting pools of their own
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            # Keep a bounded number of extractions in flight so memory stays flat
+            in_flight: deque = deque()
+            for item in files:
+                in_flight.append((item, pool.submit(_extract, item[0], item[1])))
+                if len(in_flight) >= self.workers * 2:
+                    self._handle(*in_flight.popleft())
+            while in_flight:
+                self._handle(*in_flight.popleft())
+        self._flush()
+        while self._pending_flushes:
+            self._finish_flush(self._pending_flushes.popleft())
+        self._embed_pool.shutdown()
+        return self.stats
+
+    def _unseen_files(self) -> List[Tuple[str, str, str]]:
+        files, seen = [], set()
+        for path, content_type in discover(self._root):
+            digest = file_hash(path)
+            if digest in self._checkpoint.done:
+                self.stats.skipped += 1
+            elif digest in seen:
+                self.stats.duplicates += 1
+            else:
+                seen.add(digest)
+                files.append((path, content_type, digest))
+        return files
+
+    def _handle(self, item: Tuple[str, str, str], future) -> None:
+        path, _, digest = item
+        relative = os.path.relpath(path, self._root)
+        result = future.result()
+        if result["error"]:
+            print(f"Error extracting {relative}: {result['error']}")
+            self.stats.errors += 1
+            self._checkpoint.record(digest, relative, "error", error=result["error"])
+            return
+        text = result["text"].strip()
+        document = self._rag.prepare_document(
+            text, metadata={"source": relative}, chunks=result["chunks"]
+        ) if text else None
+        if document is None:
+            self._checkpoint.record(digest, relative, "empty")
+            return
+        if document.fingerprint in self._fingerprints or self._rag._metadata_store.has_fingerprint(
+                document.fingerprint, namespace=document.namespace):
+            self.stats.duplicates += 1
+            self._checkpoint.record(digest, relative, "duplicate")
+            return
+        self._fingerprints.add(document.fingerprint)
+        self._buffer.append((digest, relative, result["pages"], document))
+        self._buffered_chunks += len(document.chunks)
+        if self._buffered_chunks >= self.flush_chunks:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer, self._buffered_chunks = self._buffer, [], 0
+        if len(self._pending_flushes) >= self._embed_slots:
+            self._finish_flush(self._pending_flushes.popleft())
+        documents = [entry[3] for entry in batch]
+        future = self._embed_pool.submit(self._rag.upsert_documents, documents, self.upsert_batch)
+        self._pending_flushes.append((batch, future))
+
+    def _finish_flush(self, pending) -> None:
+        batch, future = pending
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error storing {len(batch)} documents: {e}")
+            self.stats.errors += len(batch)
+            for digest, relative, _, _ in batch:
+                self._checkpoint.record(digest, relative, "error", error=str(e))
+            return
+        for digest, relative, pages, document in batch:
+            self.stats.files += 1
+            self.stats.pages += pages
+            self.stats.chunks += len(document.chunks)
+            self.stats.tokens += sum(estimate_tokens(chunk) for chunk in document.chunks)
+            self._checkpoint.record(digest, relative, "ingested", chunks=len(document.chunks))
+        print(f"Stored {len(batch)} documents; {self.stats.files} files, {self.stats.chunks} chunks so far")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest a directory of documents into the tutor knowledge base.")
+    parser.add_argument("directory")
+    parser.add_argument("--index", default="medical", help="knowledge base index name")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="extraction processes")
+    parser.add_argument("--embed-workers", type=int, default=2, help="concurrent embed/upsert batches")
+    parser.add_argument("--flush-chunks", type=int, default=1000, help="chunks collected per embed/upsert batch")
+    parser.add_argument("--upsert-batch", type=int, default=200, help="vectors per upsert request")
+    parser.add_argument("--checkpoint", default=None,
+                        help="progress file (default: <directory>/.ingest_checkpoint.jsonl)")
+    args = parser.parse_args(argv)
+
+    from app.services.rag_pipeline_pinecone import RAGPipelinePinecone
+
+    root = os.path.abspath(args.directory)
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(root, ".ingest_checkpoint.jsonl"))
+    rag = RAGPipelinePinecone(index_name=args.index)
+    ingester = Ingester(rag, root, checkpoint, args.workers, args.embed_workers,
+                        args.flush_chunks, args.upsert_batch)
+    try:
+        stats = ingester.run()
+    finally:
+        checkpoint.close()
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
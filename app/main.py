@@ -11,6 +11,8 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 from app.routers import quiz, flashcard, tutor, tutor_upload
+from app.core.admission import AdmissionMiddleware, get_admission_stats
+from app.core.timing import ServerTimingMiddleware, get_stage_stats
 
 app = FastAPI(
     title="Medical Student Assistant",
@@ -18,6 +20,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Added first, so it runs inside ServerTimingMiddleware and its queue wait shows up in Server-Timing
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+
 app.include_router(quiz.router)
 app.include_router(flashcard.router)
 app.include_router(tutor.router)
@@ -31,6 +37,14 @@ def read_root():
 def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/metrics/stages")
+def stage_metrics():
+    return {"stages": get_stage_stats()}
+
+@app.get("/metrics/admission")
+def admission_metrics():
+    return {"classes": get_admission_stats()}
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
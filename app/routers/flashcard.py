@@ -10,16 +10,19 @@ router = APIRouter()
 # Flash card generation endpoint
 
 @router.post("/flash-card/", response_model=dict)
-async def generate_flash_card(
+def generate_flash_card(
     file: UploadFile = File(None),
     subject: str = None,
     chapter: str = None,
     topic: str = None,
-    num_cards: int = 10
+    num_cards: int = 10,
+    reuse_cached: bool = False
 ):
     """
     Generate flash cards as a list of dicts with keys 'Question' and 'Answer' (short answer max 5 words).
+    With ``reuse_cached`` an identical earlier request may get the same cards back.
     """
-    req = FlashCardRequest(subject=subject, chapter=chapter, topic=topic, num_cards=num_cards)
+    req = FlashCardRequest(subject=subject, chapter=chapter, topic=topic, num_cards=num_cards,
+                           reuse_cached=reuse_cached)
     flash_cards = handle_flashcard_generation(file=file, request=req)
     return {"flash_cards": flash_cards}
\ No newline at end of file
@@ -1,38 +1,32 @@
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import orjson
 import os
 import uuid
+from typing import Iterator, List
+from app.services.completion_cache import CACHE_REUSE
 from app.services.file_processing import extract_text
-from app.services.rag_pipeline import RAGPipeline
-from app.services.quiz_generation import generate_quiz_questions
+from app.services.document_index import get_document_index_cache
+from app.services.quiz_generation import generate_quiz_questions, stream_quiz_questions
+from app.services.quiz_store import StoredQuiz, get_quiz_repository
+from app.core.http_cache import cached_json_response, get_response_cache
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-QUIZ_STORE = {}
-_rag_pipeline: RAGPipeline | None = None
-
-def get_rag_pipeline() -> RAGPipeline:
-    global _rag_pipeline
-    if _rag_pipeline is None:
-        _rag_pipeline = RAGPipeline()
-    return _rag_pipeline
-
 router = APIRouter()
 
-@router.post("/generate-quiz/")
-async def generate_quiz(
-    files: list[UploadFile] = File(...),
-    query: str = Form(...),
-    num_questions: int = Form(5),
-    difficulty: str = Form("basic"),
-    qtype: str = Form("mcq")
-):
+async def _quiz_context(files: List[UploadFile], query: str) -> str:
+    """Index the uploaded files and return the context most relevant to ``query``."""
     # Keep lightweight types only to minimize memory usage on startup
     allowed_types = [
         "application/pdf", "text/csv"
     ]
     all_text = []
+    # Each upload gets its own in-memory index, so retrieval only scans this request's files
+    document_keys = []
     for file in files:
         if file.content_type not in allowed_types:
             raise HTTPException(status_code=400, detail=f"File type {file.content_type} not allowed.")
@@ -40,26 +34,101 @@ async def generate_quiz(
         file_location = os.path.join(UPLOAD_DIR, file_id + "_" + file.filename)
         with open(file_location, "wb") as f:
             f.write(await file.read())
-        text = extract_text(file_location, file.content_type)
-        get_rag_pipeline().add_document(text)
+        # Extraction and embedding block; keep them off the event loop
+        text = await run_in_threadpool(extract_text, file_location, file.content_type)
+        key = await run_in_threadpool(get_document_index_cache().add, text)
+        if key:
+            document_keys.append(key)
         all_text.append(text)
         try:
             os.remove(file_location)
         except Exception as e:
             print(f"Warning: Could not delete file {file_location}: {e}")
-    context_list = get_rag_pipeline().retrieve(query, top_k=5)
+    context_list = await run_in_threadpool(get_document_index_cache().retrieve, query, document_keys, 5)
     max_context_length = 3000
     context = "\n".join(context_list)
     if len(context) > max_context_length:
         context = context[:max_context_length]
-    questions = generate_quiz_questions(context, num_questions, difficulty, qtype)
+    return context
+
+@router.post("/generate-quiz/")
+async def generate_quiz(
+    files: list[UploadFile] = File(...),
+    query: str = Form(...),
+    num_questions: int = Form(5),
+    difficulty: str = Form("basic"),
+    qtype: str = Form("mcq"),
+    reuse_cached: bool = Form(False)
+):
+    """Generate a quiz; with ``reuse_cached`` an identical earlier request may get the same questions back."""
+    context = await _quiz_context(files, query)
+    cache = CACHE_REUSE if reuse_cached else None
+    questions = await run_in_threadpool(generate_quiz_questions, context, num_questions, difficulty, qtype, cache)
     quiz_id = str(uuid.uuid4())
-    QUIZ_STORE[quiz_id] = questions
+    quiz = get_quiz_repository().create(quiz_id, questions)
+    # Quizzes never change once stored; serialize the polled payload now
+    get_response_cache().put(("quiz", quiz_id), _quiz_revision(quiz), _quiz_payload(quiz))
     return {"quiz_id": quiz_id, "questions": questions}
 
+@router.post("/generate-quiz/stream")
+async def generate_quiz_stream(
+    files: list[UploadFile] = File(...),
+    query: str = Form(...),
+    num_questions: int = Form(5),
+    difficulty: str = Form("basic"),
+    qtype: str = Form("mcq")
+):
+    """Stream quiz questions as NDJSON, one line per question as soon as the model completes it.
+
+    The first line carries the ``quiz_id``; questions are stored as they
+    arrive, so ``GET /quiz/{quiz_id}`` already serves them while the rest are
+    generated. The last line is ``done`` or ``error``.
+    """
+    context = await _quiz_context(files, query)
+    quiz_id = str(uuid.uuid4())
+    return StreamingResponse(
+        _stream_quiz(quiz_id, context, num_questions, difficulty, qtype),
+        media_type="application/x-ndjson",
+    )
+
+def _stream_quiz(quiz_id: str, context: str, num_questions: int, difficulty: str, qtype: str) -> Iterator[bytes]:
+    repository = get_quiz_repository()
+    count = 0
+    # Created once the body is being sent, so a client gone before then leaves no quiz stuck generating
+    repository.create(quiz_id, [], generating=True)
+    try:
+        yield _ndjson({"type": "quiz", "quiz_id": quiz_id})
+        for question in stream_quiz_questions(context, num_questions, difficulty, qtype):
+            repository.append(quiz_id, question)
+            yield _ndjson({"type": "question", "index": count, "question": question})
+            count += 1
+        yield _ndjson({"type": "done", "quiz_id": quiz_id, "count": count})
+    except Exception as e:
+        print(f"Error streaming quiz {quiz_id}: {e}")
+        yield _ndjson({"type": "error", "detail": str(e), "count": count})
+    finally:
+        if count:
+            repository.finish(quiz_id)
+        else:
+            repository.delete(quiz_id)
+
+def _ndjson(obj) -> bytes:
+    return orjson.dumps(obj) + b"\n"
+
+def _quiz_revision(quiz: StoredQuiz):
+    return quiz.revision, quiz.generating
+
+def _quiz_payload(quiz: StoredQuiz) -> dict:
+    payload = {"quiz_id": quiz.quiz_id, "questions": list(quiz.questions)}
+    if quiz.generating:
+        payload["status"] = "generating"
+    return payload
+
 @router.get("/quiz/{quiz_id}")
-def get_quiz(quiz_id: str):
-    questions = QUIZ_STORE.get(quiz_id)
-    if not questions:
+def get_quiz(quiz_id: str, request: Request):
+    """Return a stored quiz; repeat polls revalidate with If-None-Match and get a 304."""
+    quiz = get_quiz_repository().get(quiz_id)
+    if quiz is None or not (quiz.questions or quiz.generating):
         raise HTTPException(status_code=404, detail="Quiz not found.")
-    return {"quiz_id": quiz_id, "questions": questions}
+    entry = get_response_cache().get(("quiz", quiz_id), _quiz_revision(quiz), lambda: _quiz_payload(quiz))
+    return cached_json_response(request, entry)
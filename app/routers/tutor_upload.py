@@ -1,14 +1,41 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from collections import OrderedDict
+from app.core.admin import require_admin
 from app.services.rag_pipeline_pinecone import RAGPipelinePinecone
-from app.services.file_processing import extract_text
+from app.services.file_processing import extract_pdf_chunks, extract_text
+from app.services.reembedding import start_reembedding
+from app.services.transcription import transcribe_video, transcript_chunks
 import os
+import threading
+import time
 import uuid
 
 router = APIRouter(prefix="/tutor", tags=["Medical AI Tutor"])
 rag_pipeline = RAGPipelinePinecone(index_name="medical")  # Match the index name in Pinecone
 
+VIDEO_TYPES = ["video/mp4", "video/quicktime"]
+# upload_id -> progress of recent uploads, oldest dropped first; written from the threadpool
+# and transcription callbacks, so every access holds the lock
+UPLOAD_PROGRESS = OrderedDict()
+MAX_TRACKED_UPLOADS = 1000
+_progress_lock = threading.Lock()
+
+def _report_progress(upload_id: str, stage: str, **fields):
+    with _progress_lock:
+        entry = UPLOAD_PROGRESS.setdefault(upload_id, {"upload_id": upload_id, "started_at": time.time()})
+        entry.update(stage=stage, updated_at=time.time(), **fields)
+        UPLOAD_PROGRESS.move_to_end(upload_id)
+        while len(UPLOAD_PROGRESS) > MAX_TRACKED_UPLOADS:
+            UPLOAD_PROGRESS.popitem(last=False)
+
 @router.post("/upload-knowledge")
-async def upload_knowledge_file(file: UploadFile = File(...)):
+def upload_knowledge_file(file: UploadFile = File(...), upload_id: str = None):
+    """Extract, chunk and index an uploaded file.
+
+    Declared sync so long transcriptions run in the threadpool; pass an
+    ``upload_id`` and poll ``/tutor/upload-progress/{upload_id}`` meanwhile.
+    """
+    upload_id = upload_id or str(uuid.uuid4())
     allowed_types = [
         "application/pdf", "text/csv",
         "image/jpeg", "image/png", "image/jpg",
@@ -20,11 +47,30 @@ async def upload_knowledge_file(file: UploadFile = File(...)):
     file_location = os.path.join(os.path.dirname(__file__), "../../uploads", file_id + "_" + file.filename)
     os.makedirs(os.path.dirname(file_location), exist_ok=True)
     with open(file_location, "wb") as f:
-        f.write(await file.read())
+        f.write(file.file.read())
     try:
         print(f"Extracting text from {file.filename}...")
-        text = extract_text(file_location, file.content_type)
+        _report_progress(upload_id, "extracting", filename=file.filename)
+        chunks = per_chunk_metadata = None
+        if file.content_type in VIDEO_TYPES:
+            segments = transcribe_video(
+                file_location,
+                progress=lambda done, total: _report_progress(
+                    upload_id, "transcribing", segments_done=done, segments_total=total
+                ),
+            )
+            # Timestamped chunks, so answers can point back into the lecture
+            chunks, per_chunk_metadata = transcript_chunks(segments)
+            text = "\n".join(chunks)
+        elif file.content_type == "application/pdf":
+            # Chunked page by page while later scanned pages are still being OCR'd
+            text, chunks, _ = extract_pdf_chunks(
+                file_location, progress=lambda pages: _report_progress(upload_id, "extracting", pages_done=pages)
+            )
+        else:
+            text = extract_text(file_location, file.content_type)
         if not text or not text.strip():
+            _report_progress(upload_id, "failed", error="No text could be extracted from the file")
             raise HTTPException(status_code=400, detail="No text could be extracted from the file")
         
         # Check if document already exists in the index
@@ -36,10 +82,12 @@ async def upload_knowledge_file(file: UploadFile = File(...)):
             except Exception as e:
                 print(f"Warning: Could not delete file {file_location}: {e}")
                 
+            _report_progress(upload_id, "complete", status="duplicate_document")
             return {
                 "message": "This document or very similar content already exists in the knowledge base.",
                 "status": "duplicate_document",
-                "filename": file.filename
+                "filename": file.filename,
+                "upload_id": upload_id
             }
         
         print(f"Adding document to RAG pipeline...")
@@ -48,7 +96,12 @@ async def upload_knowledge_file(file: UploadFile = File(...)):
         health_check = rag_pipeline.check_index_health()
         print(f"Index health check: {health_check}")
         
-        doc_stats = rag_pipeline.add_document(text)
+        _report_progress(upload_id, "indexing")
+        doc_stats = rag_pipeline.add_document(
+            text, metadata={"source": file.filename}, chunks=chunks, per_chunk_metadata=per_chunk_metadata
+        )
+        if doc_stats.get("status") == "error":
+            raise RuntimeError(f"Failed to add document: {doc_stats['error']}")
         print(f"Successfully processed document: {doc_stats}")
         
         # Verify the document was added by checking index stats
@@ -60,16 +113,31 @@ async def upload_knowledge_file(file: UploadFile = File(...)):
         except Exception as e:
             print(f"Warning: Could not delete file {file_location}: {e}")
             
+        _report_progress(upload_id, "complete", status="success", chunks=doc_stats.get("chunks_processed"))
         return {
             "message": "File uploaded and added to tutor knowledge base.",
+            "upload_id": upload_id,
             "stats": doc_stats,
             "index_stats": index_stats,
             "health_check": health_check
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error processing file: {str(e)}")
+        _report_progress(upload_id, "failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/upload-progress/{upload_id}")
+def get_upload_progress(upload_id: str):
+    """Report the stage of an upload (extracting, transcribing, indexing, complete or failed)."""
+    with _progress_lock:
+        # A copy, so a concurrent update can't change it while it is serialized
+        progress = dict(UPLOAD_PROGRESS[upload_id]) if upload_id in UPLOAD_PROGRESS else None
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    return progress
+
 @router.get("/index-status")
 def get_index_status():
     """Get the current status of the medical knowledge index."""
@@ -81,8 +149,24 @@ def get_index_status():
             "index_name": "medical",
             "health_check": health_check,
             "index_stats": index_stats,
+            "reembedding": rag_pipeline._metadata_store.latest_reembed_job(rag_pipeline.index_name),
             "message": "Index status retrieved successfully"
         }
     except Exception as e:
         print(f"Error getting index status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reembed", dependencies=[Depends(require_admin)])
+def reembed_knowledge(model: str, dimension: int = 0):
+    """Start migrating the knowledge base to another embedding model in the background.
+
+    Reads keep using the current index until the new one has caught up; progress
+    is reported by ``/tutor/index-status``. Requires the admin token.
+    """
+    job = start_reembedding(rag_pipeline, model, dimension)
+    return {
+        "message": "Re-embedding started",
+        "target_index": job.target_index,
+        "embed_model": job.embed_model,
+        "dimension": job.dimension
+    }
@@ -6,6 +6,8 @@ class FlashCardRequest(BaseModel):
     chapter: Optional[str] = None
     topic: Optional[str] = None
     num_cards: int = 10
+    # Accept cards generated earlier for identical input instead of new ones
+    reuse_cached: bool = False
 
 class FlashCardResponse(BaseModel):
     Question: str
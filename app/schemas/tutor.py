@@ -31,6 +31,14 @@ class EndSessionRequest(BaseModel):
 class EndSessionResponse(BaseModel):
     status: str
     summary: Optional[str] = None
+    summary_id: Optional[str] = None
+
+class SummaryStatusResponse(BaseModel):
+    summary_id: str
+    session_id: str
+    status: str
+    text: Optional[str] = None
+    topics: List[str] = []
 
 class SessionSummary(BaseModel):
     session_id: str
@@ -0,0 +1,115 @@
+import mmap
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+SEGMENT_FILE = "chunks.seg"
+INDEX_FILE = "chunks.idx"
+
+
+class ChunkStore:
+    """Append-only on-disk cache of chunk texts, keyed by chunk id.
+
+    The texts are also kept in the vector metadata, so a missing or stale
+    store only costs an index fetch (see ``RAGPipelinePinecone._hydrate``).
+
+    Texts are appended as UTF-8 to one segment file and located through an
+    offset index (``id<TAB>offset<TAB>length`` lines) loaded into memory at
+    startup. Reads slice a memory map of the segment, so hydrating a page of
+    results touches only the bytes it returns. Rewriting a chunk appends a new
+    copy; the latest index entry wins.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+        self._segment_path = os.path.join(path, SEGMENT_FILE)
+        self._index_path = os.path.join(path, INDEX_FILE)
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._load_index()
+        self._segment = open(self._segment_path, "ab")
+        self._index = open(self._index_path, "a")
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_path):
+            return
+        size = os.path.getsize(self._segment_path) if os.path.exists(self._segment_path) else 0
+        with open(self._index_path) as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue  # torn last line from an interrupted write
+                offset, length = int(parts[1]), int(parts[2])
+                if offset + length <= size:
+                    self._offsets[parts[0]] = (offset, length)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._offsets
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Append ``(chunk_id, text)`` pairs; texts are durable before they are indexed."""
+        with self._lock:
+            offset = self._segment.seek(0, os.SEEK_END)
+            entries, blobs = [], []
+            for chunk_id, text in items:
+                data = text.encode("utf-8")
+                blobs.append(data)
+                entries.append((chunk_id, offset, len(data)))
+                offset += len(data)
+            if not entries:
+                return
+            self._segment.write(b"".join(blobs))
+            self._segment.flush()
+            self._index.write("".join(f"{i}\t{o}\t{n}\n" for i, o, n in entries))
+            self._index.flush()
+            for chunk_id, offset, length in entries:
+                self._offsets[chunk_id] = (offset, length)
+
+    def get_many(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """Return the stored texts for ``chunk_ids``; unknown ids are left out."""
+        located = [(i, self._offsets.get(i)) for i in chunk_ids]
+        located = [(i, loc) for i, loc in located if loc is not None]
+        if not located:
+            return {}
+        view = self._mapped(max(o + n for _, (o, n) in located))
+        return {i: str(view[o:o + n], "utf-8") for i, (o, n) in located}
+
+    def get(self, chunk_id: str) -> Optional[str]:
+        return self.get_many([chunk_id]).get(chunk_id)
+
+    def _mapped(self, end: int) -> memoryview:
+        view = self._view
+        if view is not None and len(view) >= end:
+            return view
+        with self._lock:
+            if self._view is None or len(self._view) < end:
+                # The segment grew past the current map; map it again. Old maps
+                # stay alive until readers still slicing them drop their views.
+                with open(self._segment_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+            return self._view
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"chunks": len(self._offsets), "segment_bytes": self._segment.tell()}
+
+
+_store: Optional[ChunkStore] = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChunkStore(settings.CHUNK_STORE_DIR)
+        return _store
@@ -0,0 +1,42 @@
+from itertools import chain
+from typing import Iterable, Iterator, List
+
+
+def chunk_text(text: str, max_length: int = 500) -> List[str]:
+    """Split text on whitespace into chunks of approximately max_length characters."""
+    return list(chunk_text_stream([text], max_length))
+
+
+def chunk_text_stream(pieces: Iterable[str], max_length: int = 500) -> Iterator[str]:
+    """``chunk_text`` over the concatenation of ``pieces`` (e.g. PDF pages), yielding chunks as they fill.
+
+    A word cut by the end of a piece is held back until the next one arrives.
+    """
+    current_chunk = []
+    current_length = 0
+    carry = ""
+    # None marks the end, flushing the held-back word
+    for piece in chain(pieces, [None]):
+        if piece is None:
+            words = carry.split()
+        else:
+            text = carry + piece
+            words = text.split()
+            carry = words.pop() if words and not text[-1].isspace() else ""
+
+        for word in words:
+            current_length += len(word) + 1  # +1 for space
+            if current_length > max_length and current_chunk:
+                yield " ".join(current_chunk)
+                current_chunk = [word]
+                current_length = len(word)
+            else:
+                current_chunk.append(word)
+    if current_chunk:
+        yield " ".join(current_chunk)
+
+
+def chunk_words(text: str, max_words: int = 500) -> List[str]:
+    """Split text into chunks of at most max_words words."""
+    words = text.split()
+    return [" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words)]
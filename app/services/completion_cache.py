@@ -0,0 +1,133 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# Cache policies a call site can opt into
+CACHE_OFF = "off"
+# Only temperature-0 calls, whose repeats would return the same completion anyway
+CACHE_DETERMINISTIC = "deterministic"
+# Any temperature; identical inputs get the first sampled completion back
+CACHE_REUSE = "reuse"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions (last_used);
+"""
+
+
+def cache_key(model: str, messages: list, params: dict) -> str:
+    """Hash of everything that shapes a completion: model, messages, temperature, max_tokens, etc."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(policy: Optional[str], params: dict) -> bool:
+    if policy == CACHE_REUSE:
+        return True
+    if policy == CACHE_DETERMINISTIC:
+        # The API defaults to temperature 1, so only an explicit 0 counts
+        return params.get("temperature") == 0 and params.get("n", 1) == 1
+    return False
+
+
+class CompletionCache:
+    """SQLite cache of serialized chat completions, evicting least recently used beyond ``max_bytes``."""
+
+    def __init__(self, db_path: str = ".completion_cache.db", max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Concurrent misses on one key wait for a single API call
+        self._inflight: Dict[str, threading.Lock] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        with self._lock:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                if count_miss:
+                    self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM completions ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._inflight.setdefault(key, threading.Lock())
+
+    def release_key(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            return {**self.stats, "entries": count, "bytes": self._total_bytes}
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """The shared completion cache, or ``None`` when COMPLETION_CACHE_PATH is empty."""
+    global _cache
+    if not settings.COMPLETION_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache(settings.COMPLETION_CACHE_PATH,
+                                     max_bytes=int(settings.COMPLETION_CACHE_MAX_MB * 1024 * 1024))
+        return _cache
@@ -0,0 +1,129 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Tuple
+
+from app.services.llm_client import chat_completion
+from app.services.openai_governor import Priority, estimate_tokens
+
+ROLE_LABELS = {"user": "Student", "assistant": "Tutor"}
+
+
+class _SessionMemory:
+    def __init__(self):
+        self.summary = ""
+        self.recent: Deque[Tuple[str, str]] = deque()
+        self.recent_tokens = 0
+        # Turns evicted from ``recent`` but not yet folded into ``summary``
+        self.pending: List[Tuple[str, str]] = []
+        self.folding = False
+        self.lock = threading.Lock()
+
+
+class RollingConversationMemory:
+    """Bounded prompt memory for tutoring sessions.
+
+    The most recent turns are kept verbatim within ``recent_token_budget``.
+    Older turns are folded into a running summary by a background LLM call, so
+    the conversation part of each prompt stays roughly the same size however
+    long the session runs. Turns waiting to be folded are shown as short
+    excerpts until the summary catches up.
+    """
+
+    def __init__(self, recent_token_budget: int = 800, min_recent_turns: int = 2,
+                 summary_max_tokens: int = 250, model: str = "gpt-3.5-turbo",
+                 max_workers: int = 2, pending_excerpt_chars: int = 200, max_pending_shown: int = 6):
+        self.recent_token_budget = recent_token_budget
+        self.min_recent_turns = min_recent_turns
+        self.summary_max_tokens = summary_max_tokens
+        self.pending_excerpt_chars = pending_excerpt_chars
+        self.max_pending_shown = max_pending_shown
+        self._model = model
+        self._sessions: Dict[str, _SessionMemory] = {}
+        self._sessions_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-fold")
+
+    def _session(self, session_id: str) -> _SessionMemory:
+        with self._sessions_lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = _SessionMemory()
+                self._sessions[session_id] = memory
+            return memory
+
+    def add_turn(self, session_id: str, role: str, text: str) -> None:
+        memory = self._session(session_id)
+        with memory.lock:
+            memory.recent.append((role, text))
+            memory.recent_tokens += estimate_tokens(text)
+            while memory.recent_tokens > self.recent_token_budget and len(memory.recent) > self.min_recent_turns:
+                old_role, old_text = memory.recent.popleft()
+                memory.recent_tokens -= estimate_tokens(old_text)
+                memory.pending.append((old_role, old_text))
+            if memory.pending and not memory.folding:
+                memory.folding = True
+                self._executor.submit(self._fold, session_id, memory)
+
+    def render(self, session_id: str) -> str:
+        """Return the conversation context for the next prompt."""
+        with self._sessions_lock:
+            memory = self._sessions.get(session_id)
+        if memory is None:
+            return ""
+        with memory.lock:
+            parts = []
+            if memory.summary:
+                parts.append(f"Summary of the earlier conversation:\n{memory.summary}")
+            if memory.pending:
+                excerpts = "\n".join(
+                    f"{ROLE_LABELS.get(role, role)}: {_excerpt(text, self.pending_excerpt_chars)}"
+                    for role, text in memory.pending[-self.max_pending_shown:]
+                )
+                parts.append(f"Earlier turns (abridged):\n{excerpts}")
+            if memory.recent:
+                recent = "\n".join(f"{ROLE_LABELS.get(role, role)}: {text}" for role, text in memory.recent)
+                parts.append(f"Recent conversation:\n{recent}")
+            return "\n\n".join(parts)
+
+    def clear(self, session_id: str) -> None:
+        with self._sessions_lock:
+            self._sessions.pop(session_id, None)
+
+    def _fold(self, session_id: str, memory: _SessionMemory) -> None:
+        """Merge pending turns into the running summary, off the request path."""
+        while True:
+            with memory.lock:
+                turns = list(memory.pending)
+                summary = memory.summary
+                if not turns:
+                    memory.folding = False
+                    return
+            transcript = "\n".join(f"{ROLE_LABELS.get(role, role)}: {text}" for role, text in turns)
+            prompt = (
+                f"You maintain a running summary of a tutoring session between a medical student and an AI tutor.\n\n"
+                f"Current summary:\n{summary or '(empty)'}\n\n"
+                f"New turns to merge:\n{transcript}\n\n"
+                f"Rewrite the summary to cover everything so far in at most 150 words. Keep the topics covered, "
+                f"the student's open questions and key facts the tutor gave. Return only the summary."
+            )
+            try:
+                response = chat_completion(
+                    model=self._model,
+                    priority=Priority.GENERATION,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=self.summary_max_tokens,
+                    temperature=0.2,
+                )
+                new_summary = response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"Error folding conversation memory for {session_id}: {e}")
+                with memory.lock:
+                    memory.folding = False
+                return
+            with memory.lock:
+                memory.summary = new_summary
+                del memory.pending[: len(turns)]
+
+
+def _excerpt(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.services.chunking import chunk_words
+from app.services.llm_client import create_embeddings
+from app.services.local_vector_index import LocalVectorIndex
+from app.services.openai_governor import Priority
+
+
+class _DocumentIndex:
+    def __init__(self, index: LocalVectorIndex, chunks: List[str]):
+        self.index = index
+        self.chunks = chunks
+
+
+class DocumentIndexCache:
+    """Ephemeral in-memory indexes, one per uploaded document.
+
+    Documents are keyed by a hash of their text, so re-uploading a file reuses
+    its embeddings, and the least recently used documents are dropped beyond
+    ``max_documents``. Retrieval only scans the documents a request names, so
+    its cost depends on the uploaded content, not on everything seen before.
+    """
+
+    def __init__(self, max_documents: int = 64, embed_model: str = "text-embedding-3-small"):
+        self.max_documents = max_documents
+        self.embed_model = embed_model
+        self._documents: "OrderedDict[str, _DocumentIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._building: Dict[str, threading.Lock] = {}
+
+    def add(self, text: str) -> Optional[str]:
+        """Index a document unless it is cached, returning its key (``None`` if it has no text)."""
+        chunks = chunk_words(text, max_words=500) if text and text.strip() else []
+        if not chunks:
+            return None
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._documents:
+                self._documents.move_to_end(key)
+                return key
+            build_lock = self._building.setdefault(key, threading.Lock())
+        # Concurrent uploads of the same file embed it once
+        with build_lock:
+            with self._lock:
+                if key in self._documents:
+                    return key
+            try:
+                embeddings = []
+                for i in range(0, len(chunks), 100):
+                    embeddings.extend(create_embeddings(self.embed_model, chunks[i:i + 100], priority=Priority.GENERATION))
+                index = LocalVectorIndex(dimension=len(embeddings[0]))
+                # Chunk positions as ids: unique within the document's own index
+                index.upsert([(str(i), embedding, {}) for i, embedding in enumerate(embeddings)])
+                with self._lock:
+                    self._documents[key] = _DocumentIndex(index, chunks)
+                    while len(self._documents) > self.max_documents:
+                        self._documents.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        print(f"Indexed document {key[:12]} with {len(chunks)} chunks")
+        return key
+
+    def retrieve(self, query: str, keys: List[str], top_k: int = 5) -> List[str]:
+        """Return the ``top_k`` chunks most similar to ``query`` across the given documents."""
+        with self._lock:
+            documents = [self._documents[k] for k in dict.fromkeys(keys) if k in self._documents]
+        if not documents or not query.strip():
+            return []
+        query_emb = create_embeddings(self.embed_model, [query.strip()], priority=Priority.GENERATION)[0]
+        scored = []
+        for document in documents:
+            for match in document.index.query(vector=query_emb, top_k=top_k).matches:
+                scored.append((match.score, document.chunks[int(match.id)]))
+        scored.sort(key=lambda item: -item[0])
+        return [text for _, text in scored[:top_k]]
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+_cache: Optional[DocumentIndexCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_document_index_cache() -> DocumentIndexCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DocumentIndexCache(max_documents=settings.QUIZ_DOCUMENT_CACHE_SIZE)
+        return _cache
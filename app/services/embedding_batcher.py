@@ -0,0 +1,116 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into batched API calls.
+
+    Callers block in ``embed`` while a worker thread collects pending texts for up
+    to ``max_wait_ms`` (or until ``max_batch`` texts are queued), sends them in one
+    request and hands each caller its vectors. A text already waiting or in flight
+    is shared instead of being sent twice. Up to ``max_concurrent_batches``
+    requests are in flight at once; while all of them are busy, texts keep
+    collecting into the next batch instead of queueing as more small calls.
+    """
+
+    def __init__(self, embed_fn: EmbedFn, max_wait_ms: float = 5.0, max_batch: int = 64,
+                 max_concurrent_batches: int = 4):
+        self._embed_fn = embed_fn
+        self._dispatcher = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="embedding-batch")
+        self._free_slots = threading.Semaphore(max_concurrent_batches)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending: List[str] = []
+        self._inflight: Dict[str, Future] = {}
+        self._first_pending_at = 0.0
+        self._worker: threading.Thread = None
+        self.stats = {"requested_texts": 0, "coalesced_texts": 0, "batches": 0, "batched_texts": 0}
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        futures = [self._submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _submit(self, text: str) -> Future:
+        with self._cond:
+            self.stats["requested_texts"] += 1
+            future = self._inflight.get(text)
+            if future is not None:
+                self.stats["coalesced_texts"] += 1
+                return future
+            future = Future()
+            self._inflight[text] = future
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending.append(text)
+            self._ensure_worker()
+            self._cond.notify()
+            return future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self) -> List[Tuple[str, Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            while len(self._pending) < self.max_batch:
+                remaining = self._first_pending_at + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+            if self._pending:
+                self._first_pending_at = time.monotonic()
+            return [(text, self._inflight[text]) for text in batch]
+
+    def _run(self) -> None:
+        while True:
+            # Wait for an idle slot first, so the batch is cut only when it can be sent
+            self._free_slots.acquire()
+            self._dispatcher.submit(self._dispatch, self._next_batch())
+
+    def _dispatch(self, batch: List[Tuple[str, Future]]) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = self._embed_fn(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Embedding call returned {len(embeddings)} vectors for {len(texts)} inputs")
+            results = list(zip(batch, embeddings))
+            error = None
+        except Exception as e:
+            results = []
+            error = e
+        finally:
+            self._free_slots.release()
+        with self._cond:
+            self.stats["batches"] += 1
+            self.stats["batched_texts"] += len(texts)
+            for text, _ in batch:
+                self._inflight.pop(text, None)
+        if error is not None:
+            for _, future in batch:
+                future.set_exception(error)
+        else:
+            for (_, future), embedding in results:
+                future.set_result(embedding)
+
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_embedding_batcher(model: str, embed_fn: EmbedFn, max_wait_ms: float, max_batch: int) -> EmbeddingBatcher:
+    """Return the process-wide batcher for an embedding model."""
+    with _batchers_lock:
+        batcher = _batchers.get(model)
+        if batcher is None:
+            batcher = EmbeddingBatcher(embed_fn, max_wait_ms=max_wait_ms, max_batch=max_batch)
+            _batchers[model] = batcher
+        return batcher
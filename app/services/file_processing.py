@@ -1,16 +1,35 @@
 import os
-import fitz  # PyMuPDF
 import pandas as pd
 import tempfile
+from typing import Callable, List, Optional, Tuple
+from app.services.chunking import chunk_text_stream
+from app.services.ocr import iter_pdf_text, ocr_image_file
+from app.services.transcription import transcribe_video
 
 # Extract text from PDF
 
 def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    with fitz.open(file_path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
+    # Scanned pages without a text layer go through OCR when it is installed
+    return "".join(iter_pdf_text(file_path))
+
+def extract_pdf_chunks(file_path: str, max_length: int = 500,
+                       progress: Optional[Callable[[int], None]] = None) -> Tuple[str, List[str], int]:
+    """Return ``(text, chunks, page_count)``, chunking each page as soon as it is read or OCR'd.
+
+    The chunks are the ones ``chunk_text(text)`` would give; ``progress`` is
+    called with the number of pages done.
+    """
+    pages = []
+
+    def page_texts():
+        for page in iter_pdf_text(file_path):
+            pages.append(page)
+            if progress:
+                progress(len(pages))
+            yield page
+
+    chunks = list(chunk_text_stream(page_texts(), max_length))
+    return "".join(pages), chunks, len(pages)
 
 # Extract text from CSV
 
@@ -21,13 +40,14 @@ def extract_text_from_csv(file_path: str) -> str:
 # Extract text from image using OCR
 
 def extract_text_from_image(file_path: str) -> str:
-    # Disabled to keep deployment lightweight on Render free tier
-    return "OCR disabled in this deployment."
+    # Empty unless the optional OCR dependencies are installed, so nothing placeholder gets embedded
+    return ocr_image_file(file_path)
 
-# Extract text from video using speech-to-text (placeholder)
+# Extract text from video using speech-to-text
 def extract_text_from_video(file_path: str) -> str:
-    # Disabled to keep deployment lightweight on Render free tier
-    return "Video transcription disabled in this deployment."
+    # Empty unless ffmpeg and faster-whisper are installed; timestamps are dropped here,
+    # the upload endpoint keeps them as chunk metadata
+    return " ".join(segment.text for segment in transcribe_video(file_path))
 
 # Main dispatcher
 
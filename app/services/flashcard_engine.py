@@ -0,0 +1,191 @@
+import contextvars
+import json
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.llm_client import chat_completion, create_embeddings
+from app.services.openai_governor import Priority
+from app.services.chunking import chunk_text
+
+CARD_EXAMPLE = '{"cards": [{"Question": "Which deep forearm flexor lies most distally?", "Answer": "Pronator quadratus"}]}'
+
+
+class FlashcardEngine:
+    """Map-reduce flashcard generation for documents of any length.
+
+    The document is chunked and, when it is long, sampled down to
+    ``max_candidates`` evenly spaced chunks. One batched embeddings pass ranks
+    them by centrality (similarity to the document centroid, penalised for
+    redundancy with chunks already picked) and at most ``max_concurrency``
+    chunks are selected, so the map step is a single wave of parallel calls
+    whatever the document length. Cards are deduplicated by question embedding
+    and topped up from the most central chunks until exactly ``num_cards``
+    remain.
+    """
+
+    def __init__(self, model: str = "gpt-3.5-turbo", embed_model: Optional[str] = None,
+                 max_concurrency: int = 4, chunk_chars: int = 3000, max_candidates: int = 256,
+                 sketch_chars: int = 1000, duplicate_threshold: float = 0.92, overgenerate: float = 1.5,
+                 max_rounds: int = 2):
+        self.model = model
+        self.embed_model = embed_model or settings.EMBED_MODEL
+        self.max_concurrency = max_concurrency
+        self.chunk_chars = chunk_chars
+        self.max_candidates = max_candidates
+        self.sketch_chars = sketch_chars
+        self.duplicate_threshold = duplicate_threshold
+        self.overgenerate = overgenerate
+        self.max_rounds = max_rounds
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="flashcards")
+
+    def generate(self, text: str, num_cards: int = 10, cache: Optional[str] = None) -> List[dict]:
+        """Cards for ``text``; ``cache="reuse"`` accepts cards generated earlier for the same chunks."""
+        chunks = chunk_text(text, self.chunk_chars)
+        if not chunks or num_cards <= 0:
+            return []
+        if len(chunks) > self.max_candidates:
+            step = len(chunks) / self.max_candidates
+            chunks = [chunks[int(i * step)] for i in range(self.max_candidates)]
+        selected = self._select(chunks, min(len(chunks), self.max_concurrency))
+        print(f"Generating {num_cards} flash cards from {len(selected)} of {len(chunks)} chunks")
+
+        cards: List[dict] = []
+        vectors = np.zeros((0, 0), dtype=np.float32)
+        dropped: List[tuple] = []
+        for _ in range(self.max_rounds):
+            missing = num_cards - len(cards)
+            if missing <= 0:
+                break
+            per_chunk = max(1, math.ceil(missing * self.overgenerate / len(selected)))
+            avoid = [card["Question"] for card in cards]
+            # Each call runs in a copy of the request context so its stage timings are kept
+            futures = [
+                self._executor.submit(contextvars.copy_context().run, self._cards_for_chunk, chunk, per_chunk, avoid,
+                                     cache)
+                for chunk in selected
+            ]
+            # Interleave chunks so the most central ones lead without crowding out the rest
+            cards, vectors = self._merge(cards, vectors, _interleave([f.result() for f in futures]), dropped)
+        if len(cards) < num_cards:
+            # Still short: relax the threshold, least similar near-duplicates first
+            seen = {card["Question"].lower() for card in cards}
+            for _, card in sorted(dropped, key=lambda d: d[0]):
+                if len(cards) >= num_cards:
+                    break
+                if card["Question"].lower() not in seen:
+                    seen.add(card["Question"].lower())
+                    cards.append(card)
+        if len(cards) < num_cards:
+            print(f"Only {len(cards)} distinct flash cards generated, {num_cards} requested")
+        return cards[:num_cards]
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        embeddings = []
+        for i in range(0, len(texts), 100):
+            embeddings.extend(create_embeddings(self.embed_model, texts[i:i + 100], priority=Priority.GENERATION))
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def _select(self, chunks: List[str], count: int) -> List[str]:
+        """Pick ``count`` chunks that are central to the document but not redundant."""
+        if count >= len(chunks):
+            return chunks
+        # A chunk's opening is enough to place it; keeps the pass cheap on the token budget
+        vectors = self._embed([chunk[:self.sketch_chars] for chunk in chunks])
+        centroid = vectors.mean(axis=0)
+        centrality = vectors @ (centroid / (np.linalg.norm(centroid) or 1))
+        picked: List[int] = []
+        redundancy = np.full(len(chunks), -1.0, dtype=np.float32)
+        for _ in range(count):
+            score = centrality - 0.5 * np.maximum(redundancy, 0)
+            score[picked] = -np.inf
+            best = int(np.argmax(score))
+            picked.append(best)
+            redundancy = np.maximum(redundancy, vectors @ vectors[best])
+        # Most central first, which is also the order cards are kept in
+        picked.sort(key=lambda i: -centrality[i])
+        return [chunks[i] for i in picked]
+
+    def _merge(self, cards: List[dict], vectors: np.ndarray, candidates: List[dict], dropped: List[tuple]):
+        """Append candidates whose question is not a near duplicate of a kept card.
+
+        Rejected candidates go to ``dropped`` with their closest similarity.
+        """
+        if not candidates:
+            return cards, vectors
+        new_vectors = self._embed([c["Question"] for c in candidates])
+        kept = list(cards)
+        kept_vectors = [v for v in vectors]
+        for card, vector in zip(candidates, new_vectors):
+            similarity = max((float(v @ vector) for v in kept_vectors), default=-1.0)
+            if similarity >= self.duplicate_threshold:
+                dropped.append((similarity, card))
+                continue
+            kept.append(card)
+            kept_vectors.append(vector)
+        return kept, np.asarray(kept_vectors, dtype=np.float32)
+
+    def _cards_for_chunk(self, chunk: str, count: int, avoid: List[str], cache: Optional[str] = None) -> List[dict]:
+        avoid_text = ""
+        if avoid:
+            avoid_text = "Do not repeat these questions:\n" + "\n".join(f"- {q}" for q in avoid[-30:]) + "\n\n"
+        prompt = (
+            f"Generate {count} flash cards from the following content for a medical student. "
+            f"Each card has a question and a short (maximum 5 word) answer.\n\n"
+            f"{avoid_text}"
+            f"Content:\n{chunk}\n\n"
+            f"Return a JSON object with a \"cards\" list of objects with keys \"Question\" and \"Answer\".\n"
+            f"Example: {CARD_EXAMPLE}"
+        )
+        try:
+            response = chat_completion(
+                model=self.model,
+                priority=Priority.GENERATION,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=min(60 * count + 50, 2048),
+                temperature=0.7,
+                response_format={"type": "json_object"},
+                cache=cache,
+            )
+            return _parse_cards(response.choices[0].message.content)[:count]
+        except Exception as e:
+            print(f"Error generating flash cards for chunk: {e}")
+            return []
+
+
+def _interleave(groups: List[List[dict]]) -> List[dict]:
+    merged = []
+    for i in range(max((len(g) for g in groups), default=0)):
+        merged.extend(g[i] for g in groups if i < len(g))
+    return merged
+
+
+def _parse_cards(text: str) -> List[dict]:
+    try:
+        data = json.loads(text)
+    except ValueError:
+        match = re.search(r"[\[{].*[\]}]", text, re.DOTALL)
+        data = json.loads(match.group(0)) if match else []
+    if isinstance(data, dict):
+        data = data.get("cards") or data.get("flash_cards") or []
+    return [
+        {"Question": str(c["Question"]).strip(), "Answer": str(c["Answer"]).strip()}
+        for c in data
+        if isinstance(c, dict) and c.get("Question") and c.get("Answer")
+    ]
+
+
+_engine: Optional[FlashcardEngine] = None
+
+
+def get_flashcard_engine() -> FlashcardEngine:
+    global _engine
+    if _engine is None:
+        _engine = FlashcardEngine(max_concurrency=settings.FLASHCARD_CONCURRENCY)
+    return _engine
@@ -1,7 +1,9 @@
 import os
 import uuid
 from fastapi import UploadFile
+from app.services.completion_cache import CACHE_REUSE
 from app.services.file_processing import extract_text
+from app.services.flashcard_engine import get_flashcard_engine
 from app.services.quiz_generation import generate_flash_cards
 from app.schemas.flashcard import FlashCardRequest
 
@@ -12,6 +14,8 @@ def handle_flashcard_generation(
     file: UploadFile = None,
     request: FlashCardRequest = None
 ):
+    # Fresh cards unless the caller asked for cached ones
+    cache = CACHE_REUSE if request.reuse_cached else None
     example = """
 Example:\n[\n  {\n    \"Question\": \"What deep muscle of the forearm flexor compartment has both its origin and insertion located most distally on the forearm?\",\n    \"Answer\": \"Pronator quadratus\"\n  }\n]\n"""
     if file is not None:
@@ -24,12 +28,13 @@ Example:\n[\n  {\n    \"Question\": \"What deep muscle of the forearm flexor com
             os.remove(file_location)
         except Exception as e:
             print(f"Warning: Could not delete file {file_location}: {e}")
-        prompt = f"Generate flash cards from the following content: {text}. Each flash card should have a question and a short (maximum 5 word) answer. Return as a list of JSON objects with keys 'Question' and 'Answer'.\n" + example
+        # Map-reduce over the document's chunks instead of one prompt with all of it
+        return get_flashcard_engine().generate(text, num_cards=request.num_cards, cache=cache)
     else:
         prompt = f"Generate flash cards for subject: {request.subject}, chapter: {request.chapter}"
         if request.topic:
             prompt += f", topic: {request.topic}"
         prompt += ". Each flash card should have a question and a short(maximum 5 word) answer. Return as a list of JSON objects with keys 'Question' and 'Answer'.\n" + example
-    flash_cards = generate_flash_cards(prompt, num_cards=request.num_cards)
-    return flash_cards
+    flash_cards = generate_flash_cards(prompt, num_cards=request.num_cards, cache=cache)
+    return flash_cards[:request.num_cards]
 
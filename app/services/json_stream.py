@@ -0,0 +1,59 @@
+import json
+from typing import List
+
+
+class JSONArrayStream:
+    """Incremental parser for a streamed JSON array of objects.
+
+    ``feed`` takes the next piece of model output and returns the top-level
+    array elements completed by it. Text before the opening bracket (e.g. a
+    markdown fence) is skipped, and an element that fails to parse is dropped
+    without affecting the ones after it.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self.done = False
+
+    def feed(self, text: str) -> List[object]:
+        items = []
+        for ch in text:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+            if self._depth == 0:
+                # Between elements: only the closing bracket or the start of an object matters
+                if ch == "]":
+                    self.done = True
+                elif ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                continue
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        items.append(json.loads("".join(self._buffer)))
+                    except ValueError as e:
+                        print(f"Skipping malformed streamed element: {e}")
+                    self._buffer = []
+        return items
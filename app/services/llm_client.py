@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
+
+from app.core.timing import record_stage, stage
+from app.services.completion_cache import cache_key, get_completion_cache, is_cacheable
+from app.services.openai_governor import Priority, estimate_tokens, governor
+
+# Load environment variables from .env file
+load_dotenv()
+
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> OpenAI:
+    """Return the process-wide OpenAI client.
+
+    The SDK's own retries are disabled; the governor owns retry and backoff.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
+        return _client
+
+
+def set_openai_client(client) -> None:
+    """Replace the shared client (e.g. with a fake for local load tests)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def _message_tokens(messages: List[dict]) -> int:
+    return sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+
+
+def chat_completion(model: str, messages: List[dict], priority: Priority = Priority.INTERACTIVE,
+                    cache: Optional[str] = None, **kwargs):
+    """Create a chat completion under the shared rate-limit and retry governor.
+
+    ``cache`` opts the call into the completion cache: ``"deterministic"``
+    reuses temperature-0 completions, ``"reuse"`` any completion for
+    identical model, messages and parameters.
+    """
+    completion_cache = get_completion_cache() if is_cacheable(cache, kwargs) else None
+    if completion_cache is None:
+        return _chat_completion(model, messages, priority, **kwargs)
+    key = cache_key(model, messages, kwargs)
+    cached = completion_cache.get(key)
+    if cached is None:
+        # Identical concurrent requests share one API call
+        with completion_cache.key_lock(key):
+            try:
+                cached = completion_cache.get(key, count_miss=False)
+                if cached is None:
+                    response = _chat_completion(model, messages, priority, **kwargs)
+                    if hasattr(response, "model_dump_json"):
+                        completion_cache.put(key, model, response.model_dump_json())
+                    return response
+            finally:
+                completion_cache.release_key(key)
+    with stage("completion_cache_hit"):
+        return ChatCompletion.model_validate_json(cached)
+
+
+def _chat_completion(model: str, messages: List[dict], priority: Priority, **kwargs):
+    client = get_openai_client()
+    tokens = _message_tokens(messages) + int(kwargs.get("max_tokens") or 256)
+    # Includes time queued for the rate limit, which is what the caller waits for
+    with stage("chat_completion"):
+        return governor.call(
+            model,
+            tokens,
+            lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+            priority=priority,
+        )
+
+
+def stream_chat_completion(model: str, messages: List[dict], priority: Priority = Priority.INTERACTIVE,
+                           **kwargs) -> Iterator[str]:
+    """Yield the content deltas of a streamed chat completion.
+
+    Only opening the stream goes through the governor; the time to the first
+    delta is recorded as the ``chat_first_token`` stage.
+    """
+    client = get_openai_client()
+    tokens = _message_tokens(messages) + int(kwargs.get("max_tokens") or 256)
+    start = time.perf_counter()
+    stream = governor.call(
+        model,
+        tokens,
+        lambda: client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs),
+        priority=priority,
+    )
+    first = True
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first:
+                    record_stage("chat_first_token", (time.perf_counter() - start) * 1000)
+                    first = False
+                yield delta
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            # Stops the download when the consumer goes away early
+            close()
+        record_stage("chat_completion", (time.perf_counter() - start) * 1000)
+
+
+def create_embeddings(model: str, inputs: List[str], priority: Priority = Priority.INTERACTIVE,
+                      dimensions: Optional[int] = None) -> List[List[float]]:
+    """Embed a batch of texts in one request under the shared governor.
+
+    ``dimensions`` asks text-embedding-3 models for shortened vectors.
+    """
+    client = get_openai_client()
+    tokens = sum(estimate_tokens(text) for text in inputs)
+    extra = {"dimensions": dimensions} if dimensions else {}
+    with stage("embeddings"):
+        response = governor.call(
+            model,
+            tokens,
+            lambda: client.embeddings.create(model=model, input=inputs, **extra),
+            priority=priority,
+        )
+    return [d.embedding for d in response.data]
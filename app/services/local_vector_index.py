@@ -0,0 +1,792 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+
+class _Match:
+    def __init__(self, id: str, score: float, metadata: Optional[dict] = None, values: Optional[List[float]] = None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+        self.values = values
+
+
+class _QueryResult:
+    def __init__(self, matches: List[_Match], namespace: str = ""):
+        self.matches = matches
+        self.namespace = namespace
+
+
+class _FetchResult:
+    def __init__(self, vectors: Dict[str, _Match], namespace: str = ""):
+        self.vectors = vectors
+        self.namespace = namespace
+
+
+class _IndexStats:
+    def __init__(self, total_vector_count: int, dimension: int, namespaces: Dict[str, dict]):
+        self.total_vector_count = total_vector_count
+        self.dimension = dimension
+        self.index_fullness = 0.0
+        self.namespaces = namespaces
+
+
+# Per-chunk unique or free-text fields; posting lists for them would never be shared
+_UNINDEXED_FIELDS = {"text", "content_hash"}
+
+
+def _is_postable(value) -> bool:
+    return isinstance(value, (str, bool, int, float))
+
+
+def _matches_filter(metadata: dict, filter_dict: dict) -> bool:
+    """Evaluate a Pinecone-style metadata filter against a single record."""
+    for key, condition in filter_dict.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, f) for f in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, f) for f in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+    return True
+
+
+QUANTIZATION_NONE = "none"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATION_BINARY = "binary"
+# Candidates kept per requested result before exact rescoring
+DEFAULT_RESCORE_FACTOR = {QUANTIZATION_INT8: 4, QUANTIZATION_BINARY: 10}
+# Rows dequantized per matrix product; small blocks stay in cache (128 measured fastest)
+_SCORE_BLOCK = 128
+# Logged operations a partition may accumulate before it is rewritten as a new snapshot;
+# the limit grows with the partition so rewrites stay amortized O(1) per write
+_LOG_COMPACT_MIN = 1024
+# Snapshot files of indexes written before they were named by generation
+_LEGACY_FILES = {"vectors": "vectors.npy", "codes": "codes.npz", "rows": "vectors.f32"}
+
+
+class _DenseRows:
+    """Growable in-memory float32 row matrix."""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.count = 0
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+
+    def append(self, vector: np.ndarray) -> None:
+        if self.count >= self.matrix.shape[0]:
+            grown = np.zeros((max(self.count * 2, 64), self.dimension), dtype=np.float32)
+            grown[: self.count] = self.matrix[: self.count]
+            self.matrix = grown
+        self.matrix[self.count] = vector
+        self.count += 1
+
+    def reserve(self, extra: int) -> None:
+        needed = self.count + extra
+        if needed > self.matrix.shape[0]:
+            grown = np.zeros((needed, self.dimension), dtype=np.float32)
+            grown[: self.count] = self.matrix[: self.count]
+            self.matrix = grown
+
+    def view(self) -> np.ndarray:
+        return self.matrix[: self.count]
+
+    def take(self, rows) -> np.ndarray:
+        return self.matrix[rows]
+
+    def reset(self, path: Optional[str] = None) -> None:
+        self.count = 0
+        self.matrix = np.zeros((0, self.dimension), dtype=np.float32)
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def resident_bytes(self) -> int:
+        return self.matrix.nbytes
+
+
+class _RowFile:
+    """Append-only float32 row file read through a memory map.
+
+    Holds the full-precision vectors of a quantized partition on disk; only
+    the rows picked for rescoring are paged in.
+    """
+
+    def __init__(self, path: str, dimension: int, count: Optional[int] = None):
+        self.path = path
+        self.dimension = dimension
+        row_bytes = 4 * dimension
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.count = size // row_bytes if count is None else min(count, size // row_bytes)
+        if self.count * row_bytes != size:
+            # Drop rows written after the last saved records
+            with open(path, "r+b" if size else "wb") as f:
+                f.truncate(self.count * row_bytes)
+        self._file = open(path, "ab")
+        self._map: Optional[np.ndarray] = None
+
+    def append(self, vector: np.ndarray) -> None:
+        self._file.write(np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+        self.count += 1
+
+    def reserve(self, extra: int) -> None:
+        pass
+
+    def _mapped(self) -> np.ndarray:
+        if self._map is None or self._map.shape[0] < self.count:
+            self._file.flush()
+            self._map = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.count, self.dimension))
+        return self._map
+
+    def view(self) -> np.ndarray:
+        if not self.count:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return self._mapped()[: self.count]
+
+    def take(self, rows) -> np.ndarray:
+        return np.asarray(self._mapped()[rows])
+
+    def reset(self, path: Optional[str] = None) -> None:
+        """Start over empty, in a new file if ``path`` is given so the old one stays readable."""
+        self._map = None
+        self._file.close()
+        self.path = path or self.path
+        self._file = open(self.path, "wb")
+        self.count = 0
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    @property
+    def resident_bytes(self) -> int:
+        return 0
+
+
+class _Int8Codes:
+    """Per-vector scaled int8 codes; scores are dot products against the float query."""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.codes = np.zeros((0, dimension), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def set(self, row: int, vector: np.ndarray) -> None:
+        if row >= self.codes.shape[0]:
+            capacity = max(row + 1, self.codes.shape[0] * 2, 64)
+            codes = np.zeros((capacity, self.dimension), dtype=np.int8)
+            codes[: self.codes.shape[0]] = self.codes
+            scales = np.zeros(capacity, dtype=np.float32)
+            scales[: self.scales.shape[0]] = self.scales
+            self.codes, self.scales = codes, scales
+        peak = float(np.abs(vector).max())
+        scale = peak / 127 if peak else 1.0
+        self.codes[row] = np.round(vector / scale).astype(np.int8)
+        self.scales[row] = scale
+
+    def scores(self, rows: Optional[np.ndarray], count: int, query: np.ndarray) -> np.ndarray:
+        codes = self.codes[:count] if rows is None else self.codes[rows]
+        scales = self.scales[:count] if rows is None else self.scales[rows]
+        out = np.empty(len(codes), dtype=np.float32)
+        for i in range(0, len(codes), _SCORE_BLOCK):
+            block = codes[i:i + _SCORE_BLOCK].astype(np.float32)
+            out[i:i + _SCORE_BLOCK] = (block @ query) * scales[i:i + _SCORE_BLOCK]
+        return out
+
+    def arrays(self, count: int) -> dict:
+        return {"codes": self.codes[:count], "scales": self.scales[:count]}
+
+    def load(self, arrays: dict) -> None:
+        self.codes, self.scales = arrays["codes"].copy(), arrays["scales"].copy()
+
+    @property
+    def resident_bytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+
+class _BinaryCodes:
+    """Sign bits packed eight to a byte; scores are derived from Hamming distance."""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.codes = np.zeros((0, (dimension + 7) // 8), dtype=np.uint8)
+
+    def set(self, row: int, vector: np.ndarray) -> None:
+        if row >= self.codes.shape[0]:
+            codes = np.zeros((max(row + 1, self.codes.shape[0] * 2, 64), self.codes.shape[1]), dtype=np.uint8)
+            codes[: self.codes.shape[0]] = self.codes
+            self.codes = codes
+        self.codes[row] = np.packbits(vector > 0)
+
+    def scores(self, rows: Optional[np.ndarray], count: int, query: np.ndarray) -> np.ndarray:
+        codes = self.codes[:count] if rows is None else self.codes[rows]
+        bits = np.packbits(query > 0)
+        distance = np.bitwise_count(np.bitwise_xor(codes, bits)).sum(axis=1, dtype=np.int32)
+        # Matching sign bits approximate the angle between the vectors
+        return 1.0 - 2.0 * distance.astype(np.float32) / self.dimension
+
+    def arrays(self, count: int) -> dict:
+        return {"codes": self.codes[:count]}
+
+    def load(self, arrays: dict) -> None:
+        self.codes = arrays["codes"].copy()
+
+    @property
+    def resident_bytes(self) -> int:
+        return self.codes.nbytes
+
+
+_CODECS = {QUANTIZATION_INT8: _Int8Codes, QUANTIZATION_BINARY: _BinaryCodes}
+
+
+class _Partition:
+    """Vectors, metadata and posting lists for a single namespace.
+
+    With quantization the partition also keeps compact codes for a first-pass
+    search; the full-precision rows are then only read for rescoring, from disk
+    when the index is persisted.
+    """
+
+    def __init__(self, dimension: int, quantization: str = QUANTIZATION_NONE, rows_path: Optional[str] = None,
+                 row_count: Optional[int] = None):
+        self.dimension = dimension
+        self.quantization = quantization
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.metadata: List[dict] = []
+        if rows_path and quantization != QUANTIZATION_NONE:
+            self.vectors = _RowFile(rows_path, dimension, row_count)
+        else:
+            self.vectors = _DenseRows(dimension)
+        self.codes = _CODECS[quantization](dimension) if quantization != QUANTIZATION_NONE else None
+        self.live: Set[int] = set()
+        # (field, value) -> set of rows carrying that value
+        self.postings: Dict[tuple, Set[int]] = {}
+        # Persistence: snapshot generation (0 = never written), operations logged since
+        # and the array files the current records.json points at
+        self.generation = 0
+        self.logged = 0
+        self.files: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def _index_metadata(self, row: int, metadata: dict) -> None:
+        for field, value in metadata.items():
+            if field in _UNINDEXED_FIELDS or not _is_postable(value):
+                continue
+            self.postings.setdefault((field, value), set()).add(row)
+
+    def _unindex_row(self, row: int) -> None:
+        for field, value in self.metadata[row].items():
+            posting = self.postings.get((field, value)) if _is_postable(value) else None
+            if posting is not None:
+                posting.discard(row)
+                if not posting:
+                    del self.postings[(field, value)]
+        self.live.discard(row)
+
+    def upsert(self, id: str, values: np.ndarray, metadata: dict, stored: bool = False) -> None:
+        """Add or overwrite a vector; ``stored`` rows are already in the row file (log replay)."""
+        if id in self.rows:
+            self._unindex_row(self.rows[id])
+        row = len(self.ids)
+        if not stored:
+            self.vectors.append(values)
+        self._add_row(row, id, values, metadata)
+
+    def _add_row(self, row: int, id: str, values: np.ndarray, metadata: dict) -> None:
+        self.ids.append(id)
+        self.metadata.append(metadata)
+        if self.codes is not None:
+            self.codes.set(row, values)
+        self.rows[id] = row
+        self.live.add(row)
+        self._index_metadata(row, metadata)
+
+    def restore(self, ids: List[str], metadata: List[dict], vectors: Optional[np.ndarray] = None,
+                codes: Optional[dict] = None) -> None:
+        """Rebuild the partition from saved records.
+
+        ``vectors`` are appended for in-memory storage; file-backed rows are
+        already on disk. Saved ``codes`` skip re-quantizing the rows.
+        """
+        if vectors is not None:
+            self.vectors.reserve(len(ids))
+            for values in vectors:
+                self.vectors.append(values)
+        if codes is not None and self.codes is not None:
+            self.codes.load(codes)
+        stored = self.vectors.view()
+        for row, (id, meta) in enumerate(zip(ids, metadata)):
+            if id in self.rows:
+                self._unindex_row(self.rows[id])
+            self.ids.append(id)
+            self.metadata.append(meta)
+            if self.codes is not None and codes is None:
+                self.codes.set(row, np.asarray(stored[row]))
+            self.rows[id] = row
+            self.live.add(row)
+            self._index_metadata(row, meta)
+
+    def delete(self, id: str) -> None:
+        row = self.rows.pop(id, None)
+        if row is not None:
+            self._unindex_row(row)
+
+    def candidate_rows(self, filter_dict: Optional[dict]) -> Set[int]:
+        """Pre-filter rows through the posting lists before any vector math."""
+        if not filter_dict:
+            return self.live
+        candidates: Optional[Set[int]] = None
+        residual = False
+        for key, condition in filter_dict.items():
+            rows = self._posting_rows(key, condition)
+            if rows is None:
+                residual = True
+                continue
+            candidates = rows if candidates is None else candidates & rows
+            if not candidates:
+                return set()
+        if candidates is None:
+            candidates = self.live
+        if residual:
+            candidates = {r for r in candidates if _matches_filter(self.metadata[r], filter_dict)}
+        return candidates
+
+    def _posting_rows(self, key: str, condition) -> Optional[Set[int]]:
+        if key == "$and":
+            rows = None
+            for sub in condition:
+                sub_rows = self.candidate_rows(sub)
+                rows = sub_rows if rows is None else rows & sub_rows
+            return rows if rows is not None else self.live
+        if key.startswith("$") or key in _UNINDEXED_FIELDS:
+            return None
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if set(condition) - {"$eq", "$in"}:
+            return None
+        rows = None
+        if "$eq" in condition:
+            rows = set(self.postings.get((key, condition["$eq"]), ()))
+        if "$in" in condition:
+            in_rows = set()
+            for value in condition["$in"]:
+                in_rows |= self.postings.get((key, value), set())
+            rows = in_rows if rows is None else rows & in_rows
+        return rows
+
+    @property
+    def tombstones(self) -> int:
+        return len(self.ids) - len(self.live)
+
+    def compact(self, rows_path: Optional[str] = None) -> None:
+        """Drop tombstoned rows left behind by overwrites and deletes.
+
+        File-backed rows are rewritten into ``rows_path`` when given.
+        """
+        if not self.tombstones:
+            return
+        keep = sorted(self.live)
+        ids = [self.ids[r] for r in keep]
+        metadata = [self.metadata[r] for r in keep]
+        vectors = self.vectors.take(keep) if keep else np.zeros((0, self.dimension), dtype=np.float32)
+        self.ids, self.rows, self.metadata, self.live, self.postings = [], {}, [], set(), {}
+        self.vectors.reset(rows_path)
+        if self.codes is not None:
+            self.codes = _CODECS[self.quantization](self.dimension)
+        for id, values, meta in zip(ids, vectors, metadata):
+            self.upsert(id, values, meta)
+
+    @property
+    def resident_bytes(self) -> int:
+        return self.vectors.resident_bytes + (self.codes.resident_bytes if self.codes is not None else 0)
+
+
+class LocalVectorIndex:
+    """In-process vector index exposing the subset of the Pinecone Index API we use.
+
+    Each namespace is a separate partition, so scoped queries only touch the vectors
+    of that partition. Metadata equality filters are resolved through posting lists
+    before scoring, which keeps filtered queries proportional to the matching subset.
+
+    ``quantization="int8"`` or ``"binary"`` keeps compact codes in memory for a
+    first-pass search and rescores the best ``top_k * rescore_factor`` candidates
+    with the full-precision vectors, which stay on disk for persisted indexes.
+    """
+
+    def __init__(self, dimension: int = 1536, path: Optional[str] = None,
+                 quantization: str = QUANTIZATION_NONE, rescore_factor: int = 0):
+        if quantization != QUANTIZATION_NONE and quantization not in _CODECS:
+            raise ValueError(f"Unknown quantization {quantization!r}")
+        self.dimension = dimension
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor or DEFAULT_RESCORE_FACTOR.get(quantization, 0)
+        self._path = path
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.RLock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def _partition(self, namespace: str, create: bool = False, row_count: int = 0,
+                   rows_name: str = "vectors-1.f32") -> Optional[_Partition]:
+        partition = self._partitions.get(namespace)
+        if partition is None and create:
+            rows_path = None
+            if self._path and self.quantization != QUANTIZATION_NONE:
+                os.makedirs(self._namespace_dir(namespace), exist_ok=True)
+                rows_path = os.path.join(self._namespace_dir(namespace), rows_name)
+            partition = _Partition(self.dimension, self.quantization, rows_path, row_count)
+            self._partitions[namespace] = partition
+        return partition
+
+    def _normalize(self, values) -> np.ndarray:
+        vector = np.asarray(values, dtype=np.float32)
+        if vector.shape[-1] != self.dimension:
+            raise ValueError(f"Vector dimension {vector.shape[-1]} does not match index dimension {self.dimension}")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def upsert(self, vectors: list, namespace: str = "") -> dict:
+        with self._lock:
+            partition = self._partition(namespace, create=True)
+            written = []
+            for item in vectors:
+                if isinstance(item, dict):
+                    id, values, metadata = item["id"], item["values"], item.get("metadata")
+                else:
+                    id, values, metadata = item[0], item[1], item[2] if len(item) > 2 else None
+                values, metadata = self._normalize(values), dict(metadata or {})
+                partition.upsert(id, values, metadata)
+                written.append((id, values, metadata))
+            self._save(namespace, upserts=written)
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: List[str], namespace: str = "") -> None:
+        with self._lock:
+            partition = self._partition(namespace)
+            if partition is None:
+                return
+            for id in ids:
+                partition.delete(id)
+            self._save(namespace, deletes=ids)
+
+    def fetch(self, ids: List[str], namespace: str = "") -> _FetchResult:
+        with self._lock:
+            partition = self._partition(namespace)
+            vectors = {}
+            if partition is not None:
+                for id in ids:
+                    row = partition.rows.get(id)
+                    if row is not None:
+                        values = partition.vectors.take([row])[0].tolist()
+                        vectors[id] = _Match(id, 1.0, partition.metadata[row], values)
+            return _FetchResult(vectors, namespace)
+
+    def list(self, namespace: str = "", limit: int = 100):
+        """Yield pages of vector ids, like Pinecone's ``Index.list``."""
+        with self._lock:
+            partition = self._partition(namespace)
+            ids = [partition.ids[row] for row in sorted(partition.live)] if partition is not None else []
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = False,
+              include_values: bool = False, filter: Optional[dict] = None, namespace: str = "") -> _QueryResult:
+        with self._lock:
+            partition = self._partition(namespace)
+            if partition is None or not len(partition):
+                return _QueryResult([], namespace)
+            rows, count = self._candidates(partition, filter)
+            if not count:
+                return _QueryResult([], namespace)
+            query = self._normalize(vector)
+            k = min(top_k, count)
+            shortlist = k * self.rescore_factor
+            if partition.codes is not None and count > shortlist:
+                # First pass over the quantized codes, exact scores for the shortlist
+                approx = partition.codes.scores(rows, len(partition.ids), query)
+                best = np.argpartition(-approx, shortlist - 1)[:shortlist]
+                rows = np.sort(best if rows is None else rows[best])
+            if rows is None:
+                scores = partition.vectors.view() @ query
+                rows = np.arange(count)
+            else:
+                scores = partition.vectors.take(rows) @ query
+            return _QueryResult(self._top(partition, rows, scores, k, include_metadata, include_values), namespace)
+
+    def query_many(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = False,
+                   include_values: bool = False, filter: Optional[dict] = None,
+                   namespace: str = "") -> List[_QueryResult]:
+        """Run several queries against one namespace and filter, one result per vector.
+
+        Unquantized partitions score every query in a single matrix product;
+        quantized ones keep the per-query shortlist and rescoring.
+        """
+        with self._lock:
+            partition = self._partition(namespace)
+            if partition is None or not len(partition):
+                return [_QueryResult([], namespace) for _ in vectors]
+            if partition.codes is not None:
+                return [self.query(v, top_k, include_metadata, include_values, filter, namespace) for v in vectors]
+            rows, count = self._candidates(partition, filter)
+            if not count:
+                return [_QueryResult([], namespace) for _ in vectors]
+            queries = np.stack([self._normalize(v) for v in vectors])
+            if rows is None:
+                scores = partition.vectors.view() @ queries.T
+                rows = np.arange(count)
+            else:
+                scores = partition.vectors.take(rows) @ queries.T
+            k = min(top_k, count)
+            return [
+                _QueryResult(self._top(partition, rows, scores[:, j], k, include_metadata, include_values), namespace)
+                for j in range(len(vectors))
+            ]
+
+    def _candidates(self, partition: _Partition, filter: Optional[dict]):
+        """Rows a query may match as ``(rows, count)``; ``rows`` is None when every row qualifies."""
+        if not filter and len(partition.live) == len(partition.ids):
+            # Every stored row is a candidate; score the matrices in place
+            return None, len(partition.ids)
+        candidates = partition.candidate_rows(filter)
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates)), len(candidates)
+
+    def _top(self, partition: _Partition, rows: np.ndarray, scores: np.ndarray, k: int,
+             include_metadata: bool, include_values: bool) -> List[_Match]:
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matches = []
+        for i in top:
+            row = int(rows[i])
+            matches.append(_Match(
+                partition.ids[row],
+                float(scores[i]),
+                partition.metadata[row] if include_metadata else None,
+                partition.vectors.take([row])[0].tolist() if include_values else None,
+            ))
+        return matches
+
+    def describe_index_stats(self) -> _IndexStats:
+        with self._lock:
+            namespaces = {ns: {"vector_count": len(p)} for ns, p in self._partitions.items()}
+            total = sum(len(p) for p in self._partitions.values())
+            return _IndexStats(total, self.dimension, namespaces)
+
+    def memory_usage(self) -> int:
+        """Bytes of vector data held in memory (codes plus any in-memory full vectors)."""
+        with self._lock:
+            return sum(p.resident_bytes for p in self._partitions.values())
+
+    def _namespace_dir(self, namespace: str) -> str:
+        return os.path.join(self._path, namespace or "__default__")
+
+    def _save(self, namespace: str, upserts: list = (), deletes: List[str] = ()) -> None:
+        """Persist a write: appended to the namespace log, or as a full snapshot now and then.
+
+        A snapshot (``records.json`` plus the vectors or codes) is written for a
+        new partition, once tombstones outnumber live rows, and once the log
+        outgrows the partition; every other write only appends to
+        ``log-<generation>.jsonl`` (and, unquantized, ``delta-<generation>.f32``).
+        """
+        partition = self._partitions[namespace]
+        tombstoned = len(partition.ids) > 2 * max(len(partition), 32)
+        if not self._path:
+            if tombstoned:
+                partition.compact()
+            return
+        partition.logged += len(upserts) + len(deletes)
+        if not partition.generation or tombstoned or partition.logged > max(len(partition), _LOG_COMPACT_MIN):
+            self._snapshot(namespace)
+        elif upserts or deletes:
+            self._append_log(namespace, upserts, deletes)
+
+    def _append_log(self, namespace: str, upserts: list, deletes: List[str]) -> None:
+        partition = self._partitions[namespace]
+        directory = self._namespace_dir(namespace)
+        # Rows go to disk before the log lines that refer to them
+        if upserts:
+            if partition.codes is None:
+                with open(os.path.join(directory, f"delta-{partition.generation}.f32"), "ab") as f:
+                    f.write(np.stack([values for _, values, _ in upserts]).astype(np.float32).tobytes())
+            else:
+                partition.vectors.flush()
+        lines = [json.dumps({"id": id, "metadata": metadata}) for id, _, metadata in upserts]
+        lines += [json.dumps({"delete": id}) for id in deletes]
+        with open(os.path.join(directory, f"log-{partition.generation}.jsonl"), "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _snapshot(self, namespace: str) -> None:
+        """Write the next generation's files beside the current ones, then switch ``records.json`` to them.
+
+        Nothing the current records point at is overwritten, so a crash at any
+        point leaves either the old or the new generation readable.
+        """
+        partition = self._partitions[namespace]
+        directory = self._namespace_dir(namespace)
+        os.makedirs(directory, exist_ok=True)
+        previous = partition.generation
+        generation = previous + 1
+        if partition.codes is None:
+            partition.compact()
+            files = {"vectors": f"vectors-{generation}.npy"}
+            np.save(os.path.join(directory, files["vectors"]), partition.vectors.view())
+        else:
+            # Full-precision rows are appended to the row file; compaction moves them to a new one
+            if partition.tombstones:
+                partition.compact(rows_path=os.path.join(directory, f"vectors-{generation}.f32"))
+            partition.vectors.flush()
+            files = {"codes": f"codes-{generation}.npz", "rows": os.path.basename(partition.vectors.path)}
+            np.savez(os.path.join(directory, files["codes"]), **partition.codes.arrays(len(partition.ids)))
+        records_path = os.path.join(directory, "records.json")
+        with open(records_path + ".tmp", "w") as f:
+            json.dump({"ids": partition.ids, "metadata": partition.metadata, "quantization": self.quantization,
+                       "generation": generation, "files": files}, f)
+        # The previous generation stops being read once the new records are in place
+        os.replace(records_path + ".tmp", records_path)
+        stale = set(partition.files.values()) | set(_LEGACY_FILES.values())
+        stale |= {f"log-{previous}.jsonl", f"delta-{previous}.f32"}
+        partition.generation, partition.logged, partition.files = generation, 0, files
+        for name in stale - set(files.values()):
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+
+    def _load(self) -> None:
+        for name in os.listdir(self._path):
+            directory = os.path.join(self._path, name)
+            records_path = os.path.join(directory, "records.json")
+            if not os.path.exists(records_path):
+                continue
+            namespace = "" if name == "__default__" else name
+            with open(records_path) as f:
+                records = json.load(f)
+            ids, metadata = records["ids"], records["metadata"]
+            generation = records.get("generation", 0)
+            saved_quantization = records.get("quantization", QUANTIZATION_NONE)
+            files = records.get("files", _LEGACY_FILES)
+            log = _read_log(os.path.join(directory, f"log-{generation}.jsonl"))
+            dense_path = os.path.join(directory, files["vectors"]) if "vectors" in files else ""
+            rows_path = os.path.join(directory, files.get("rows", "vectors.f32"))
+            # Rows appended after the snapshot: a delta file, or the tail of vectors.f32
+            row_bytes = 4 * self.dimension
+            if os.path.exists(dense_path):
+                delta_path = os.path.join(directory, f"delta-{generation}.f32")
+                logged_rows = os.path.getsize(delta_path) // row_bytes if os.path.exists(delta_path) else 0
+            else:
+                logged_rows = max(0, os.path.getsize(rows_path) // row_bytes - len(ids)) if os.path.exists(rows_path) else 0
+            log = _complete_entries(log, logged_rows)
+            logged = sum(1 for entry in log if "delete" not in entry)
+            converted = False
+            if self.quantization != QUANTIZATION_NONE and not os.path.exists(dense_path):
+                partition = self._partition(namespace, create=True, row_count=len(ids) + logged,
+                                            rows_name=os.path.basename(rows_path))
+                codes = None
+                codes_path = os.path.join(directory, files.get("codes", "codes.npz"))
+                if saved_quantization == self.quantization and os.path.exists(codes_path):
+                    with np.load(codes_path) as saved:
+                        codes = {key: saved[key] for key in saved.files}
+                partition.restore(ids, metadata, codes=codes)
+                stored = partition.vectors.view()
+                rows = iter(range(len(ids), len(ids) + logged))
+                self._replay(partition, log, lambda: np.asarray(stored[next(rows)]), stored=True)
+            else:
+                # Saved in the other storage mode; converted by a snapshot below
+                converted = self.quantization != saved_quantization
+                if os.path.exists(dense_path):
+                    vectors = np.load(dense_path)
+                    delta = np.fromfile(delta_path, dtype=np.float32) if logged else np.zeros(0, dtype=np.float32)
+                    delta = delta[: logged * self.dimension].reshape(-1, self.dimension)
+                else:
+                    stored = np.memmap(rows_path, dtype=np.float32, mode="r",
+                                       shape=(len(ids) + logged, self.dimension))
+                    vectors, delta = stored[: len(ids)], stored[len(ids):]
+                partition = self._partition(namespace, create=True, rows_name=f"vectors-{generation + 1}.f32")
+                partition.restore(ids, metadata, vectors=vectors)
+                rows = iter(delta)
+                self._replay(partition, log, lambda: next(rows), stored=False)
+            partition.generation = generation
+            partition.logged = len(log)
+            partition.files = files
+            if converted or not generation:
+                # Indexes written before the log existed have no generation yet
+                self._snapshot(namespace)
+        print(f"Loaded local index from {self._path} with {self.describe_index_stats().total_vector_count} vectors")
+
+    @staticmethod
+    def _replay(partition: _Partition, log: List[dict], next_row, stored: bool) -> None:
+        for entry in log:
+            if "delete" in entry:
+                partition.delete(entry["delete"])
+            else:
+                partition.upsert(entry["id"], next_row(), entry["metadata"], stored=stored)
+
+
+def _read_log(path: str) -> List[dict]:
+    """Entries of a namespace log, stopping at a line torn by a crash."""
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+def _complete_entries(log: List[dict], rows: int) -> List[dict]:
+    """Drop log entries past the last upsert whose row made it to disk."""
+    for i, entry in enumerate(log):
+        if "delete" not in entry:
+            if not rows:
+                return log[:i]
+            rows -= 1
+    return log
+
+
+_LOCAL_INDEXES: Dict[str, LocalVectorIndex] = {}
+_LOCAL_INDEXES_LOCK = threading.Lock()
+
+
+def get_local_index(index_name: str, dimension: int = 1536, base_dir: str = "",
+                    quantization: str = QUANTIZATION_NONE, rescore_factor: int = 0) -> LocalVectorIndex:
+    """Return the process-wide local index for a name so every pipeline shares it."""
+    with _LOCAL_INDEXES_LOCK:
+        index = _LOCAL_INDEXES.get(index_name)
+        if index is None:
+            path = os.path.join(base_dir, index_name) if base_dir else None
+            index = LocalVectorIndex(dimension=dimension, path=path, quantization=quantization,
+                                     rescore_factor=rescore_factor)
+            _LOCAL_INDEXES[index_name] = index
+        return index
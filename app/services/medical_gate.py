@@ -0,0 +1,231 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+GATE_MEDICAL = "medical"
+GATE_NON_MEDICAL = "non_medical"
+GATE_UNCERTAIN = "uncertain"
+
+# Seed examples for the two centroids; the gate also learns from questions the
+# answering model resolves (see ``learn``).
+MEDICAL_EXAMPLES = [
+    "What are the symptoms of diabetes?",
+    "Explain the pathophysiology of heart failure",
+    "What is the mechanism of action of beta blockers?",
+    "Describe the brachial plexus anatomy",
+    "How is community acquired pneumonia treated?",
+    "What are the causes of microcytic anemia?",
+    "Differential diagnosis of chest pain",
+    "What does the loop of Henle do in the kidney?",
+    "Side effects of ACE inhibitors",
+    "How does insulin regulate blood glucose?",
+    "What are the stages of wound healing?",
+    "Explain the Frank-Starling mechanism",
+    "What are the risk factors for stroke?",
+    "Which cranial nerve innervates the lateral rectus?",
+    "How do you interpret an arterial blood gas?",
+    "What is the first line treatment for hypertension?",
+    "What about treatment options for asthma?",
+    "Describe the clinical features of hypothyroidism",
+    "How is sepsis managed in the emergency department?",
+    "What are the social determinants of health?",
+]
+NON_MEDICAL_EXAMPLES = [
+    "What is the capital of France?",
+    "Write me a poem about the ocean",
+    "Who won the football world cup in 2018?",
+    "How do I reverse a linked list in Python?",
+    "What's the weather like tomorrow?",
+    "Recommend a good movie to watch tonight",
+    "How do I bake sourdough bread?",
+    "Explain how the stock market works",
+    "Translate hello into Spanish",
+    "What is the plot of Hamlet?",
+    "How do I fix my car's flat tire?",
+    "Tell me a joke",
+    "What is the best smartphone to buy?",
+    "How do airplanes fly?",
+    "Summarize the history of the Roman Empire",
+    "How do I set up a React project?",
+    "What are good places to visit in Japan?",
+    "Solve 2x + 3 = 11",
+    "Who painted the Mona Lisa?",
+    "How does blockchain work?",
+]
+
+
+# Bumped when the cache layout changes, so older caches are retrained
+_CACHE_FORMAT = 2
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class MedicalQuestionGate:
+    """Centroid classifier deciding whether a question is medical from its embedding.
+
+    The question embedding is already computed for retrieval, so gating costs a
+    couple of dot products instead of a chat completion. Questions whose score
+    falls within ``margin`` of the boundary are reported as uncertain and left
+    to the answering prompt to reject.
+
+    Centroids are trained from the seed examples in a background thread at
+    construction (or read from ``cache_path``); until then every question is
+    uncertain. At most ``max_learned`` examples' worth of learned questions
+    weigh on each centroid next to its seeds (older ones fade), so model
+    verdicts refine the seeds without drifting away from them. Updates are
+    written to the cache at most every ``save_interval`` seconds.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], List[List[float]]], model: str,
+                 cache_path: str = ".medical_gate.json", margin: float = 0.02,
+                 max_learned: int = 40, save_interval: float = 60.0):
+        self._embed_fn = embed_fn
+        self._model = model
+        self._cache_path = cache_path
+        self.margin = margin
+        self.max_learned = max_learned
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._centroids: Optional[dict] = None
+        self._ready = threading.Event()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._trainer = threading.Thread(target=self._train, name="medical-gate", daemon=True)
+        self._trainer.start()
+        if cache_path:
+            atexit.register(self.flush)
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _examples_key(self) -> str:
+        payload = json.dumps([_CACHE_FORMAT, self._model, MEDICAL_EXAMPLES, NON_MEDICAL_EXAMPLES])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _train(self) -> None:
+        try:
+            centroids = self._read_cache()
+            if centroids is None:
+                # One batched embeddings call trains both centroids
+                embeddings = self._embed_fn(MEDICAL_EXAMPLES + NON_MEDICAL_EXAMPLES)
+                split = len(MEDICAL_EXAMPLES)
+                centroids = {
+                    GATE_MEDICAL: _centroid(embeddings[:split]),
+                    GATE_NON_MEDICAL: _centroid(embeddings[split:]),
+                }
+            with self._lock:
+                self._centroids = centroids
+                self._save()
+            self._ready.set()
+        except Exception as e:
+            print(f"Medical gate training failed, deferring every question to the answer prompt: {e}")
+
+    def _read_cache(self) -> Optional[dict]:
+        if not self._cache_path or not os.path.exists(self._cache_path):
+            return None
+        try:
+            with open(self._cache_path) as f:
+                cached = json.load(f)
+            if cached.get("key") != self._examples_key():
+                return None
+            return {
+                label: {
+                    "seed": np.asarray(c["seed"], dtype=np.float32),
+                    "learned": np.asarray(c["learned"], dtype=np.float32),
+                    "learned_count": c["learned_count"],
+                }
+                for label, c in cached["centroids"].items()
+            }
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring unreadable medical gate cache: {e}")
+            return None
+
+    def _save(self) -> None:
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if not self._cache_path or self._centroids is None:
+            return
+        with open(self._cache_path, "w") as f:
+            json.dump({
+                "key": self._examples_key(),
+                "centroids": {
+                    label: {"seed": c["seed"].tolist(), "learned": c["learned"].tolist(),
+                            "learned_count": c["learned_count"]}
+                    for label, c in self._centroids.items()
+                },
+            }, f)
+
+    def flush(self) -> None:
+        """Write learned updates not yet saved."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def score(self, embedding: List[float]) -> Optional[float]:
+        """Cosine similarity to the medical centroid minus that to the non-medical one; None until trained."""
+        with self._lock:
+            if self._centroids is None:
+                return None
+            query = _unit(embedding)
+            medical = query @ _direction(self._centroids[GATE_MEDICAL])
+            non_medical = query @ _direction(self._centroids[GATE_NON_MEDICAL])
+            return float(medical - non_medical)
+
+    def classify(self, embedding: Optional[List[float]]) -> str:
+        if embedding is None:
+            return GATE_UNCERTAIN
+        try:
+            score = self.score(embedding)
+        except Exception as e:
+            print(f"Medical gate unavailable, deferring to the answer prompt: {e}")
+            return GATE_UNCERTAIN
+        if score is None:
+            return GATE_UNCERTAIN
+        if score > self.margin:
+            return GATE_MEDICAL
+        if score < -self.margin:
+            return GATE_NON_MEDICAL
+        return GATE_UNCERTAIN
+
+    def learn(self, embedding: List[float], is_medical: bool) -> None:
+        """Fold a labelled question into its centroid's learned part."""
+        with self._lock:
+            if self._centroids is None:
+                return
+            centroid = self._centroids[GATE_MEDICAL if is_medical else GATE_NON_MEDICAL]
+            if centroid["learned_count"] >= self.max_learned:
+                # Keep the learned weight fixed: older examples fade as new ones arrive
+                centroid["learned"] = centroid["learned"] * ((self.max_learned - 1) / self.max_learned)
+            else:
+                centroid["learned_count"] += 1
+            centroid["learned"] = centroid["learned"] + _unit(embedding)
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+
+def _centroid(embeddings: List[List[float]]) -> dict:
+    seed = np.sum([_unit(e) for e in embeddings], axis=0)
+    return {"seed": seed, "learned": np.zeros_like(seed), "learned_count": 0}
+
+
+def _direction(centroid: dict) -> np.ndarray:
+    return _unit(centroid["seed"] + centroid["learned"])
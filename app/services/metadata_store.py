@@ -0,0 +1,336 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    summary_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'session_summary',
+    text TEXT NOT NULL DEFAULT '',
+    topics TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL DEFAULT 'complete',
+    conversation TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_user_time ON summaries (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_summaries_session ON summaries (session_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_summaries_type_time ON summaries (type, timestamp);
+
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    user_id TEXT,
+    session_id TEXT,
+    type TEXT NOT NULL DEFAULT 'document',
+    namespace TEXT NOT NULL DEFAULT '',
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_fingerprint ON documents (fingerprint);
+CREATE INDEX IF NOT EXISTS idx_documents_user_time ON documents (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_documents_session ON documents (session_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_documents_type_time ON documents (type, timestamp);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL DEFAULT '',
+    document_id TEXT,
+    content_hash TEXT NOT NULL,
+    embed_model TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks (content_hash);
+
+CREATE TABLE IF NOT EXISTS index_versions (
+    base_name TEXT PRIMARY KEY,
+    index_name TEXT NOT NULL,
+    embed_model TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    activated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reembed_jobs (
+    target_index TEXT PRIMARY KEY,
+    base_name TEXT NOT NULL,
+    embed_model TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    source_index TEXT NOT NULL DEFAULT '',
+    source_model TEXT NOT NULL DEFAULT '',
+    source_dimension INTEGER NOT NULL DEFAULT 0,
+    last_rowid INTEGER NOT NULL DEFAULT 0,
+    migrated INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+    started_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+class MetadataStore:
+    """SQLite store for session summaries, ingested documents and the chunk manifest.
+
+    Listing and lookups go through indexed columns, so they never touch the
+    vector index or the embeddings API.
+    """
+
+    def __init__(self, db_path: str = ".metadata.db"):
+        self._db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+            self._conn.commit()
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a database was first created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(summaries)")}
+        if "status" not in columns:
+            self._conn.execute("ALTER TABLE summaries ADD COLUMN status TEXT NOT NULL DEFAULT 'complete'")
+        if "conversation" not in columns:
+            self._conn.execute("ALTER TABLE summaries ADD COLUMN conversation TEXT NOT NULL DEFAULT ''")
+        # Manifests created before texts moved to the chunk store keep them in a NOT NULL column;
+        # old rows are still read from it, new rows leave it empty
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        self._legacy_chunk_text = "text" in columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reembed_jobs)")}
+        if "source_index" not in columns:
+            self._conn.execute("ALTER TABLE reembed_jobs ADD COLUMN source_index TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("ALTER TABLE reembed_jobs ADD COLUMN source_model TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("ALTER TABLE reembed_jobs ADD COLUMN source_dimension INTEGER NOT NULL DEFAULT 0")
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            rows = cursor.fetchall()
+            self._conn.commit()
+            return rows
+
+    def _executemany(self, sql: str, rows: List[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany(sql, rows)
+            self._conn.commit()
+
+    # Session summaries
+
+    def add_summary(self, summary_id: str, user_id: str, session_id: str, text: str,
+                    topics: Optional[List[str]] = None, timestamp: Optional[datetime] = None,
+                    type: str = "session_summary", status: str = "complete", conversation: str = "") -> None:
+        """Record a summary; a pending one keeps its ``conversation`` until it is summarized."""
+        self._execute(
+            "INSERT OR REPLACE INTO summaries "
+            "(summary_id, user_id, session_id, type, text, topics, status, conversation, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (summary_id, user_id, session_id, type, text, json.dumps(topics or []), status, conversation,
+             (timestamp or datetime.now()).isoformat()),
+        )
+
+    def update_summary(self, summary_id: str, status: str, text: Optional[str] = None,
+                       topics: Optional[List[str]] = None) -> None:
+        """Set a summary's outcome; the stored conversation is dropped once it is no longer pending."""
+        self._execute(
+            "UPDATE summaries SET status = ?, text = COALESCE(?, text), topics = COALESCE(?, topics), "
+            "conversation = CASE WHEN ? = 'pending' THEN conversation ELSE '' END "
+            "WHERE summary_id = ?",
+            (status, text, json.dumps(topics) if topics is not None else None, status, summary_id),
+        )
+
+    def list_pending_summaries(self) -> List[dict]:
+        """Summaries still waiting to be generated, oldest first (e.g. queued before a restart)."""
+        rows = self._execute("SELECT * FROM summaries WHERE status = 'pending' ORDER BY timestamp")
+        return [self._summary_row(row) for row in rows]
+
+    def list_summaries(self, user_id: str, session_id: Optional[str] = None, limit: int = 10,
+                       offset: int = 0, type: str = "session_summary") -> List[dict]:
+        """Return a user's completed summaries, newest first."""
+        sql = "SELECT * FROM summaries WHERE user_id = ? AND type = ? AND status = 'complete'"
+        params: list = [user_id, type]
+        if session_id:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        return [self._summary_row(row) for row in self._execute(sql, tuple(params))]
+
+    def count_summaries(self, user_id: str, session_id: Optional[str] = None,
+                        type: str = "session_summary") -> int:
+        sql = "SELECT COUNT(*) FROM summaries WHERE user_id = ? AND type = ? AND status = 'complete'"
+        params: list = [user_id, type]
+        if session_id:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        return self._execute(sql, tuple(params))[0][0]
+
+    def get_summary(self, summary_id: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM summaries WHERE summary_id = ?", (summary_id,))
+        return self._summary_row(rows[0]) if rows else None
+
+    @staticmethod
+    def _summary_row(row: sqlite3.Row) -> dict:
+        record = dict(row)
+        record["topics"] = json.loads(record["topics"])
+        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+        return record
+
+    # Document records
+
+    def add_document_record(self, document_id: str, fingerprint: str, chunk_count: int,
+                            user_id: Optional[str] = None, session_id: Optional[str] = None,
+                            namespace: str = "", type: str = "document",
+                            timestamp: Optional[datetime] = None) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO documents "
+            "(document_id, fingerprint, user_id, session_id, type, namespace, chunk_count, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (document_id, fingerprint, user_id, session_id, type, namespace, chunk_count,
+             (timestamp or datetime.now()).isoformat()),
+        )
+
+    def has_fingerprint(self, fingerprint: str, namespace: Optional[str] = None) -> bool:
+        sql = "SELECT 1 FROM documents WHERE fingerprint = ?"
+        params: list = [fingerprint]
+        if namespace is not None:
+            sql += " AND namespace = ?"
+            params.append(namespace)
+        return bool(self._execute(sql + " LIMIT 1", tuple(params)))
+
+    def list_documents(self, user_id: Optional[str] = None, type: Optional[str] = None,
+                       limit: int = 50, offset: int = 0) -> List[dict]:
+        """Return document records, newest first."""
+        clauses, params = [], []
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if type:
+            clauses.append("type = ?")
+            params.append(type)
+        sql = "SELECT * FROM documents"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        return [dict(row) for row in self._execute(sql, tuple(params))]
+
+    # Chunk manifest: every chunk and the model its vector was made with, so the
+    # knowledge base can be re-embedded without the original files. Texts are not
+    # kept here; they live in the vector metadata and the chunk store.
+
+    def add_chunks(self, chunks: List[dict], replace: bool = True) -> None:
+        """Record chunks given as dicts with ``chunk_id``, ``namespace``, ``document_id``,
+        ``content_hash``, ``embed_model`` and ``metadata``."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        columns = "chunk_id, namespace, document_id, content_hash, embed_model, metadata, timestamp"
+        legacy = (", text", ", ''") if self._legacy_chunk_text else ("", "")
+        now = datetime.now().isoformat()
+        self._executemany(
+            f"{verb} INTO chunks ({columns}{legacy[0]}) VALUES (?, ?, ?, ?, ?, ?, ?{legacy[1]})",
+            [(c["chunk_id"], c.get("namespace", ""), c.get("document_id"), c["content_hash"], c["embed_model"],
+              json.dumps(c.get("metadata") or {}), now) for c in chunks],
+        )
+
+    def list_chunks(self, after_rowid: int = 0, limit: int = 100) -> List[dict]:
+        """Return manifest rows in insertion order, starting after ``after_rowid``.
+
+        Rows recorded by older versions still carry their ``text``.
+        """
+        rows = self._execute(
+            "SELECT rowid, * FROM chunks WHERE rowid > ? ORDER BY rowid LIMIT ?", (after_rowid, limit)
+        )
+        records = []
+        for row in rows:
+            record = dict(row)
+            record["metadata"] = json.loads(record["metadata"])
+            if not record.get("text"):
+                record.pop("text", None)
+            records.append(record)
+        return records
+
+    def move_chunks(self, chunk_ids: List[str], namespace: str) -> None:
+        """Record that chunks (and the documents they belong to) now live in ``namespace``."""
+        params = [(namespace, chunk_id) for chunk_id in chunk_ids]
+        self._executemany("UPDATE chunks SET namespace = ? WHERE chunk_id = ?", params)
+        self._executemany(
+            "UPDATE documents SET namespace = ? WHERE document_id IN "
+            "(SELECT document_id FROM chunks WHERE chunk_id = ?)", params
+        )
+
+    def count_chunks(self, embed_model: Optional[str] = None) -> int:
+        if embed_model:
+            return self._execute("SELECT COUNT(*) FROM chunks WHERE embed_model = ?", (embed_model,))[0][0]
+        return self._execute("SELECT COUNT(*) FROM chunks")[0][0]
+
+    def set_chunk_model(self, embed_model: str, max_rowid: Optional[int] = None) -> None:
+        if max_rowid is None:
+            self._execute("UPDATE chunks SET embed_model = ?", (embed_model,))
+        else:
+            self._execute("UPDATE chunks SET embed_model = ? WHERE rowid <= ?", (embed_model, max_rowid))
+
+    # Index versions and re-embedding jobs
+
+    def get_index_version(self, base_name: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM index_versions WHERE base_name = ?", (base_name,))
+        return dict(rows[0]) if rows else None
+
+    def set_index_version(self, base_name: str, index_name: str, embed_model: str, dimension: int) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO index_versions (base_name, index_name, embed_model, dimension, activated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (base_name, index_name, embed_model, dimension, datetime.now().isoformat()),
+        )
+
+    def get_reembed_job(self, target_index: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM reembed_jobs WHERE target_index = ?", (target_index,))
+        return dict(rows[0]) if rows else None
+
+    def latest_reembed_job(self, base_name: str) -> Optional[dict]:
+        rows = self._execute(
+            "SELECT * FROM reembed_jobs WHERE base_name = ? ORDER BY started_at DESC LIMIT 1", (base_name,)
+        )
+        return dict(rows[0]) if rows else None
+
+    def start_reembed_job(self, target_index: str, base_name: str, embed_model: str, dimension: int,
+                          source_index: str = "", source_model: str = "", source_dimension: int = 0) -> dict:
+        """Create a job record, or return the existing one so an interrupted run resumes.
+
+        The source index is kept so writes that land there after the flip can be caught up.
+        """
+        now = datetime.now().isoformat()
+        self._execute(
+            "INSERT OR IGNORE INTO reembed_jobs (target_index, base_name, embed_model, dimension, "
+            "source_index, source_model, source_dimension, started_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (target_index, base_name, embed_model, dimension, source_index, source_model, source_dimension,
+             now, now),
+        )
+        return self.get_reembed_job(target_index)
+
+    def update_reembed_job(self, target_index: str, last_rowid: Optional[int] = None,
+                           migrated: Optional[int] = None, status: Optional[str] = None) -> None:
+        self._execute(
+            "UPDATE reembed_jobs SET last_rowid = COALESCE(?, last_rowid), migrated = COALESCE(?, migrated), "
+            "status = COALESCE(?, status), updated_at = ? WHERE target_index = ?",
+            (last_rowid, migrated, status, datetime.now().isoformat(), target_index),
+        )
+
+
+_store: Optional[MetadataStore] = None
+_store_lock = threading.Lock()
+
+
+def get_metadata_store() -> MetadataStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MetadataStore(settings.METADATA_DB_PATH)
+        return _store
@@ -0,0 +1,180 @@
+import hashlib
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, Optional
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+
+# Pages render at their scan resolution, kept within what Tesseract reads well
+MIN_DPI = 150
+MAX_DPI = 400
+DEFAULT_DPI = 300
+
+_available: Optional[bool] = None
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Set in processes that are themselves pool workers, which must not start a pool of their own
+_inline = False
+
+
+def ocr_available() -> bool:
+    """True when OCR is enabled and pytesseract and the tesseract binary are installed."""
+    global _available
+    if _available is None:
+        _available = False
+        if settings.OCR_ENABLED:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                _available = True
+            except Exception as e:
+                print(f"OCR unavailable, scanned pages will be skipped: {e}")
+    return _available
+
+
+def run_inline() -> None:
+    """Process pool initializer: OCR in the worker itself instead of a nested pool."""
+    global _inline
+    _inline = True
+
+
+def _ocr_image(image_bytes: bytes, lang: str) -> str:
+    """Worker-process side: run Tesseract over one encoded image."""
+    import pytesseract
+    from PIL import Image
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return pytesseract.image_to_string(image, lang=lang)
+
+
+class OCRCache:
+    """Recognized text on disk, one file per page image hash."""
+
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self._path, key[:2], key + ".txt")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+_cache: Optional[OCRCache] = None
+
+
+def _get_cache() -> OCRCache:
+    global _cache
+    if _cache is None:
+        _cache = OCRCache(settings.OCR_CACHE_DIR)
+    return _cache
+
+
+def _submit(image_bytes: bytes) -> Future:
+    """OCR an image in the shared process pool, or inline after ``run_inline``."""
+    global _pool
+    if _inline:
+        # Bulk ingestion already extracts in worker processes; one pool per worker would oversubscribe
+        future = Future()
+        try:
+            future.set_result(_ocr_image(image_bytes, settings.OCR_LANG))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.OCR_WORKERS)
+        return _pool.submit(_ocr_image, image_bytes, settings.OCR_LANG)
+
+
+def _cached_ocr(image_bytes: bytes) -> Future:
+    key = hashlib.sha256(image_bytes).hexdigest()
+    text = _get_cache().get(key)
+    if text is not None:
+        future = Future()
+        future.set_result(text)
+        return future
+    future = _submit(image_bytes)
+
+    def store(done: Future) -> None:
+        if done.exception() is None:
+            _get_cache().put(key, done.result())
+
+    future.add_done_callback(store)
+    return future
+
+
+def page_dpi(page: fitz.Page) -> int:
+    """Render resolution matching the page's largest embedded image, clamped to MIN..MAX_DPI."""
+    best = 0.0
+    for info in page.get_image_info():
+        x0, _, x1, _ = info["bbox"]
+        if x1 > x0:
+            best = max(best, info["width"] / ((x1 - x0) / 72))
+    if not best:
+        return DEFAULT_DPI
+    return int(min(MAX_DPI, max(MIN_DPI, best)))
+
+
+def needs_ocr(page: fitz.Page, text: str) -> bool:
+    """A page without a text layer that shows at least one image."""
+    return not text.strip() and bool(page.get_images())
+
+
+def iter_pdf_text(file_path: str) -> Iterator[str]:
+    """Yield each page's text in order, OCR'ing text-less scanned pages when OCR is available.
+
+    Pages with a text layer are never rendered. Scanned pages are rendered
+    and queued to the OCR pool as soon as they are reached, with a bounded
+    number in flight, so text streams out while later pages are recognized.
+    """
+    use_ocr = ocr_available()
+    pending = deque()  # (text, future or None) in page order
+    window = max(1, settings.OCR_WORKERS) * 2
+    with fitz.open(file_path) as doc:
+        for page in doc:
+            text = page.get_text()
+            future = None
+            if use_ocr and needs_ocr(page, text):
+                pixmap = page.get_pixmap(dpi=page_dpi(page), colorspace=fitz.csGRAY)
+                future = _cached_ocr(pixmap.tobytes("png"))
+            pending.append((text, future))
+            while pending and (pending[0][1] is None or len(pending) > window):
+                yield _resolve(*pending.popleft())
+    while pending:
+        yield _resolve(*pending.popleft())
+
+
+def _resolve(text: str, future: Optional[Future]) -> str:
+    if future is None:
+        return text
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Error running OCR on page: {e}")
+        return text
+
+
+def ocr_image_file(file_path: str) -> str:
+    """Recognize text in an image file; empty when OCR is unavailable."""
+    if not ocr_available():
+        return ""
+    with open(file_path, "rb") as f:
+        return _resolve("", _cached_ocr(f.read()))
@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import openai
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Admission order when a model's budget is contended (lower goes first)."""
+    INTERACTIVE = 0  # a student is waiting on the answer (/tutor/ask)
+    GENERATION = 1   # quiz, flash cards, session summaries
+    BULK = 2         # knowledge-base ingestion and re-embedding
+
+
+# Requests and tokens per minute for each model; override with OPENAI_RATE_LIMITS,
+# e.g. '{"gpt-4o-mini": {"rpm": 500, "tpm": 200000}}'
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gpt-3.5-turbo": (3500, 160000),
+    "gpt-4o-mini": (5000, 2000000),
+    "text-embedding-3-small": (3000, 1000000),
+    "text-embedding-3-large": (3000, 1000000),
+}
+FALLBACK_LIMITS: Tuple[int, int] = (500, 200000)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for budgeting."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.limit = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken; requests larger than the bucket wait for a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def scale(self, factor: float) -> None:
+        """Adjust the refill rate, never above the configured limit or below 10% of it."""
+        per_minute = min(self.limit, max(self.limit * 0.1, self.rate * 60.0 * factor))
+        self.rate = per_minute / 60.0
+
+
+class ModelBudget:
+    def __init__(self, rpm: int, tpm: int, burst_seconds: float):
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+        self.paused_until = 0.0
+        self.waiters: list = []
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+
+
+class OpenAIGovernor:
+    """Token-bucket admission and retry policy shared by every OpenAI call.
+
+    Each model has request and token buckets sized from its per-minute quota.
+    Callers wait in a per-model priority queue, so interactive traffic is admitted
+    before bulk work. Rate-limit and transient errors are retried with jittered
+    exponential backoff (honouring Retry-After), and a 429 pauses the model and
+    lowers its admitted rate until calls succeed again.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None, burst_seconds: float = 10.0,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        self._limits = dict(DEFAULT_LIMITS)
+        self._limits.update(limits or {})
+        self._burst_seconds = burst_seconds
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._budgets: Dict[str, ModelBudget] = {}
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self.stats = {"admitted": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def _budget(self, model: str) -> ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, tpm = self._limits.get(model, FALLBACK_LIMITS)
+            budget = ModelBudget(rpm, tpm, self._burst_seconds)
+            self._budgets[model] = budget
+        return budget
+
+    def acquire(self, model: str, tokens: int, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Block until the model's budget admits a request of ``tokens`` at this priority."""
+        with self._cond:
+            budget = self._budget(model)
+            ticket = (int(priority), next(self._sequence))
+            heapq.heappush(budget.waiters, ticket)
+            try:
+                while True:
+                    if budget.waiters[0] == ticket:
+                        wait = budget.wait_time(tokens, time.monotonic())
+                        if wait <= 0:
+                            budget.requests.take(1)
+                            budget.tokens.take(tokens)
+                            self.stats["admitted"] += 1
+                            return
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                budget.waiters.remove(ticket)
+                heapq.heapify(budget.waiters)
+                self._cond.notify_all()
+
+    def _on_success(self, model: str) -> None:
+        with self._cond:
+            budget = self._budget(model)
+            budget.requests.scale(1.05)
+            budget.tokens.scale(1.05)
+
+    def _on_rate_limited(self, model: str, delay: float) -> None:
+        with self._cond:
+            self.stats["rate_limited"] += 1
+            budget = self._budget(model)
+            budget.paused_until = max(budget.paused_until, time.monotonic() + delay)
+            budget.requests.scale(0.8)
+            budget.tokens.scale(0.8)
+            budget.requests.tokens = min(budget.requests.tokens, 0)
+            self._cond.notify_all()
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter keeps retries from a burst from landing together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, model: str, tokens: int, fn: Callable[[], T], priority: Priority = Priority.INTERACTIVE) -> T:
+        """Run ``fn`` under the model's budget, retrying rate-limit and transient errors."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model, tokens, priority)
+            try:
+                result = fn()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    raise
+                delay = self._retry_delay(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    self._on_rate_limited(model, delay)
+                self.stats["retries"] += 1
+                print(f"OpenAI call to {model} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            self._on_success(model)
+            return result
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def _limits_from_env() -> Dict[str, Tuple[int, int]]:
+    raw = os.environ.get("OPENAI_RATE_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return {model: (int(v["rpm"]), int(v["tpm"])) for model, v in json.loads(raw).items()}
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring invalid OPENAI_RATE_LIMITS: {e}")
+        return {}
+
+
+governor = OpenAIGovernor(limits=_limits_from_env())
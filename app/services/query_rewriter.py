@@ -0,0 +1,142 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Tuple
+
+from app.core.timing import record_stage
+from app.services.completion_cache import CACHE_DETERMINISTIC
+from app.services.llm_client import chat_completion
+from app.services.openai_governor import Priority
+
+# Openers that introduce a follow-up on the previous topic ("what about X?")
+FOLLOW_UP_PREFIX = re.compile(
+    r"^\s*(?:and\s+)?(?:what|how)\s+about\s+|^\s*and\s+(?:what\s+of\s+)?|^\s*what\s+of\s+|^\s*same\s+for\s+",
+    re.IGNORECASE,
+)
+# Words that point back to something named earlier in the conversation
+ANAPHORA = {
+    "it", "its", "they", "them", "their", "theirs", "this", "that", "these", "those",
+    "he", "she", "him", "his", "her", "former", "latter", "above", "same",
+}
+WORD = re.compile(r"[a-z']+")
+
+METHOD_PASSTHROUGH = "passthrough"
+METHOD_HEURISTIC = "heuristic"
+METHOD_LLM = "llm"
+METHOD_FALLBACK = "fallback"
+
+
+class CondensedQuery:
+    def __init__(self, text: str, method: str, elapsed_ms: float, cached: bool = False):
+        self.text = text
+        self.method = method
+        self.elapsed_ms = elapsed_ms
+        self.cached = cached
+
+
+class QueryCondenser:
+    """Rewrite follow-up questions into standalone retrieval queries.
+
+    Self-contained questions pass through untouched. "What about X?" style
+    follow-ups are resolved locally against the topic of the previous
+    question, and only questions that lean on pronouns fall back to a short LLM
+    rewrite. A session's history keeps topics rather than condensed queries, so
+    a chain of follow-ups never nests. Results are memoized per
+    (session, turn) and timed as the ``query_condense`` stage.
+    """
+
+    def __init__(self, model: str = "gpt-3.5-turbo", max_cached: int = 4096, history_size: int = 3,
+                 max_sessions: int = 4096):
+        self._model = model
+        self.max_cached = max_cached
+        self.max_sessions = max_sessions
+        self._cache: "OrderedDict[Tuple[str, int, str], CondensedQuery]" = OrderedDict()
+        # session_id -> recent standalone topics, newest last; least recently asked sessions dropped first
+        self._history: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self.stats = {METHOD_PASSTHROUGH: 0, METHOD_HEURISTIC: 0, METHOD_LLM: 0, METHOD_FALLBACK: 0, "cache_hits": 0}
+
+    def condense(self, session_id: str, question: str, turn: int, context: str = "") -> CondensedQuery:
+        """Return a standalone version of ``question`` for retrieval.
+
+        ``turn`` is the question's position in the session and ``context`` an
+        optional rendering of the recent conversation used by the LLM rewrite.
+        """
+        key = (session_id, turn, question)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return CondensedQuery(cached.text, cached.method, 0.0, cached=True)
+            history = list(self._history.get(session_id, ()))
+
+        start = time.perf_counter()
+        text, method, topic = self._rewrite(question, history, context)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        record_stage("query_condense", elapsed_ms)
+        result = CondensedQuery(text, method, elapsed_ms)
+
+        with self._lock:
+            self.stats[method] += 1
+            self._cache[key] = result
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+            self._history.setdefault(session_id, deque(maxlen=self._history_size)).append(topic)
+            self._history.move_to_end(session_id)
+            while len(self._history) > self.max_sessions:
+                self._history.popitem(last=False)
+        return result
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._history.pop(session_id, None)
+
+    def _rewrite(self, question: str, history: list, context: str) -> Tuple[str, str, str]:
+        """Return ``(query, method, topic)``; ``topic`` is what later follow-ups attach to."""
+        if not history:
+            return question, METHOD_PASSTHROUGH, question
+        previous = history[-1]
+        prefix = FOLLOW_UP_PREFIX.match(question)
+        remainder = question[prefix.end():] if prefix else question
+        remainder = remainder.strip().rstrip("?").strip()
+        if ANAPHORA.intersection(WORD.findall(remainder.lower())):
+            # Pronouns need the conversation to resolve
+            return self._llm_rewrite(question, history, context)
+        if prefix:
+            # "What about treatment options?" -> attach the previous topic, which stays current
+            return f"{remainder} ({previous.rstrip('?')})", METHOD_HEURISTIC, previous
+        return question, METHOD_PASSTHROUGH, question
+
+    def _llm_rewrite(self, question: str, history: list, context: str) -> Tuple[str, str, str]:
+        earlier = "\n".join(f"- {q}" for q in history)
+        conversation = f"Recent conversation:\n{context[-1500:]}\n\n" if context else ""
+        prompt = (
+            f"Rewrite the student's follow-up question as a single standalone question that can be understood "
+            f"without the conversation. Resolve pronouns to the topics they refer to. Return only the question.\n\n"
+            f"Earlier questions:\n{earlier}\n\n"
+            f"{conversation}"
+            f"Follow-up question: {question}\n\n"
+            f"Standalone question:"
+        )
+        try:
+            response = chat_completion(
+                model=self._model,
+                priority=Priority.INTERACTIVE,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=60,
+                temperature=0,
+                cache=CACHE_DETERMINISTIC,
+            )
+            text = response.choices[0].message.content.strip().strip('"')
+            if text:
+                return text, METHOD_LLM, text
+        except Exception as e:
+            print(f"Error condensing follow-up question: {e}")
+        return f"{question} ({history[-1].rstrip('?')})", METHOD_FALLBACK, history[-1]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
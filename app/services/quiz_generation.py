@@ -1,18 +1,20 @@
-def generate_flash_cards(prompt: str, num_cards: int = 10) -> list:
+def generate_flash_cards(prompt: str, num_cards: int = 10, cache: str = None) -> list:
     """
     Generate flash cards using OpenAI. Each card is a dict with 'Question' and 'Answer' (short answer).
+    Pass ``cache="reuse"`` to accept cards generated earlier for the same prompt.
     """
-    client = openai.OpenAI()
     flash_prompt = (
         prompt +
         f" Generate {num_cards} flash cards. Each should be a JSON object with keys 'Question' and 'Answer' (answer must be short). Return a JSON array."
         "\nExample: [\n  {\"Question\": \"What is the capital of France?\", \"Answer\": \"Paris\"}\n]"
     )
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="gpt-3.5-turbo",
+        priority=Priority.GENERATION,
         messages=[{"role": "user", "content": flash_prompt}],
         max_tokens=1024,
         temperature=0.7,
+        cache=cache,
     )
     text = response.choices[0].message.content
     import json
@@ -27,18 +29,20 @@ def generate_flash_cards(prompt: str, num_cards: int = 10) -> list:
             cards = []
     return cards
 
-import openai
 import os
-from typing import List
+from typing import Iterator, List, Optional
 from dotenv import load_dotenv
+from app.services.json_stream import JSONArrayStream
+from app.services.llm_client import chat_completion, stream_chat_completion
+from app.services.openai_governor import Priority
 
 # Load environment variables from .env file
 load_dotenv()
 
 import json
 
-def generate_quiz_questions(context: str, num_questions: int = 5, difficulty: str = "basic", qtype: str = "mcq") -> List[dict]:
-    prompt = f"""
+def _quiz_prompt(context: str, num_questions: int, difficulty: str) -> str:
+    return f"""
     You are a medical quiz generator. Based on the following context, generate {num_questions} {difficulty} multiple choice questions (MCQ) with 4 options each and the correct answer.\nContext:\n{context}\n
     Return the result as a JSON array, where each question is an object with the following keys:\n
     - question: the question text\n    - options: a list of 4 options (a, b, c, d)\n    - answer: the correct option letter (e.g., 'c')\n    - explanation: a short explanation for the answer\n
@@ -51,12 +55,19 @@ def generate_quiz_questions(context: str, num_questions: int = 5, difficulty: st
       }}
     ]
     """
-    client = openai.OpenAI()
-    response = client.chat.completions.create(
+
+
+def generate_quiz_questions(context: str, num_questions: int = 5, difficulty: str = "basic", qtype: str = "mcq",
+                            cache: Optional[str] = None) -> List[dict]:
+    """Generate a quiz; pass ``cache="reuse"`` to accept one generated earlier for the same context."""
+    prompt = _quiz_prompt(context, num_questions, difficulty)
+    response = chat_completion(
         model="gpt-3.5-turbo",
+        priority=Priority.GENERATION,
         messages=[{"role": "user", "content": prompt}],
         max_tokens=2048,
         temperature=0.7,
+        cache=cache,
     )
     # Parse response as JSON
     text = response.choices[0].message.content
@@ -71,3 +82,41 @@ def generate_quiz_questions(context: str, num_questions: int = 5, difficulty: st
         else:
             raise ValueError("Could not parse quiz questions as JSON.")
     return questions
+
+
+def is_valid_question(question) -> bool:
+    """A complete MCQ: question text, four options and an answer."""
+    return (
+        isinstance(question, dict)
+        and isinstance(question.get("question"), str) and question["question"].strip() != ""
+        and isinstance(question.get("options"), list) and len(question["options"]) == 4
+        and isinstance(question.get("answer"), str) and question["answer"].strip() != ""
+    )
+
+
+def stream_quiz_questions(context: str, num_questions: int = 5, difficulty: str = "basic",
+                          qtype: str = "mcq") -> Iterator[dict]:
+    """Yield quiz questions one by one as the model finishes writing each of them."""
+    parser = JSONArrayStream()
+    deltas = stream_chat_completion(
+        model="gpt-3.5-turbo",
+        priority=Priority.GENERATION,
+        messages=[{"role": "user", "content": _quiz_prompt(context, num_questions, difficulty)}],
+        max_tokens=2048,
+        temperature=0.7,
+    )
+    count = 0
+    try:
+        for delta in deltas:
+            for question in parser.feed(delta):
+                if not is_valid_question(question):
+                    print(f"Skipping incomplete quiz question: {question}")
+                    continue
+                yield question
+                count += 1
+                if count >= num_questions:
+                    return
+            if parser.done:
+                return
+    finally:
+        deltas.close()
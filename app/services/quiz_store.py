@@ -0,0 +1,250 @@
+import atexit
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import orjson
+
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # optional; JSON is used otherwise
+    msgpack = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    quiz_id TEXT PRIMARY KEY,
+    encoding TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class StoredQuiz:
+    def __init__(self, quiz_id: str, questions: List[dict], generating: bool = False):
+        self.quiz_id = quiz_id
+        self.questions = questions
+        self.generating = generating
+        # Bumped on every change; the response cache keys serialized payloads on it
+        self.revision = 0
+        self.last_access = time.monotonic()
+
+
+def encode_questions(questions: List[dict]) -> tuple:
+    """Encode questions compactly: each field name is stored once, questions as value rows.
+
+    Returns ``(encoding, payload)`` with msgpack when it is installed.
+    """
+    keys: List[str] = []
+    for question in questions:
+        for key in question:
+            if key not in keys:
+                keys.append(key)
+    missing = object()
+    rows = [[question.get(key, missing) for key in keys] for question in questions]
+    # Absent fields become null plus a bitmask, so they are not restored as explicit None
+    document = {
+        "k": keys,
+        "r": [[None if v is missing else v for v in row] for row in rows],
+        "m": [sum(1 << i for i, v in enumerate(row) if v is missing) for row in rows],
+    }
+    if msgpack is not None:
+        return "msgpack", msgpack.packb(document, use_bin_type=True)
+    return "json", orjson.dumps(document)
+
+
+def decode_questions(encoding: str, payload: bytes) -> List[dict]:
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("quiz was stored with msgpack, which is not installed")
+        document = msgpack.unpackb(payload, raw=False)
+    else:
+        document = orjson.loads(payload)
+    keys = document["k"]
+    return [
+        {key: value for i, (key, value) in enumerate(zip(keys, row)) if not mask & (1 << i)}
+        for row, mask in zip(document["r"], document["m"])
+    ]
+
+
+class QuizRepository:
+    """Generated quizzes: a bounded in-memory LRU over a SQLite file.
+
+    Quizzes not read for ``ttl`` seconds, and the least recently used beyond
+    ``capacity``, are dropped from memory (never while still generating) and
+    loaded back from disk on their next read. Writes are buffered and flushed
+    in batches by a background thread every ``flush_interval`` seconds, so
+    requests never wait for the disk.
+    """
+
+    def __init__(self, db_path: str = ".quizzes.db", capacity: int = 512, ttl: float = 3600.0,
+                 flush_interval: float = 0.5):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._quizzes: "OrderedDict[str, StoredQuiz]" = OrderedDict()
+        # Quizzes changed since the last flush; also serves reads of evicted ones until written
+        self._dirty: Dict[str, StoredQuiz] = {}
+        # Taken out of ``_dirty`` by a flush that has not committed yet
+        self._flushing: Dict[str, StoredQuiz] = {}
+        self._deleted = set()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self.stats = {"hits": 0, "cold_loads": 0, "misses": 0, "evictions": 0, "flushed": 0}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._db_lock:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self._worker = threading.Thread(target=self._run, name="quiz-store", daemon=True)
+        self._worker.start()
+
+    def create(self, quiz_id: str, questions: List[dict], generating: bool = False) -> StoredQuiz:
+        quiz = StoredQuiz(quiz_id, questions, generating)
+        with self._lock:
+            self._deleted.discard(quiz_id)
+            self._quizzes[quiz_id] = quiz
+            self._mark_dirty(quiz)
+            self._evict()
+        return quiz
+
+    def append(self, quiz_id: str, question: dict) -> None:
+        with self._lock:
+            quiz = self._quizzes.get(quiz_id)
+            if quiz is None:
+                return
+            quiz.questions.append(question)
+            self._mark_dirty(quiz)
+
+    def finish(self, quiz_id: str) -> None:
+        """Mark a streamed quiz complete, so it can be evicted like any other."""
+        with self._lock:
+            quiz = self._quizzes.get(quiz_id)
+            if quiz is not None:
+                quiz.generating = False
+                self._mark_dirty(quiz)
+
+    def delete(self, quiz_id: str) -> None:
+        with self._lock:
+            self._quizzes.pop(quiz_id, None)
+            self._dirty.pop(quiz_id, None)
+            self._flushing.pop(quiz_id, None)
+            self._deleted.add(quiz_id)
+        self._wake.set()
+
+    def get(self, quiz_id: str) -> Optional[StoredQuiz]:
+        with self._lock:
+            quiz = self._quizzes.get(quiz_id) or self._dirty.get(quiz_id) or self._flushing.get(quiz_id)
+            if quiz is not None:
+                self._touch(quiz)
+                self.stats["hits"] += 1
+                return quiz
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT encoding, payload FROM quizzes WHERE quiz_id = ?", (quiz_id,)
+            ).fetchone()
+        with self._lock:
+            if row is None or quiz_id in self._deleted:
+                self.stats["misses"] += 1
+                return None
+            # A concurrent reader may have loaded it first; keep that copy
+            quiz = self._quizzes.get(quiz_id)
+            if quiz is None:
+                quiz = StoredQuiz(quiz_id, decode_questions(row[0], row[1]))
+                self.stats["cold_loads"] += 1
+            self._touch(quiz)
+            self._evict()
+            return quiz
+
+    def flush(self) -> None:
+        """Write buffered changes to disk."""
+        with self._db_lock:
+            with self._lock:
+                self._flushing, self._dirty = self._dirty, {}
+                dirty = [(quiz.quiz_id, *encode_questions(list(quiz.questions))) for quiz in self._flushing.values()]
+                deleted = list(self._deleted)
+                self._deleted.clear()
+            try:
+                if dirty or deleted:
+                    now = time.time()
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO quizzes (quiz_id, encoding, payload, updated_at) VALUES (?, ?, ?, ?)",
+                        [(quiz_id, encoding, payload, now) for quiz_id, encoding, payload in dirty],
+                    )
+                    self._conn.executemany("DELETE FROM quizzes WHERE quiz_id = ?", [(quiz_id,) for quiz_id in deleted])
+                    self._conn.commit()
+            except Exception:
+                with self._lock:
+                    # Keep the changes for the next attempt, unless they were superseded meanwhile
+                    for quiz_id, quiz in self._flushing.items():
+                        self._dirty.setdefault(quiz_id, quiz)
+                    self._deleted.update(deleted)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+            with self._lock:
+                self.stats["flushed"] += len(dirty)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self.stats, "in_memory": len(self._quizzes), "pending_writes": len(self._dirty)}
+
+    def _mark_dirty(self, quiz: StoredQuiz) -> None:
+        quiz.revision += 1
+        self._touch(quiz)
+        self._dirty[quiz.quiz_id] = quiz
+        self._wake.set()
+
+    def _touch(self, quiz: StoredQuiz) -> None:
+        quiz.last_access = time.monotonic()
+        self._quizzes[quiz.quiz_id] = quiz
+        self._quizzes.move_to_end(quiz.quiz_id)
+
+    def _evict(self) -> None:
+        # Least recently read first, so idle quizzes are all at the front
+        expired_before = time.monotonic() - self.ttl
+        for quiz_id, quiz in list(self._quizzes.items()):
+            if len(self._quizzes) <= self.capacity and quiz.last_access >= expired_before:
+                break
+            if quiz.generating:
+                continue
+            del self._quizzes[quiz_id]
+            self.stats["evictions"] += 1
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            # Let a burst of writes (e.g. a streamed quiz) collect into one transaction
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                with self._lock:
+                    self._evict()
+            except Exception as e:
+                print(f"Error flushing quiz store: {e}")
+
+
+_repository: Optional[QuizRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_quiz_repository() -> QuizRepository:
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = QuizRepository(
+                settings.QUIZ_DB_PATH,
+                capacity=settings.QUIZ_CACHE_SIZE,
+                ttl=settings.QUIZ_CACHE_TTL,
+            )
+            # Buffered writes would otherwise be lost on a clean shutdown
+            atexit.register(_repository.flush)
+        return _repository
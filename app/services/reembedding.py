@@ -0,0 +1,213 @@
+import argparse
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.services.openai_governor import Priority
+from app.services.rag_pipeline_pinecone import (
+    IndexVersion,
+    RAGPipelinePinecone,
+    content_hash,
+    embedding_dimension,
+    versioned_index_name,
+)
+
+JOB_RUNNING = "running"
+JOB_COMPLETE = "complete"
+JOB_FAILED = "failed"
+
+
+class ReembeddingJob:
+    """Migrate a knowledge base to a new embedding model without re-extracting files.
+
+    Chunks are read from the metadata store's manifest in insertion order,
+    embedded with the target model and upserted into a shadow index. The last
+    migrated manifest row is checkpointed after every batch, so an interrupted
+    run picks up where it stopped. Once the shadow index has caught up, writes
+    are paused briefly, the remaining rows are copied and reads flip to the new
+    index in one step. Other processes keep writing to the old index until they
+    see the flip, so after ``INDEX_VERSION_TTL`` the rows they added are copied
+    too; running the job again once the new index is active repeats that
+    catch-up. The old index is left in place for rollback.
+    """
+
+    def __init__(self, rag: RAGPipelinePinecone, embed_model: str, dimension: int = 0, batch_size: int = 100):
+        self._rag = rag
+        self._store = rag._metadata_store
+        self.embed_model = embed_model
+        self.dimension = embedding_dimension(embed_model, dimension)
+        self.batch_size = batch_size
+        self.target_index = versioned_index_name(rag.index_name, embed_model, self.dimension)
+
+    def run(self) -> dict:
+        active = self._rag._active()
+        if active.embed_model == self.embed_model and active.dimension == self.dimension:
+            return self._catch_up_active(active)
+
+        job = self._store.get_reembed_job(self.target_index)
+        if job is None:
+            # Vectors stored before the manifest existed are only known to the index
+            self.backfill_manifest(active)
+            job = self._store.start_reembed_job(
+                self.target_index, self._rag.index_name, self.embed_model, self.dimension,
+                source_index=active.index_name, source_model=active.embed_model, source_dimension=active.dimension,
+            )
+        elif job["status"] != JOB_RUNNING:
+            self._store.update_reembed_job(self.target_index, status=JOB_RUNNING)
+        shadow = self._rag.open_version(self.target_index, self.embed_model, self.dimension)
+        last_rowid, migrated = job["last_rowid"], job["migrated"]
+        print(f"Re-embedding {self._store.count_chunks()} chunks into {self.target_index}, resuming after row {last_rowid}")
+
+        try:
+            start = time.perf_counter()
+            last_rowid, migrated = self._copy(active, shadow, last_rowid, migrated)
+            # Catch up on chunks written meanwhile, then flip with writes held
+            with self._rag.write_lock:
+                last_rowid, migrated = self._copy(active, shadow, last_rowid, migrated)
+                self._rag.activate_version(shadow)
+                self._store.set_chunk_model(self.embed_model, max_rowid=last_rowid)
+            # Other processes write to the old index until they re-read the version record
+            time.sleep(settings.INDEX_VERSION_TTL)
+            last_rowid, migrated = self._copy(active, shadow, last_rowid, migrated)
+            self._store.set_chunk_model(self.embed_model, max_rowid=last_rowid)
+            self._store.update_reembed_job(self.target_index, status=JOB_COMPLETE)
+        except Exception as e:
+            self._store.update_reembed_job(self.target_index, status=JOB_FAILED)
+            checkpoint = self._store.get_reembed_job(self.target_index)["last_rowid"]
+            print(f"Re-embedding into {self.target_index} stopped after row {checkpoint}: {e}")
+            raise
+        elapsed = time.perf_counter() - start
+        print(f"Re-embedded {migrated} chunks into {self.target_index} in {elapsed:.1f}s; "
+              f"{active.index_name} can be deleted once the new index is verified")
+        return {"status": JOB_COMPLETE, "target_index": self.target_index, "migrated": migrated}
+
+    def _catch_up_active(self, active: IndexVersion) -> dict:
+        """Copy rows the old index received after the flip into the already active target."""
+        job = self._store.get_reembed_job(active.index_name)
+        if job is None or not job["source_index"]:
+            print(f"Index {active.index_name} already uses {self.embed_model}")
+            return {"status": JOB_COMPLETE, "target_index": active.index_name, "migrated": 0}
+        source = self._rag.open_version(job["source_index"], job["source_model"], job["source_dimension"])
+        before = job["migrated"]
+        last_rowid, migrated = self._copy(source, active, job["last_rowid"], before)
+        self._store.set_chunk_model(self.embed_model, max_rowid=last_rowid)
+        print(f"Caught up {migrated - before} chunks written to {source.index_name} after the flip")
+        return {"status": JOB_COMPLETE, "target_index": active.index_name, "migrated": migrated - before}
+
+    def _copy(self, source: IndexVersion, shadow: IndexVersion, last_rowid: int, migrated: int):
+        while True:
+            batch = self._store.list_chunks(after_rowid=last_rowid, limit=self.batch_size)
+            if not batch:
+                return last_rowid, migrated
+            rows = batch
+            if source.embed_model != self.embed_model:
+                # Rows written through the new version are already in the shadow index
+                rows = [row for row in batch if row["embed_model"] != self.embed_model]
+            texts = self._texts(source, rows) if rows else {}
+            copied = [row for row in rows if row["chunk_id"] in texts]
+            if len(copied) < len(rows):
+                print(f"Skipping {len(rows) - len(copied)} chunks whose text is no longer stored")
+            embeddings = self._rag._embed_texts(
+                [texts[r["chunk_id"]] for r in copied], priority=Priority.BULK, version=shadow
+            ) if copied else []
+            by_namespace = {}
+            for row, embedding in zip(copied, embeddings):
+                metadata = {**row["metadata"], "embed_model": self.embed_model, "text": texts[row["chunk_id"]]}
+                by_namespace.setdefault(row["namespace"], []).append((row["chunk_id"], embedding, metadata))
+            for namespace, vectors in by_namespace.items():
+                shadow.index.upsert(vectors=vectors, namespace=namespace)
+            last_rowid = batch[-1]["rowid"]
+            migrated += len(copied)
+            self._store.update_reembed_job(self.target_index, last_rowid=last_rowid, migrated=migrated)
+
+    def _texts(self, source: IndexVersion, rows: list) -> dict:
+        """chunk_id -> text from the chunk store, older manifest rows or the source vectors' metadata."""
+        chunk_store = self._rag._chunk_store
+        texts = chunk_store.get_many([r["chunk_id"] for r in rows])
+        recovered = {r["chunk_id"]: r["text"] for r in rows if r["chunk_id"] not in texts and r.get("text")}
+        by_namespace = {}
+        for row in rows:
+            if row["chunk_id"] not in texts and row["chunk_id"] not in recovered:
+                by_namespace.setdefault(row["namespace"], []).append(row["chunk_id"])
+        for namespace, ids in by_namespace.items():
+            for id, vector in source.index.fetch(ids=ids, namespace=namespace).vectors.items():
+                text = (vector.metadata or {}).get("text")
+                if text:
+                    recovered[id] = text
+        if recovered:
+            chunk_store.put_many(recovered.items())
+            texts.update(recovered)
+        return texts
+
+    def backfill_manifest(self, version: IndexVersion) -> int:
+        """Add vectors missing from the manifest, taking their text from metadata or the chunk store."""
+        added = 0
+        stats = version.index.describe_index_stats()
+        for namespace in (stats.namespaces or {}):
+            for ids in version.index.list(namespace=namespace, limit=self.batch_size):
+                fetched = version.index.fetch(ids=list(ids), namespace=namespace).vectors
+                chunks = []
+                for chunk_id, vector in fetched.items():
+                    metadata = dict(vector.metadata or {})
+                    text = metadata.pop("text", "") or self._rag._chunk_store.get(chunk_id) or ""
+                    if not text:
+                        continue
+                    metadata.pop("embed_model", None)
+                    metadata.setdefault("content_hash", content_hash(text))
+                    chunks.append({
+                        "chunk_id": chunk_id, "namespace": namespace, "document_id": metadata.get("fingerprint"),
+                        "content_hash": metadata["content_hash"], "embed_model": version.embed_model,
+                        "metadata": metadata,
+                    })
+                # Existing manifest rows keep their position and checkpoint
+                self._store.add_chunks(chunks, replace=False)
+                added += len(chunks)
+        print(f"Checked {version.index_name} for chunks missing from the manifest ({added} seen)")
+        return added
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_reembedding(rag: RAGPipelinePinecone, embed_model: str, dimension: int = 0) -> ReembeddingJob:
+    """Run a re-embedding job in a background thread; one per target index at a time."""
+    job = ReembeddingJob(rag, embed_model, dimension)
+    with _jobs_lock:
+        thread = _jobs.get(job.target_index)
+        if thread is not None and thread.is_alive():
+            return job
+        thread = threading.Thread(target=_run_logged, args=(job,), name="reembedding", daemon=True)
+        _jobs[job.target_index] = thread
+        thread.start()
+    return job
+
+
+def _run_logged(job: ReembeddingJob) -> None:
+    try:
+        job.run()
+    except Exception as e:
+        print(f"Error in re-embedding job: {e}")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-embed the knowledge base with a new embedding model.")
+    parser.add_argument("--model", default=settings.EMBED_MODEL, help="target embedding model")
+    parser.add_argument("--dimension", type=int, default=settings.EMBED_DIMENSION,
+                        help="target vector dimension (0 = the model's native size)")
+    parser.add_argument("--index", default="medical", help="knowledge base index name")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--migrate-user-namespaces", action="store_true",
+                        help="only move user vectors out of the shared namespace, then exit")
+    args = parser.parse_args(argv)
+    rag = RAGPipelinePinecone(index_name=args.index)
+    if args.migrate_user_namespaces:
+        rag.migrate_user_namespaces(batch_size=args.batch_size)
+        return
+    result = ReembeddingJob(rag, args.model, args.dimension, batch_size=args.batch_size).run()
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from app.services.completion_cache import CACHE_REUSE
+from app.services.llm_client import chat_completion
+from app.services.metadata_store import MetadataStore
+from app.services.openai_governor import Priority
+
+SUMMARY_PENDING = "pending"
+SUMMARY_COMPLETE = "complete"
+SUMMARY_FAILED = "failed"
+
+
+class SummaryPipeline:
+    """Background session summarization.
+
+    ``submit`` records a pending summary and returns its id immediately. A worker
+    thread collects queued sessions, produces each summary and its topics in one
+    structured chat call (several sessions in parallel), then embeds and upserts
+    the whole batch with a single embeddings request before marking the
+    summaries complete. A summary whose chat call fails is marked failed and
+    is neither embedded nor stored. The conversation is kept with the pending
+    row, so summaries still queued when the process stopped are queued again
+    on the next start.
+    """
+
+    def __init__(self, rag, metadata_store: MetadataStore, model: str = "gpt-3.5-turbo",
+                 max_batch: int = 16, max_wait: float = 0.5, max_workers: int = 4):
+        self._rag = rag
+        self._store = metadata_store
+        self._model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        self._listeners: List[Callable[[dict], None]] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session-summary")
+        self._requeue_pending()
+        self._worker = threading.Thread(target=self._run, name="summary-pipeline", daemon=True)
+        self._worker.start()
+
+    def submit(self, session_id: str, user_id: Optional[str], conversation_text: str) -> str:
+        """Queue a session for summarization and return the pending summary id."""
+        summary_id = f"summary_{session_id}_{uuid.uuid4().hex[:8]}"
+        self._store.add_summary(
+            summary_id=summary_id,
+            user_id=user_id or "",
+            session_id=session_id,
+            text="",
+            status=SUMMARY_PENDING,
+            conversation=conversation_text,
+        )
+        self._queue.put({
+            "summary_id": summary_id,
+            "session_id": session_id,
+            "user_id": user_id,
+            "conversation_text": conversation_text,
+        })
+        return summary_id
+
+    def _requeue_pending(self) -> None:
+        requeued = 0
+        for record in self._store.list_pending_summaries():
+            if not record["conversation"]:
+                # Queued before conversations were stored with the row; nothing to summarize
+                self._store.update_summary(record["summary_id"], SUMMARY_FAILED)
+                continue
+            self._queue.put({
+                "summary_id": record["summary_id"],
+                "session_id": record["session_id"],
+                "user_id": record["user_id"] or None,
+                "conversation_text": record["conversation"],
+            })
+            requeued += 1
+        if requeued:
+            print(f"Re-queued {requeued} pending session summaries")
+
+    def add_listener(self, callback: Callable[[dict], None]) -> None:
+        """Call ``callback(summary_record)`` whenever a summary completes."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def get_status(self, summary_id: str) -> Optional[dict]:
+        return self._store.get_summary(summary_id)
+
+    def _next_batch(self) -> List[dict]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"Error in summary pipeline: {e}")
+                for job in batch:
+                    self._store.update_summary(job["summary_id"], SUMMARY_FAILED)
+
+    def _process(self, batch: List[dict]) -> None:
+        results = list(self._executor.map(self._summarize, batch))
+        completed = []
+        records = []
+        for job, result in zip(batch, results):
+            if result is None:
+                self._store.update_summary(job["summary_id"], SUMMARY_FAILED)
+                continue
+            summary, topics = job["summary"], job["topics"] = result
+            completed.append(job)
+            if job["user_id"]:
+                records.append({
+                    "id": job["summary_id"],
+                    "text": summary,
+                    "metadata": {
+                        "user_id": job["user_id"],
+                        "session_id": job["session_id"],
+                        "timestamp": datetime.now().isoformat(),
+                        "is_summary": True,
+                        "summary_type": "session_summary",
+                        "topics": ",".join(topics),
+                    },
+                })
+        try:
+            if records:
+                self._rag.add_summaries(records)
+        except Exception as e:
+            # The summaries stay readable from the metadata store
+            print(f"Error storing session summaries in the vector index: {e}")
+        for job in completed:
+            self._store.update_summary(job["summary_id"], SUMMARY_COMPLETE, text=job["summary"], topics=job["topics"])
+            self._notify(job["summary_id"])
+        print(f"Stored {len(completed)} of {len(batch)} session summaries")
+
+    def _notify(self, summary_id: str) -> None:
+        if not self._listeners:
+            return
+        record = self._store.get_summary(summary_id)
+        for callback in self._listeners:
+            try:
+                callback(record)
+            except Exception as e:
+                print(f"Error in summary listener: {e}")
+
+    def _summarize(self, job: dict) -> Optional[Tuple[str, List[str]]]:
+        """Summary text and topics for a session, or None when generation fails."""
+        prompt = (
+            f"Below is a conversation between a medical student and an AI tutor. \n\n"
+            f"{job['conversation_text']}\n\n"
+            f"Return a JSON object with two keys:\n"
+            f"- \"summary\": a concise summary highlighting the main topics discussed, key questions asked "
+            f"by the student and important information provided by the tutor\n"
+            f"- \"topics\": a list of the 3-5 main medical topics discussed\n"
+        )
+        try:
+            response = chat_completion(
+                model=self._model,
+                priority=Priority.GENERATION,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=300,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+                cache=CACHE_REUSE,
+            )
+            return _parse_summary(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Error generating summary for {job['summary_id']}: {e}")
+            return None
+
+
+def _parse_summary(text: str) -> Tuple[str, List[str]]:
+    try:
+        data = json.loads(text)
+    except ValueError:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        data = json.loads(match.group(0)) if match else {"summary": text.strip()}
+    topics = data.get("topics") or []
+    if isinstance(topics, str):
+        topics = topics.split(",")
+    return str(data.get("summary", "")).strip(), [str(t).strip() for t in topics if str(t).strip()]
+
+
+_pipeline: Optional[SummaryPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_summary_pipeline(rag, metadata_store: MetadataStore) -> SummaryPipeline:
+    """Return the process-wide summary pipeline, creating it on first use."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = SummaryPipeline(rag, metadata_store)
+        return _pipeline
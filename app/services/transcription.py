@@ -0,0 +1,239 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+SAMPLE_RATE = 16000
+# Segments are cut in the middle of a silence close to the target length
+TARGET_SEGMENT_SECONDS = 30.0
+MAX_SEGMENT_SECONDS = 60.0
+SILENCE_NOISE = "-35dB"
+SILENCE_MIN_SECONDS = 0.4
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+# Approximate resident MB of one worker process with an int8 model loaded, by model family
+MODEL_MEMORY_MB = {"tiny": 250, "base": 350, "small": 700, "medium": 1600, "large": 3200}
+DEFAULT_MODEL_MEMORY_MB = 1600
+
+_available: Optional[bool] = None
+_model = None
+# One pool for every video, so each worker loads the model once per server rather than once per video
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Set in processes that are themselves pool workers, which must not start a pool of their own
+_inline = False
+
+
+class TranscriptSegment(NamedTuple):
+    start: float
+    end: float
+    text: str
+
+
+def transcription_available() -> bool:
+    """True when transcription is enabled and ffmpeg and faster-whisper are installed."""
+    global _available
+    if _available is None:
+        _available = False
+        if settings.TRANSCRIBE_ENABLED:
+            try:
+                import faster_whisper  # noqa: F401
+                if shutil.which("ffmpeg") is None:
+                    raise RuntimeError("ffmpeg not found on PATH")
+                _available = True
+            except Exception as e:
+                print(f"Video transcription unavailable: {e}")
+    return _available
+
+
+def demux_audio(video_path: str, wav_path: str) -> float:
+    """Extract mono 16 kHz PCM audio and return its duration in seconds."""
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", video_path,
+         "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-c:a", "pcm_s16le", wav_path],
+        check=True,
+    )
+    with wave.open(wav_path, "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+def detect_silences(wav_path: str) -> List[Tuple[float, float]]:
+    """Return (start, end) of silent stretches using ffmpeg's silencedetect filter."""
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "info", "-i", wav_path,
+         "-af", f"silencedetect=noise={SILENCE_NOISE}:d={SILENCE_MIN_SECONDS}", "-f", "null", "-"],
+        capture_output=True, text=True, check=True,
+    )
+    silences, start = [], None
+    for kind, value in _SILENCE_RE.findall(result.stderr):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+
+def plan_segments(duration: float, silences: List[Tuple[float, float]],
+                  target: float = TARGET_SEGMENT_SECONDS, maximum: float = MAX_SEGMENT_SECONDS) -> List[Tuple[float, float]]:
+    """Split ``[0, duration]`` at silences near ``target`` seconds, never exceeding ``maximum``."""
+    cuts = [(s + e) / 2 for s, e in silences]
+    segments, start = [], 0.0
+    while duration - start > maximum:
+        window = [c for c in cuts if start + target / 2 <= c <= start + maximum]
+        # The silence closest to the target length, or a hard cut if speech never pauses
+        cut = min(window, key=lambda c: abs(c - start - target)) if window else start + maximum
+        segments.append((start, cut))
+        start = cut
+    if duration > start:
+        segments.append((start, duration))
+    return segments
+
+
+def worker_count() -> int:
+    """TRANSCRIBE_WORKERS, lowered until every worker's model fits in TRANSCRIBE_MEMORY_MB."""
+    budget = settings.TRANSCRIBE_MEMORY_MB or _physical_memory_mb() // 2
+    if not budget:
+        return max(1, settings.TRANSCRIBE_WORKERS)
+    family = settings.WHISPER_MODEL.split("/")[-1].split("-")[0].split(".")[0]
+    per_worker = MODEL_MEMORY_MB.get(family, DEFAULT_MODEL_MEMORY_MB)
+    return max(1, min(settings.TRANSCRIBE_WORKERS, budget // per_worker))
+
+
+def _physical_memory_mb() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 0  # unknown; don't cap
+
+
+def run_inline() -> None:
+    """Process pool initializer: transcribe in the worker itself instead of a nested pool."""
+    global _inline
+    _inline = True
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = worker_count()
+            print(f"Starting {workers} transcription workers with {settings.WHISPER_MODEL}")
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_load_model)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died (e.g. killed for memory) so the next video starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _load_model() -> None:
+    """Worker-process initializer: load the Whisper model once per process."""
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(settings.WHISPER_MODEL, device="cpu", compute_type=settings.WHISPER_COMPUTE_TYPE,
+                          cpu_threads=settings.WHISPER_CPU_THREADS)
+
+
+def _transcribe_segment(wav_path: str, start: float, end: float) -> List[TranscriptSegment]:
+    """Worker-process side: transcribe one slice of the audio with absolute timestamps."""
+    with wave.open(wav_path, "rb") as w:
+        w.setpos(int(start * SAMPLE_RATE))
+        frames = w.readframes(int((end - start) * SAMPLE_RATE))
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    pieces, _ = _model.transcribe(audio, language=settings.WHISPER_LANGUAGE or None, beam_size=1,
+                                  vad_filter=False, condition_on_previous_text=False)
+    return [TranscriptSegment(start + p.start, start + p.end, p.text.strip()) for p in pieces if p.text.strip()]
+
+
+def iter_transcript(video_path: str,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Iterator[TranscriptSegment]:
+    """Yield timestamped transcript segments of a video in order.
+
+    Audio is split on silences into segments of about TARGET_SEGMENT_SECONDS,
+    which are transcribed in parallel by the shared pool of ``worker_count()``
+    processes (or one by one after ``run_inline``). Segments are yielded as
+    soon as every earlier one is done. ``progress(done, total)`` is called
+    after each finished segment.
+    """
+    with tempfile.TemporaryDirectory(prefix="transcribe-") as tmp:
+        wav_path = os.path.join(tmp, "audio.wav")
+        duration = demux_audio(video_path, wav_path)
+        segments = plan_segments(duration, detect_silences(wav_path))
+        print(f"Transcribing {duration:.0f}s of audio in {len(segments)} segments")
+        if progress:
+            progress(0, len(segments))
+        if _inline:
+            if _model is None:
+                _load_model()
+            for done, (start, end) in enumerate(segments, 1):
+                pieces = _transcribe_segment(wav_path, start, end)
+                if progress:
+                    progress(done, len(segments))
+                yield from pieces
+            return
+        pool = _get_pool()
+        pending = deque(pool.submit(_transcribe_segment, wav_path, s, e) for s, e in segments)
+        done = 0
+        try:
+            while pending:
+                pieces = pending.popleft().result()
+                done += 1
+                if progress:
+                    progress(done, len(segments))
+                yield from pieces
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+        finally:
+            # A failed or abandoned video leaves the shared workers to the next one
+            for future in pending:
+                future.cancel()
+
+
+def transcript_chunks(segments: List[TranscriptSegment], max_length: int = 500) -> Tuple[List[str], List[dict]]:
+    """Group transcript segments into chunks of about ``max_length`` characters.
+
+    Returns the chunk texts and, per chunk, metadata with the start and end
+    time in seconds of the speech it covers.
+    """
+    chunks, metadata = [], []
+    texts, start, end, length = [], 0.0, 0.0, 0
+    for segment in segments:
+        if texts and length + len(segment.text) + 1 > max_length:
+            chunks.append(" ".join(texts))
+            metadata.append({"start_seconds": round(start, 2), "end_seconds": round(end, 2)})
+            texts, length = [], 0
+        if not texts:
+            start = segment.start
+        texts.append(segment.text)
+        end = segment.end
+        length += len(segment.text) + 1
+    if texts:
+        chunks.append(" ".join(texts))
+        metadata.append({"start_seconds": round(start, 2), "end_seconds": round(end, 2)})
+    return chunks, metadata
+
+
+def transcribe_video(video_path: str, progress: Optional[Callable[[int, int], None]] = None) -> List[TranscriptSegment]:
+    """All transcript segments of a video; empty when transcription is unavailable."""
+    if not transcription_available():
+        return []
+    return list(iter_transcript(video_path, progress))
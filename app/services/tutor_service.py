@@ -1,321 +1,297 @@
-import os
+import asyncio
+import contextvars
+import threading
+import time
 import uuid
-from typing import Tuple, List, Optional
-from datetime import datetime
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.http_cache import get_response_cache
+from app.core.timing import stage
+from app.services.conversation_memory import RollingConversationMemory
+from app.services.llm_client import chat_completion
+from app.services.medical_gate import GATE_MEDICAL, GATE_NON_MEDICAL, MedicalQuestionGate
+from app.services.metadata_store import get_metadata_store
+from app.services.openai_governor import Priority
+from app.services.query_rewriter import QueryCondenser
 from app.services.rag_pipeline_pinecone import RAGPipelinePinecone
-from openai import OpenAI
-from app.schemas.tutor import ConversationExchange, SessionSummary
+from app.services.summary_pipeline import get_summary_pipeline
+from app.services.user_profile_cache import get_user_profile_cache
+
+OFF_TOPIC_ANSWER = ("This appears to be outside my medical focus. I specialize "
+                    "in medical topics like anatomy, physiology, pathology, pharmacology, and other "
+                    "healthcare subjects. What medical concept can I help you understand?")
+# Marker the answering model emits when the gate left the decision to it
+NOT_MEDICAL_MARKER = "NOT_MEDICAL"
+# Questions without a user id are filed under this one; it has no profile of its own
+ANONYMOUS_USER = "anonymous"
+
 
 class MedicalAITutorService:
-    def __init__(self):
-        self.rag = RAGPipelinePinecone(index_name="medical")
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        self.model = "gpt-3.5-turbo"  # Default model
-        # Dictionary to store active sessions with their conversation history
-        # Format: {session_id: {"user_id": user_id, "conversations": [ConversationExchange], "start_time": datetime, "last_activity": datetime}}
-        self.active_sessions = {}
-        # Maximum number of exchanges to keep in memory for context
-        self.max_context_exchanges = 3
-
-    def answer_question(self, question: str, user_id: str = None, session_id: str = None) -> tuple[str, str, bool]:
-        # Check if this is a new session or continuing session
+    def __init__(self, rag_pipeline: RAGPipelinePinecone, model: str = "gpt-4o-mini"):
+        self.rag = rag_pipeline
+        self.model = model
+        # session_id -> deque of (role, message)
+        self.memory = defaultdict(lambda: deque(maxlen=10))  # keep last 10 messages
+        # session_id -> revision of its history; never reused, so cached responses can't go stale
+        self.history_revisions = {}
+        self._revision_counter = count(1)
+        # Bounded prompt context: recent turns verbatim, older ones summarized
+        self.prompt_memory = RollingConversationMemory(
+            recent_token_budget=settings.CONVERSATION_RECENT_TOKENS, model=model
+        )
+        # session_id -> user_id, so ending a session can file the summary under its user
+        self.session_users = {}
+        # session_id -> number of questions asked; keys the condensed-query cache
+        self.turns = defaultdict(int)
+        # session_id -> time of its last message, least recently active first. Sessions idle
+        # for session_ttl seconds, or beyond session_capacity, are dropped without a summary
+        self._sessions: "OrderedDict[str, float]" = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self.session_capacity = settings.TUTOR_SESSION_CACHE_SIZE
+        self.session_ttl = settings.TUTOR_SESSION_TTL
+        # Rewrites follow-ups ("what about treatment?") into standalone retrieval queries
+        self.query_condenser = QueryCondenser(model=model, max_sessions=settings.TUTOR_SESSION_CACHE_SIZE)
+        self.summary_pipeline = get_summary_pipeline(rag_pipeline, get_metadata_store())
+        # Returning-user context, kept current as sessions are summarized
+        self.profile_cache = get_user_profile_cache()
+        self.summary_pipeline.add_listener(self.profile_cache.record_summary)
+        # Local classifier over the question embedding; replaces a YES/NO chat call
+        self.medical_gate = self._build_medical_gate()
+
+    def _build_medical_gate(self) -> MedicalQuestionGate:
+        return MedicalQuestionGate(
+            lambda texts: self.rag._embed_texts(texts, priority=Priority.GENERATION),
+            model=self.rag._embed_model,
+            cache_path=settings.MEDICAL_GATE_CACHE,
+            margin=settings.MEDICAL_GATE_MARGIN
+        )
+
+    def answer_question(self, question: str, user_id: str, session_id: str = None) -> Tuple[str, str, bool]:
+        """Blocking wrapper around ``answer_question_async`` for scripts and threadpool callers."""
+        coroutine = self.answer_question_async(question, user_id=user_id, session_id=session_id)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # asyncio.run can't nest inside a running loop; give the graph a loop of its own
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
+
+    async def answer_question_async(self, question: str, user_id: str,
+                                    session_id: str = None) -> Tuple[str, str, bool]:
+        """Answer a question, running independent stages of the request concurrently.
+
+        The stages form a small dependency graph::
+
+            history -> condense -> embed -+-> gate -----+
+                                          +-> retrieve -+-> generate
+            profile ------------------------------------+
+
+        An embedding of the raw question is started speculatively with the
+        history and profile lookups. When condensing rewrites the question,
+        retrieval searches with both the rewrite and the raw question and
+        merges the results; otherwise the speculative vector is all it needs.
+        The gate judges the final embedding, generation starts once retrieval
+        and the profile are in, and a gate rejection cancels whatever is pending.
+        Every stage is timed, so the ``answer`` stage can be compared with the
+        critical path.
+        """
         is_new_session = False
         if not session_id:
-            # Generate new session ID for new conversation
-            session_id = f"session_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            session_id = str(uuid.uuid4())
             is_new_session = True
-        elif session_id not in self.active_sessions:
-            # Session ID provided but not found in active sessions
-            is_new_session = True
-        
-        # Initialize or update session data
-        current_time = datetime.now()
-        if is_new_session:
-            # Create new session
-            self.active_sessions[session_id] = {
-                "user_id": user_id,
-                "conversations": [],
-                "start_time": current_time,
-                "last_activity": current_time
-            }
-            # Check if returning user - get previous session summaries
-            user_context = ""
-            if user_id:
-                # Try to retrieve previous session summaries for this user
-                previous_summaries = self.get_session_summaries(user_id, limit=2)
-                if previous_summaries:
-                    user_context = "Previous session topics: " + ", ".join([s.text for s in previous_summaries])
-        else:
-            # Update existing session's last activity time
-            self.active_sessions[session_id]["last_activity"] = current_time
-        
-        # Retrieve relevant context from vector DB
-        print(f"Processing question: {question}")
-        if user_id:
-            print(f"User ID: {user_id}, Session ID: {session_id}")
-        
-        # Retrieve medical knowledge from shared knowledge base (no user filter)
-        medical_context_chunks = self.rag.retrieve(question, top_k=5)
-        
-        # Get conversation history for context
-        conversation_context = ""
-        if session_id in self.active_sessions and self.active_sessions[session_id]["conversations"]:
-            # Get the last few exchanges for context
-            recent_exchanges = self.active_sessions[session_id]["conversations"][-self.max_context_exchanges:]
-            if recent_exchanges:
-                conversation_context = "\nRecent conversation:\n"
-                for i, exchange in enumerate(recent_exchanges):
-                    conversation_context += f"Student: {exchange.question}\nTutor: {exchange.answer}\n"
-        
-        # Combine medical knowledge with user conversation context
-        context_chunks = medical_context_chunks
-        
-        # First, check if this is a medical-related question
-        medical_check_prompt = (
-            f"Determine if the following question is related to medical topics, healthcare, anatomy, physiology, "
-            f"pathology, pharmacology, or any medical education content. Answer with 'YES' if medical-related, 'NO' if not.\n\n"
-            f"Question: {question}\n\n"
-            f"Answer (YES/NO):"
-        )
-        
-        medical_response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": medical_check_prompt}],
-            max_tokens=10,
-            temperature=0.1,
-        )
-        
-        is_medical = medical_response.choices[0].message.content.strip().upper().startswith('YES')
-        
-        if not is_medical:
-            answer = ("This appears to be outside my medical focus. I specialize "
-                     "in medical topics like anatomy, physiology, pathology, pharmacology, and other "
-                     "healthcare subjects. What medical concept can I help you understand?")
-            
-            return answer, session_id
-        
-        # If it's medical but no context found
-        if not context_chunks:
-            answer = ("This is a medical topic I can help with, but "
-                     "I don't have specific information about this in my current knowledge base. "
-                     "What specific aspect would you like to explore? "
-                     "If you have relevant medical documents, you can upload them to enhance my knowledge.")
-            
-            return answer, session_id
-        
-        context = "\n".join(context_chunks)
-        print(f"Retrieved {len(context_chunks)} medical knowledge chunks for answering")
-        
-        # Build context description
-        context_description = "Context from medical literature (shared knowledge base):\n"
-        
-        # Build personalized context for the user
-        user_style_info = ""
-        
-        if user_id:
-            user_context = f"This is a conversation with user {user_id}. "
-        
-        prompt = (
-            f"You are a medical tutor having a natural conversation with a medical student. "
-            f"You're knowledgeable and focused on providing accurate information. "
-            f"{user_context}{user_style_info}"
-            f"Important instructions:\n"
-            f"1. Use the medical knowledge from the shared knowledge base to answer medical questions\n"
-            f"2. Use the user's conversation history ONLY for conversational context and continuity\n"
-            f"3. If the medical knowledge doesn't contain enough information, "
-            f"acknowledge this and explain what specific information is missing\n"
-            f"4. Never make assumptions or add information beyond what's in the medical knowledge\n"
-            f"5. Be conversational but direct - use natural language without unnecessary enthusiasm or greetings\n"
-            f"6. If the medical knowledge is relevant but incomplete, provide what information you can\n"
-            f"7. Answer directly - avoid phrases like 'Based on the information provided' or 'According to the context'\n"
-            f"8. Present the medical information clearly and professionally\n"
-            f"9. If you see previous conversations in the context, reference them naturally to provide continuity\n"
-            f"10. If this is a follow-up question, maintain context from the previous exchanges\n"
-            f"10. Avoid overused phrases like 'That's a great question!' or 'That's interesting!'\n"
-            f"11. Keep responses focused on the medical content without unnecessary commentary\n\n"
-            f"{context_description}{context}\n\n"
-            f"{conversation_context}\n"
-            f"Student's Question: {question}\n\n"
-            f"Tutor's Response (use medical knowledge + conversational context):"
-        )
-        
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500,  # Increased for more conversational responses
-            temperature=0.7,  # Higher temperature for more natural, varied responses
-        )
-        
-        answer = response.choices[0].message.content.strip()
-        
-        # Store the conversation exchange
-        if session_id in self.active_sessions:
-            exchange = ConversationExchange(
-                question=question,
-                answer=answer,
-                timestamp=datetime.now()
+
+        # Store user message in memory
+        self._remember(session_id, "user", question)
+        self.session_users[session_id] = user_id
+        turn = self.turns[session_id]
+        self.turns[session_id] += 1
+
+        if self.medical_gate.model != self.rag._embed_model:
+            # The knowledge base was re-embedded; retrain the centroids for the new model
+            self.medical_gate = self._build_medical_gate()
+
+        with stage("answer"):
+            pending = []
+
+            def start(name, fn, *args):
+                task = asyncio.create_task(_run_stage(name, fn, *args))
+                pending.append(task)
+                return task
+
+            # Independent roots of the graph start together
+            speculative_embedding = start("embed_query", self._embed_or_none, question)
+            profile = None
+            if is_new_session and user_id and user_id != ANONYMOUS_USER:
+                # Returning users get their previous session summaries from the profile cache
+                profile = start("user_context", lambda: self.profile_cache.get(user_id).context_line())
+            # Previous turns; the question itself is added to the prompt below
+            conversation_context = await _run_stage("history", self.prompt_memory.render, session_id)
+
+            # Follow-ups are rewritten into standalone queries before they are embedded
+            condensed = await asyncio.to_thread(
+                lambda: self.query_condenser.condense(session_id, question, turn, context=conversation_context)
             )
-            self.active_sessions[session_id]["conversations"].append(exchange)
-        
+            retrieval_query = condensed.text
+            if retrieval_query != question:
+                print(f"Condensed query ({condensed.method}, {condensed.elapsed_ms:.1f}ms): {retrieval_query}")
+                query_embedding = await _run_stage("embed_query", self._embed_or_none, retrieval_query)
+                # The raw question still finds what the rewrite may have dropped
+                queries = [retrieval_query, question]
+                embeddings = [query_embedding, await speculative_embedding]
+            else:
+                query_embedding = await speculative_embedding
+                queries, embeddings = [question], [query_embedding]
+
+            # Embedded once; the medical gate and the retrieval both reuse these vectors.
+            # The shared corpus is always searched, next to the user's own partition for this session
+            owner = user_id if user_id and user_id != ANONYMOUS_USER else None
+            retrieval = start("retrieve", lambda: [item["text"] for item in self.rag.retrieve_many(
+                queries, top_k=5, user_id=owner, session_id=session_id if owner else None,
+                embeddings=embeddings, include_shared=True
+            )[:5]])
+            with stage("medical_gate"):
+                gate = self.medical_gate.classify(query_embedding)
+            if gate == GATE_NON_MEDICAL:
+                _cancel(pending)
+                self._remember(session_id, "assistant", OFF_TOPIC_ANSWER)
+                return OFF_TOPIC_ANSWER, session_id, is_new_session
+
+            retrieved_chunks = await retrieval
+            user_context = await profile if profile is not None else ""
+            prompt = self._build_prompt(question, user_context, gate, retrieved_chunks, conversation_context)
+            response = await _run_stage("generate", lambda: chat_completion(
+                model=self.model,
+                messages=[{"role": "system", "content": prompt}],
+                priority=Priority.INTERACTIVE
+            ))
+
+        answer = response.choices[0].message.content
+        if gate != GATE_MEDICAL:
+            is_medical = not answer.strip().startswith(NOT_MEDICAL_MARKER)
+            if query_embedding is not None:
+                # The model's verdict becomes another training example for the gate
+                self.medical_gate.learn(query_embedding, is_medical)
+            if not is_medical:
+                answer = OFF_TOPIC_ANSWER
+
+        # Store the exchange in memory
+        self._remember(session_id, "assistant", answer)
+        self.prompt_memory.add_turn(session_id, "user", question)
+        self.prompt_memory.add_turn(session_id, "assistant", answer)
+
         return answer, session_id, is_new_session
-    
-    def get_conversation_history(self, session_id: str) -> List[ConversationExchange]:
-        """Retrieve conversation history for a specific session"""
-        if session_id in self.active_sessions:
-            return self.active_sessions[session_id]["conversations"]
-        return []
-    
-    def end_session(self, session_id: str) -> Tuple[str, Optional[str]]:
-        """End a session and generate a summary"""
-        if session_id not in self.active_sessions:
-            return "error", "Session not found"
-        
-        # Get the conversation history
-        conversations = self.active_sessions[session_id]["conversations"]
-        if not conversations:
-            return "ended", "No conversation to summarize"
-        
-        # Generate a summary of the conversation
-        summary = self._generate_session_summary(session_id, conversations)
-        
-        # Store the summary in Pinecone for future reference
-        self._store_session_summary(session_id, summary)
-        
-        # Remove the session from active sessions
-        user_id = self.active_sessions[session_id]["user_id"]
-        del self.active_sessions[session_id]
-        
-        return "ended", summary
-    
-    def _generate_session_summary(self, session_id: str, conversations: List[ConversationExchange]) -> str:
-        """Generate a summary of the conversation using OpenAI"""
-        # Prepare the conversation text for summarization
-        conversation_text = ""
-        for exchange in conversations:
-            conversation_text += f"Student: {exchange.question}\nTutor: {exchange.answer}\n\n"
-        
-        # Create a prompt for summarization
-        prompt = (
-            f"Below is a conversation between a medical student and an AI tutor. \n\n"
-            f"{conversation_text}\n\n"
-            f"Please provide a concise summary of this conversation, highlighting:\n"
-            f"1. The main topics discussed\n"
-            f"2. Key questions asked by the student\n"
-            f"3. Important information provided by the tutor\n\n"
-            f"Summary:"
-        )
-        
-        # Generate summary using OpenAI
+
+    def _remember(self, session_id: str, role: str, message: str) -> None:
+        self._touch_session(session_id)
+        self.memory[session_id].append((role, message))
+        self.history_revisions[session_id] = next(self._revision_counter)
+
+    def _touch_session(self, session_id: str) -> None:
+        now = time.monotonic()
+        expired = []
+        with self._sessions_lock:
+            self._sessions[session_id] = now
+            self._sessions.move_to_end(session_id)
+            # Least recently active first, so idle sessions are all at the front
+            for idle_id, last_active in self._sessions.items():
+                over_capacity = len(self._sessions) - len(expired) > self.session_capacity
+                if idle_id == session_id or (not over_capacity and now - last_active < self.session_ttl):
+                    break
+                expired.append(idle_id)
+            for idle_id in expired:
+                del self._sessions[idle_id]
+        for idle_id in expired:
+            self._forget_session(idle_id)
+
+    def _forget_session(self, session_id: str) -> None:
+        self.memory.pop(session_id, None)
+        self.history_revisions.pop(session_id, None)
+        get_response_cache().invalidate(("history", session_id))
+        self.prompt_memory.clear(session_id)
+        self.session_users.pop(session_id, None)
+        self.turns.pop(session_id, None)
+        self.query_condenser.forget(session_id)
+
+    def _embed_or_none(self, text: str) -> Optional[List[float]]:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.5,
-            )
-            
-            return response.choices[0].message.content.strip()
+            return self.rag.embed_query(text)
         except Exception as e:
-            print(f"Error generating summary: {e}")
-            return "Session ended. Summary generation failed."
-    
-    def _store_session_summary(self, session_id: str, summary_text: str) -> None:
-        """Store the session summary in Pinecone for future reference"""
-        if session_id not in self.active_sessions:
-            return
-        
-        user_id = self.active_sessions[session_id]["user_id"]
-        if not user_id:
-            return
-        
-        # Extract topics from the summary
-        topics = self._extract_topics_from_summary(summary_text)
-        
-        # Create a SessionSummary object
-        summary = SessionSummary(
-            session_id=session_id,
-            user_id=user_id,
-            text=summary_text,
-            timestamp=datetime.now(),
-            topics=topics
-        )
-        
-        # Store the summary in Pinecone with special metadata
-        metadata = {
-            "user_id": user_id,
-            "session_id": session_id,
-            "timestamp": summary.timestamp.isoformat(),
-            "is_summary": True,
-            "summary_type": "session_summary",
-            "topics": ",".join(topics)
-        }
-        
-        # Add the summary to the vector database
-        self.rag.add_document(
-            text=summary_text,
-            metadata=metadata,
-            document_id=f"summary_{session_id}"
-        )
-    
-    def _extract_topics_from_summary(self, summary_text: str) -> List[str]:
-        """Extract main topics from the summary using OpenAI"""
-        prompt = (
-            f"Based on the following conversation summary, extract 3-5 main medical topics discussed. \n"
-            f"Return ONLY a comma-separated list of topics, with no additional text.\n\n"
-            f"Summary: {summary_text}\n\n"
-            f"Topics:"
-        )
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=50,
-                temperature=0.3,
+            print(f"Error embedding question: {e}")
+            return None
+
+    def _build_prompt(self, question: str, user_context: str, gate: str, retrieved_chunks: List[str],
+                      conversation_context: str) -> str:
+        print(f"Retrieved {len(retrieved_chunks)} medical knowledge chunks for answering")
+        # When the gate is unsure, the answering call decides in the same round trip
+        gate_rule = ""
+        if gate != GATE_MEDICAL:
+            gate_rule = (
+                f"- If the latest question is not related to medicine, healthcare or medical education, "
+                f"reply with exactly {NOT_MEDICAL_MARKER} and nothing else.\n"
             )
-            
-            topics_text = response.choices[0].message.content.strip()
-            return [topic.strip() for topic in topics_text.split(",") if topic.strip()]
-        except Exception as e:
-            print(f"Error extracting topics: {e}")
-            return ["medical"]
-    
-    def get_session_summaries(self, user_id: str, session_id: Optional[str] = None, limit: int = 10) -> List[SessionSummary]:
-        """Retrieve session summaries for a user from Pinecone"""
-        # Prepare the query to find summaries
-        query = f"session summaries for user {user_id}"
-        filter_dict = {
-            "user_id": user_id,
-            "is_summary": True,
-            "summary_type": "session_summary"
-        }
-        
-        if session_id:
-            filter_dict["session_id"] = session_id
-        
-        # Query Pinecone for summaries
-        results = self.rag.retrieve_with_filter(query, filter_dict, top_k=limit)
-        
-        # Convert results to SessionSummary objects
-        summaries = []
-        for text, metadata in results:
-            if not metadata:
-                continue
-                
-            try:
-                topics = metadata.get("topics", "").split(",") if metadata.get("topics") else []
-                timestamp_str = metadata.get("timestamp")
-                timestamp = datetime.fromisoformat(timestamp_str) if timestamp_str else datetime.now()
-                
-                summary = SessionSummary(
-                    session_id=metadata.get("session_id", ""),
-                    user_id=metadata.get("user_id", ""),
-                    text=text,
-                    timestamp=timestamp,
-                    topics=topics
-                )
-                summaries.append(summary)
-            except Exception as e:
-                print(f"Error parsing summary: {e}")
-        
-        return summaries
+        student_context = f"\nWhat you know about this student: {user_context.strip()}\n" if user_context else ""
+        return f"""
+You are a medical education tutor for a medical student. Follow these rules strictly:
+- Assume the user is a medical student, not a patient.
+- Be educational, concise, and clinically accurate. Explain reasoning and key differentials when relevant.
+- Ground answers ONLY in the retrieved knowledge and standard medical knowledge. If the answer is not supported by the retrieved context, say you don't know rather than guessing.
+- Do not provide personal medical advice. Frame content academically (e.g., epidemiology, pathophysiology, diagnostics, management frameworks).
+- Prefer structured outputs: bullets, short sections, stepwise reasoning.
+- If the user asks patient-like questions, respond with teaching content for students (e.g., red flags, diagnostic approach) instead of personalized guidance.
+{gate_rule}{student_context}
+Conversation so far:
+{conversation_context}
+
+Latest question:
+{question}
+
+Retrieved medical context:
+{retrieved_chunks}
+
+Now answer the latest question for a medical student audience.
+"""
+
+    def get_conversation_history(self, session_id: str) -> List[dict]:
+        """Return stored conversation history for a session."""
+        return [{"role": role, "message": msg} for role, msg in self.memory.get(session_id, [])]
+
+    def end_session(self, session_id: str, user_id: str = None) -> Tuple[str, str]:
+        """Queue the session for background summarization and clear its memory.
+
+        Returns ``("pending", summary_id)`` without waiting for the summary.
+        """
+        conversation = self.get_conversation_history(session_id)
+        if not conversation:
+            return "no_conversation", "No conversation history to summarize."
+
+        conversation_text = "\n".join(
+            f"{'Student' if turn['role'] == 'user' else 'Tutor'}: {turn['message']}" for turn in conversation
+        )
+        user_id = user_id or self.session_users.get(session_id)
+        summary_id = self.summary_pipeline.submit(session_id, user_id, conversation_text)
+
+        # Clear short-term memory
+        with self._sessions_lock:
+            self._sessions.pop(session_id, None)
+        self._forget_session(session_id)
+
+        return "pending", summary_id
+
+
+async def _run_stage(name: str, fn, *args):
+    """Run a blocking stage in a worker thread, timed under ``name`` for the current request."""
+    def timed():
+        with stage(name):
+            return fn(*args)
+    return await asyncio.to_thread(timed)
+
+
+def _cancel(tasks) -> None:
+    # Threads already running finish in the background; their results are dropped
+    for task in tasks:
+        task.cancel()
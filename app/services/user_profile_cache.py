@@ -0,0 +1,96 @@
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.metadata_store import MetadataStore, get_metadata_store
+
+
+class UserProfile:
+    """What the tutor knows about a returning user from earlier sessions."""
+
+    def __init__(self, user_id: str, summaries: List[dict], max_summaries: int):
+        self.user_id = user_id
+        self.max_summaries = max_summaries
+        # Newest first, as returned by the metadata store
+        self.summaries = summaries[:max_summaries]
+        # Topics across all loaded summaries, not just the ones quoted in the prompt
+        self.topic_counts = Counter(t for s in summaries for t in s.get("topics", []))
+
+    @property
+    def is_returning(self) -> bool:
+        return bool(self.summaries)
+
+    def context_line(self, max_topics: int = 5) -> str:
+        if not self.summaries:
+            return ""
+        line = "Previous sessions: " + "; ".join(s["text"] for s in self.summaries if s.get("text")) + " "
+        if self.topic_counts:
+            topics = [topic for topic, _ in self.topic_counts.most_common(max_topics)]
+            line += "Topics studied most often: " + ", ".join(topics) + ". "
+        return line
+
+    def add_summary(self, summary: dict) -> None:
+        self.summaries = ([summary] + self.summaries)[: self.max_summaries]
+        self.topic_counts.update(summary.get("topics", []))
+
+
+class UserProfileCache:
+    """Bounded LRU of user profiles backed by the metadata store.
+
+    A miss costs one indexed SQLite query; after that a returning user's context
+    is served from memory and kept current as their sessions are summarized.
+    """
+
+    def __init__(self, metadata_store: MetadataStore, capacity: int = 1024, max_summaries: int = 2,
+                 topic_history: int = 20):
+        self._store = metadata_store
+        self.capacity = capacity
+        self.max_summaries = max_summaries
+        # Summaries read on a miss to count topics; only max_summaries are quoted
+        self.topic_history = topic_history
+        self._profiles: "OrderedDict[str, UserProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> UserProfile:
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self._profiles.move_to_end(user_id)
+                return profile
+        summaries = self._store.list_summaries(user_id, limit=max(self.max_summaries, self.topic_history))
+        profile = UserProfile(user_id, summaries, self.max_summaries)
+        with self._lock:
+            # Another request may have loaded it meanwhile; keep the first copy
+            profile = self._profiles.setdefault(user_id, profile)
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+            return profile
+
+    def record_summary(self, summary: dict) -> None:
+        """Apply a newly completed session summary to the user's cached profile."""
+        user_id = summary.get("user_id")
+        if not user_id:
+            return
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                profile.add_summary(summary)
+        # Uncached users pick the summary up from the store on their next miss
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._profiles.pop(user_id, None)
+
+
+_cache: Optional[UserProfileCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_user_profile_cache() -> UserProfileCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = UserProfileCache(get_metadata_store(), capacity=settings.USER_PROFILE_CACHE_SIZE)
+        return _cache
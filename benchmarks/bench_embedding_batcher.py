@@ -0,0 +1,97 @@
+"""Throughput of query embeddings with and without micro-batching.
+
+Simulates concurrent ``/tutor/ask`` callers against a fake embeddings endpoint
+whose latency grows slightly with batch size and which only allows a fixed
+number of concurrent requests (a stand-in for the rate limit).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_embedding_batcher
+"""
+import argparse
+import random
+import threading
+import time
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self, base_latency_ms: float, per_input_ms: float, max_concurrency: int):
+        self.base_latency = base_latency_ms / 1000.0
+        self.per_input = per_input_ms / 1000.0
+        self._slots = threading.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def embed(self, texts):
+        with self._slots:
+            with self._lock:
+                self.calls += 1
+            time.sleep(self.base_latency + self.per_input * len(texts))
+        return [[float(len(t)), 0.0, 0.0] for t in texts]
+
+
+def run(window_ms: float, args) -> dict:
+    api = FakeEmbeddingsAPI(args.base_latency_ms, args.per_input_ms, args.api_concurrency)
+    batcher = EmbeddingBatcher(api.embed, max_wait_ms=window_ms, max_batch=args.max_batch) if window_ms > 0 else None
+    rng = random.Random(0)
+    # A share of questions repeat (popular topics), which exercises coalescing
+    questions = [f"question {rng.randint(0, args.distinct)}" for _ in range(args.requests)]
+    latencies = []
+    lock = threading.Lock()
+    cursor = iter(questions)
+
+    def worker():
+        while True:
+            with lock:
+                question = next(cursor, None)
+            if question is None:
+                return
+            start = time.perf_counter()
+            if batcher:
+                batcher.embed([question])
+            else:
+                api.embed([question])
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "window_ms": window_ms,
+        "throughput": len(questions) / elapsed,
+        "api_calls": api.calls,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "coalesced": batcher.stats["coalesced_texts"] if batcher else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--base-latency-ms", type=float, default=40.0)
+    parser.add_argument("--per-input-ms", type=float, default=0.2)
+    parser.add_argument("--api-concurrency", type=int, default=8)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 1, 2, 5, 10, 20])
+    args = parser.parse_args()
+
+    print(f"{'window_ms':>9} {'req/s':>9} {'api_calls':>9} {'p50_ms':>8} {'p99_ms':>8} {'coalesced':>9}")
+    for window in args.windows:
+        r = run(window, args)
+        print(f"{r['window_ms']:>9.1f} {r['throughput']:>9.1f} {r['api_calls']:>9} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['coalesced']:>9}")
+
+
+if __name__ == "__main__":
+    main()
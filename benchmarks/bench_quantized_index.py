@@ -0,0 +1,86 @@
+"""Recall, memory and query throughput of the local index per quantization mode.
+
+Builds persisted local indexes over synthetic clustered embeddings (a stand-in
+for topic-clustered chunk embeddings) and compares each mode's top-k against
+exact float32 search.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_quantized_index
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.local_vector_index import LocalVectorIndex
+
+
+def make_corpus(args):
+    rng = np.random.default_rng(args.seed)
+    centroids = rng.normal(size=(args.clusters, args.dimension)).astype(np.float32)
+    labels = rng.integers(0, args.clusters, size=args.vectors)
+    vectors = centroids[labels] + args.spread * rng.normal(size=(args.vectors, args.dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Queries are noisy copies of stored vectors, like paraphrased questions
+    picks = rng.integers(0, args.vectors, size=args.queries)
+    queries = vectors[picks] + args.query_noise * rng.normal(size=(args.queries, args.dimension)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries
+
+
+def exact_top_k(vectors, queries, k):
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def run(mode: str, vectors, queries, truth, args) -> dict:
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(args.dimension, path, quantization=mode, rescore_factor=args.rescore_factor)
+        for i in range(0, len(vectors), args.upsert_batch):
+            index.upsert([(str(j), vectors[j], {}) for j in range(i, min(i + args.upsert_batch, len(vectors)))])
+        # Warm the page cache for the on-disk full-precision rows
+        for query in queries[:10]:
+            index.query(query, top_k=args.k)
+        hits = 0
+        start = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            result = index.query(query, top_k=args.k)
+            hits += len({int(m.id) for m in result.matches} & expected)
+        elapsed = time.perf_counter() - start
+        return {
+            "mode": mode,
+            "memory_mb": index.memory_usage() / 2**20,
+            "qps": len(queries) / elapsed,
+            "recall": hits / (len(queries) * args.k),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-noise", type=float, default=0.02)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=0, help="0 uses the per-mode default")
+    parser.add_argument("--upsert-batch", type=int, default=5000)
+    parser.add_argument("--modes", nargs="+", default=["none", "int8", "binary"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors, queries = make_corpus(args)
+    truth = exact_top_k(vectors, queries, args.k)
+    print(f"{args.vectors} vectors x {args.dimension} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'mode':>8} {'memory_mb':>10} {'qps':>9} {'recall':>8}")
+    for mode in args.modes:
+        r = run(mode, vectors, queries, truth, args)
+        print(f"{r['mode']:>8} {r['memory_mb']:>10.1f} {r['qps']:>9.1f} {r['recall']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
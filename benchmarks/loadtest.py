@@ -0,0 +1,371 @@
+"""Load test of the API with a realistic mix of tutor, quiz, flash card and upload traffic.
+
+By default the app is started in-process on a free port, wired to the local
+vector index, temporary stores and a fake OpenAI client with fixed latencies,
+so runs measure this code rather than the network or the model and stay
+comparable across commits. Arrivals are open-loop (Poisson) per scenario:
+
+- tutor: a session of several ``/tutor/ask`` turns (follow-ups after a think
+  time), then ``/tutor/end-session`` with some probability
+- quiz: ``/generate-quiz/`` with a generated lecture file
+- flashcard: ``/flash-card/`` with a generated lecture file
+- upload: ``/tutor/upload-knowledge`` with a new document
+
+The report has throughput, error rate and latency percentiles per endpoint,
+plus per-stage times taken from the ``Server-Timing`` response header. Run
+from the repository root:
+
+    python -m benchmarks.loadtest --duration 60 --tutor-rate 5 --output results.json
+    python -m benchmarks.loadtest --compare results.json   # deltas against an earlier run
+
+Pass ``--url`` to drive an already running server instead (no fakes).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+TOPICS = [
+    "heart failure", "diabetic ketoacidosis", "nephrotic syndrome", "asthma", "sepsis",
+    "hypothyroidism", "pulmonary embolism", "cirrhosis", "stroke", "anemia",
+    "pneumonia", "myocardial infarction", "acute kidney injury", "COPD", "meningitis",
+]
+OPENERS = ["What is the pathophysiology of {}?", "How is {} diagnosed?", "Explain the management of {}."]
+FOLLOW_UPS = [
+    "What about its complications?", "Why does that happen?", "How is it treated in children?",
+    "What are the red flags?", "Can you compare it with {}?", "What labs would you order?",
+]
+VOCABULARY = (
+    "patient presents with acute onset dyspnea tachycardia hypotension renal hepatic cardiac "
+    "pulmonary infection inflammation treatment diagnosis differential chronic insulin glucose "
+    "sodium potassium creatinine lactate imaging biopsy antibiotic steroid prognosis mortality"
+).split()
+EMBED_DIMENSION = 1536
+
+
+class FakeOpenAI:
+    """Stand-in for the OpenAI client with fixed latencies and well-formed outputs."""
+
+    def __init__(self, chat_latency_ms: float, embed_latency_ms: float, seed: int):
+        self.chat_latency = chat_latency_ms / 1000.0
+        self.embed_latency = embed_latency_ms / 1000.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _jitter(self, base: float) -> float:
+        with self._lock:
+            return base * self._rng.uniform(0.75, 1.25)
+
+    def _embed(self, model, input, dimensions=None, **kwargs):
+        import numpy as np
+        time.sleep(self._jitter(self.embed_latency))
+        data = []
+        for text in input:
+            seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(dimensions or EMBED_DIMENSION, dtype=np.float32)
+            data.append(SimpleNamespace(embedding=vector.tolist()))
+        tokens = sum(len(t) // 4 for t in input)
+        return SimpleNamespace(data=data, usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens))
+
+    def _chat(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        time.sleep(self._jitter(self.chat_latency))
+        json_mode = kwargs.get("response_format", {}).get("type") == "json_object"
+        if json_mode and '"summary"' in prompt:
+            content = json.dumps({"summary": " ".join(self._rng.choice(VOCABULARY) for _ in range(60)),
+                                  "topics": self._rng.sample(TOPICS, 3)})
+        elif json_mode:
+            count = int((re.search(r"Generate (\d+) flash", prompt) or [0, 5])[1])
+            content = json.dumps({"cards": [
+                {"Question": f"Card {i} on {hashlib.md5(prompt.encode()).hexdigest()[:6]}?", "Answer": "Answer"}
+                for i in range(count)
+            ]})
+        elif "quiz generator" in prompt:
+            count = int((re.search(r"generate (\d+)", prompt) or [0, 5])[1])
+            content = json.dumps([
+                {"question": f"Question {i}?", "options": ["a.One", "b.Two", "c.Three", "d.Four"],
+                 "answer": "a", "explanation": "Because."}
+                for i in range(count)
+            ])
+        elif "flash cards" in prompt:
+            content = json.dumps([{"Question": f"Card {i}?", "Answer": "Answer"} for i in range(10)])
+        else:
+            content = " ".join(self._rng.choice(VOCABULARY) for _ in range(120))
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4,
+                                total_tokens=(len(prompt) + len(content)) // 4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def start_local_server(args) -> str:
+    """Start the app on a free port with local backends and the fake client; return its URL."""
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ.update({
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_DIR": "",
+        "METADATA_DB_PATH": os.path.join(workdir, "metadata.db"),
+        "CHUNK_STORE_DIR": os.path.join(workdir, "chunks"),
+        "MEDICAL_GATE_CACHE": os.path.join(workdir, "medical_gate.json"),
+        "OCR_CACHE_DIR": os.path.join(workdir, "ocr"),
+        "COMPLETION_CACHE_PATH": os.path.join(workdir, "completions.db"),
+        "QUIZ_DB_PATH": os.path.join(workdir, "quizzes.db"),
+        "OPENAI_API_KEY": "loadtest",
+        # The load generator stands in for a frontend forwarding each student's X-User-ID
+        "ADMISSION_TRUSTED_PROXIES": "127.0.0.1",
+    })
+    if not args.keep_rate_limits:
+        # Measure the app, not the production quotas
+        unlimited = {"rpm": 10**7, "tpm": 10**10}
+        os.environ["OPENAI_RATE_LIMITS"] = json.dumps(
+            {m: unlimited for m in ("gpt-4o-mini", "gpt-3.5-turbo", "text-embedding-3-small", "text-embedding-3-large")}
+        )
+
+    from app.services import llm_client
+    llm_client.set_openai_client(FakeOpenAI(args.chat_latency_ms, args.embed_latency_ms, args.seed))
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="loadtest-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def lecture_file(rng: random.Random, words: int, tag: str):
+    text = "\n".join(
+        " ".join(rng.choice(VOCABULARY) for _ in range(12)) for _ in range(words // 12)
+    )
+    return ("lecture.csv", f"notes\n{tag}\n{text}".encode(), "text/csv")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.stages = defaultdict(lambda: defaultdict(list))
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, client, endpoint: str, method: str, url: str, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except Exception as e:
+            response, status = None, type(e).__name__
+        finally:
+            self.in_flight -= 1
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        self.statuses[endpoint][status] += 1
+        if response is not None:
+            for entry in response.headers.get("server-timing", "").split(","):
+                name, _, duration = entry.strip().partition(";dur=")
+                if duration:
+                    self.stages[endpoint][name].append(float(duration))
+        return response
+
+
+async def tutor_session(client, recorder: Recorder, rng: random.Random, args):
+    user_id = f"student-{rng.randrange(args.users)}"
+    topic = rng.choice(TOPICS)
+    session_id = None
+    for turn in range(rng.randint(args.min_turns, args.max_turns)):
+        if turn:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+            question = rng.choice(FOLLOW_UPS).format(rng.choice(TOPICS))
+        else:
+            question = rng.choice(OPENERS).format(topic)
+        response = await recorder.request(client, "tutor_ask", "POST", "/tutor/ask", json={
+            "question": question, "user_id": user_id, "session_id": session_id,
+        }, headers=_user_header(user_id))
+        if response is None or response.status_code != 200:
+            return
+        session_id = response.json()["session_id"]
+    if rng.random() < args.end_session_prob:
+        await recorder.request(client, "tutor_end_session", "POST", "/tutor/end-session",
+                               params={"session_id": session_id, "user_id": user_id},
+                               headers=_user_header(user_id))
+
+
+async def quiz_request(client, recorder, rng, args):
+    await recorder.request(client, "generate_quiz", "POST", "/generate-quiz/",
+                           files=[("files", lecture_file(rng, args.document_words, f"quiz {rng.random()}"))],
+                           data={"query": rng.choice(TOPICS), "num_questions": "5"},
+                           headers=_user_header(f"student-{rng.randrange(args.users)}"))
+
+
+async def flashcard_request(client, recorder, rng, args):
+    await recorder.request(client, "flash_card", "POST", "/flash-card/", params={"num_cards": 10},
+                           files={"file": lecture_file(rng, args.document_words, f"cards {rng.random()}")},
+                           headers=_user_header(f"student-{rng.randrange(args.users)}"))
+
+
+async def upload_request(client, recorder, rng, args):
+    await recorder.request(client, "upload_knowledge", "POST", "/tutor/upload-knowledge",
+                           files={"file": lecture_file(rng, args.document_words, f"upload {rng.random()}")},
+                           headers=_user_header(f"student-{rng.randrange(args.users)}"))
+
+
+def _user_header(user_id: str) -> dict:
+    # Admission control queues fairly per user; all simulated users share one (trusted) address
+    return {"X-User-ID": user_id}
+
+
+async def arrivals(rate: float, scenario, client, recorder, rng, args, tasks: list):
+    if rate <= 0:
+        return
+    deadline = time.perf_counter() + args.duration
+    while True:
+        await asyncio.sleep(rng.expovariate(rate))
+        if time.perf_counter() >= deadline:
+            return
+        tasks.append(asyncio.create_task(scenario(client, recorder, random.Random(rng.random()), args)))
+
+
+async def drive(url: str, args) -> tuple:
+    import httpx
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    tasks: list = []
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            arrivals(args.tutor_rate, tutor_session, client, recorder, random.Random(rng.random()), args, tasks),
+            arrivals(args.quiz_rate, quiz_request, client, recorder, random.Random(rng.random()), args, tasks),
+            arrivals(args.flashcard_rate, flashcard_request, client, recorder, random.Random(rng.random()), args, tasks),
+            arrivals(args.upload_rate, upload_request, client, recorder, random.Random(rng.random()), args, tasks),
+        )
+        # Sessions that arrived in time are allowed to finish
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return recorder, elapsed
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        statuses = dict(recorder.statuses[endpoint])
+        errors = sum(n for status, n in statuses.items() if not status.startswith("2"))
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 3),
+            "error_rate": round(errors / len(latencies), 4),
+            "statuses": statuses,
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p90_ms": round(percentile(latencies, 0.90), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(max(latencies), 1),
+            "stages": {
+                name: {"mean_ms": round(sum(v) / len(v), 1), "p95_ms": round(percentile(v, 0.95), 1)}
+                for name, v in sorted(recorder.stages[endpoint].items())
+            },
+        }
+    return {"elapsed_s": round(elapsed, 2), "max_in_flight": recorder.max_in_flight, "endpoints": endpoints}
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except Exception:
+        return {"commit": None, "dirty": None}
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    print(f"\ncommit {report['commit']}{' (dirty)' if report['dirty'] else ''}, "
+          f"{report['results']['elapsed_s']}s, max {report['results']['max_in_flight']} in flight")
+    print(f"{'endpoint':<18} {'reqs':>6} {'rps':>7} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    base = (baseline or {}).get("results", {}).get("endpoints", {})
+    for endpoint, r in report["results"]["endpoints"].items():
+        print(f"{endpoint:<18} {r['requests']:>6} {r['throughput_rps']:>7.2f} {r['error_rate'] * 100:>6.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+        if endpoint in base:
+            b = base[endpoint]
+            print(f"{'  vs baseline':<18} {'':>6} {r['throughput_rps'] - b['throughput_rps']:>+7.2f} "
+                  f"{(r['error_rate'] - b['error_rate']) * 100:>+6.2f} "
+                  + " ".join(f"{_relative(r[k], b[k]):>8}" for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms")))
+        for name, s in r["stages"].items():
+            print(f"{'    ' + name:<32} mean {s['mean_ms']:>8.1f} ms   p95 {s['p95_ms']:>8.1f} ms")
+
+
+def _relative(value: float, baseline: float) -> str:
+    return f"{(value - baseline) / baseline * 100:+.0f}%" if baseline else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="drive a running server instead of an in-process one with fakes")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals")
+    parser.add_argument("--tutor-rate", type=float, default=2.0, help="new tutor sessions per second")
+    parser.add_argument("--quiz-rate", type=float, default=0.2, help="quiz generations per second")
+    parser.add_argument("--flashcard-rate", type=float, default=0.2, help="flash card requests per second")
+    parser.add_argument("--upload-rate", type=float, default=0.1, help="knowledge uploads per second")
+    parser.add_argument("--min-turns", type=int, default=1)
+    parser.add_argument("--max-turns", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between follow-ups")
+    parser.add_argument("--end-session-prob", type=float, default=0.7)
+    parser.add_argument("--users", type=int, default=200, help="distinct user ids")
+    parser.add_argument("--document-words", type=int, default=3000, help="size of generated files")
+    parser.add_argument("--chat-latency-ms", type=float, default=400.0, help="fake chat completion latency")
+    parser.add_argument("--embed-latency-ms", type=float, default=60.0, help="fake embeddings latency")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="apply the production OpenAI quotas")
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to print deltas against")
+    args = parser.parse_args()
+
+    url = args.url or start_local_server(args)
+    print(f"Driving {url} for {args.duration:.0f}s")
+    recorder, elapsed = asyncio.run(drive(url, args))
+    report = {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "machine": f"{platform.machine()} x{os.cpu_count()}",
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": summarize(recorder, elapsed),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: baseline was run with a different configuration")
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import hashlib
+import os
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Settings are read at import time; keep every on-disk store out of the checkout
+_state_dir = tempfile.mkdtemp(prefix="tutor-tests-")
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("METADATA_DB_PATH", os.path.join(_state_dir, "metadata.db"))
+os.environ.setdefault("CHUNK_STORE_DIR", os.path.join(_state_dir, "chunks"))
+os.environ.setdefault("MEDICAL_GATE_CACHE", os.path.join(_state_dir, "medical_gate.json"))
+os.environ.setdefault("QUIZ_DB_PATH", os.path.join(_state_dir, "quizzes.db"))
+os.environ.setdefault("OCR_CACHE_DIR", os.path.join(_state_dir, "ocr"))
+os.environ.setdefault("COMPLETION_CACHE_PATH", "")
+
+
+def fake_embedding(text: str, dimension: int = 1536) -> list:
+    """Deterministic unit vector for a text."""
+    seed = int(hashlib.md5(text.encode()).hexdigest(), 16) % (2 ** 32)
+    vector = np.random.default_rng(seed).normal(size=dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeOpenAI:
+    """Stands in for the OpenAI client: hashed embeddings and canned chat replies."""
+
+    def __init__(self):
+        self.replies = []
+        self.chat_calls = []
+        self.embedding_calls = []
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _embed(self, model, input, **kwargs):
+        self.embedding_calls.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=fake_embedding(t)) for t in input],
+                               usage=SimpleNamespace(total_tokens=len(input)))
+
+    def _chat(self, **kwargs):
+        self.chat_calls.append(kwargs)
+        content = self.replies.pop(0) if self.replies else "An answer."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15))
+
+
+@pytest.fixture
+def fake_openai():
+    from app.services import llm_client
+    client = FakeOpenAI()
+    previous = llm_client._client
+    llm_client.set_openai_client(client)
+    yield client
+    llm_client.set_openai_client(previous)
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+
+def test_reembed_needs_the_admin_token(monkeypatch):
+    started = []
+
+    def start_reembedding(rag, model, dimension):
+        started.append(model)
+        return SimpleNamespace(target_index=f"medical-{model}", embed_model=model, dimension=dimension)
+
+    monkeypatch.setattr("app.routers.tutor_upload.start_reembedding", start_reembedding)
+    client = TestClient(app)
+    url = "/tutor/reembed?model=text-embedding-3-large"
+
+    assert client.post(url).status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    assert client.post(url).status_code == 401
+    assert client.post(url, headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert not started
+
+    assert client.post(url, headers={"X-Admin-Token": "secret"}).status_code == 200
+    assert started == ["text-embedding-3-large"]
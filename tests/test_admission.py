@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionClass, AdmissionRejected, _user_key
+
+
+def _admission(**kwargs) -> AdmissionClass:
+    limits = {"concurrency": 1, "queue": 4, "user_queue": 2, "timeout": 1.0}
+    limits.update(kwargs)
+    return AdmissionClass("test", **limits)
+
+
+def test_slots_are_granted_round_robin_across_users():
+    async def main():
+        admission = _admission()
+        await admission.acquire("a")
+        order = []
+
+        async def wait(user):
+            await admission.acquire(user)
+            order.append(user)
+
+        waiters = [asyncio.create_task(wait(user)) for user in ("a", "a", "b")]
+        await asyncio.sleep(0)
+        assert admission.queued == 3
+        for _ in range(3):
+            admission.release(0.01)
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiters)
+        return order, admission
+
+    order, admission = asyncio.run(main())
+    # b's single request is served before a's second one
+    assert order == ["a", "b", "a"]
+    assert admission.active == 1 and admission.queued == 0
+
+
+def test_queue_bounds_reject_at_once():
+    async def main():
+        admission = _admission(queue=3, user_queue=2)
+        await admission.acquire("a")
+        waiters = [asyncio.create_task(admission.acquire(user)) for user in ("a", "a", "b")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as per_user:
+            await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as total:
+            await admission.acquire("c")
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return per_user.value, total.value, admission
+
+    per_user, total, admission = asyncio.run(main())
+    assert per_user.status == total.status == 429
+    assert per_user.retry_after >= 1
+    assert admission.stats["rejected"] == 2
+    assert admission.queued == 0
+
+
+def test_waiting_past_the_timeout_is_a_503():
+    async def main():
+        admission = _admission(timeout=0.05)
+        await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("b")
+        return rejected.value, admission
+
+    rejected, admission = asyncio.run(main())
+    assert rejected.status == 503
+    assert admission.stats["timed_out"] == 1 and admission.queued == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def main():
+        admission = _admission()
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        admission.release(0.01)
+        return admission
+
+    admission = asyncio.run(main())
+    assert admission.active == 0 and admission.queued == 0
+
+
+def test_user_header_is_only_believed_from_trusted_proxies():
+    scope = {"client": ("10.0.0.5", 5000), "headers": [(b"x-user-id", b"alice")]}
+    assert _user_key(scope, trusted_proxies=frozenset()) == "addr:10.0.0.5"
+    assert _user_key(scope, trusted_proxies=frozenset({"10.0.0.5"})) == "user:alice"
+    proxied = {"client": ("10.0.0.5", 5000), "headers": []}
+    assert _user_key(proxied, trusted_proxies=frozenset({"10.0.0.5"})) == "addr:10.0.0.5"
@@ -0,0 +1,41 @@
+import os
+
+from app.services.chunk_store import INDEX_FILE, ChunkStore
+
+
+def test_texts_survive_reopening(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many([("a", "Alveoli"), ("b", "Bronchioles – ünïcode")])
+    assert store.get_many(["a", "b", "missing"]) == {"a": "Alveoli", "b": "Bronchioles – ünïcode"}
+
+    reopened = ChunkStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.get("b") == "Bronchioles – ünïcode"
+
+
+def test_latest_write_wins(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many([("a", "old")])
+    # Read once so the segment is mapped before it grows
+    assert store.get("a") == "old"
+    store.put_many([("a", "new text")])
+    assert store.get("a") == "new text"
+    assert ChunkStore(str(tmp_path)).get("a") == "new text"
+
+
+def test_torn_index_line_is_ignored(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many([("a", "kept")])
+    with open(os.path.join(str(tmp_path), INDEX_FILE), "a") as f:
+        f.write("b\t4")
+    reopened = ChunkStore(str(tmp_path))
+    assert "a" in reopened and "b" not in reopened
+
+
+def test_entry_past_the_segment_end_is_ignored(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many([("a", "kept")])
+    # The index line landed but the text it points at did not
+    with open(os.path.join(str(tmp_path), INDEX_FILE), "a") as f:
+        f.write("b\t4\t100\n")
+    assert ChunkStore(str(tmp_path)).get_many(["a", "b"]) == {"a": "kept"}
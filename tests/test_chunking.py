@@ -0,0 +1,20 @@
+from app.services.chunking import chunk_text, chunk_text_stream, chunk_words
+
+
+def test_chunk_text_keeps_words_whole_within_the_length():
+    text = " ".join(["alveolus"] * 100)
+    chunks = chunk_text(text, max_length=50)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_chunk_words_counts_words():
+    chunks = chunk_words("a b c d e", max_words=2)
+    assert chunks == ["a b", "c d", "e"]
+    assert chunk_words("   ") == []
+
+
+def test_streamed_pieces_chunk_like_their_concatenation():
+    pages = ["Alveoli exchange ga", "ses.\nSurfactant ", "", "lowers tension ", "in the alveoli"]
+    for max_length in (5, 20, 500):
+        assert list(chunk_text_stream(pages, max_length)) == chunk_text("".join(pages), max_length)
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+def _vector(text):
+    return [float(len(text))]
+
+
+def test_concurrent_requests_share_one_call():
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [_vector(t) for t in texts]
+
+    batcher = EmbeddingBatcher(embed, max_wait_ms=50, max_batch=64)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda t: batcher.embed([t])[0], ["a", "bb", "ccc", "bb"] * 2))
+    assert results == [[1.0], [2.0], [3.0], [2.0]] * 2
+    assert sum(len(c) for c in calls) == 3
+    assert batcher.stats["coalesced_texts"] == 5
+
+
+def test_batches_collect_while_all_workers_are_busy():
+    release = threading.Event()
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        if len(calls) == 1:
+            release.wait(5)
+        return [_vector(t) for t in texts]
+
+    batcher = EmbeddingBatcher(embed, max_wait_ms=1, max_batch=64, max_concurrent_batches=1)
+    first = threading.Thread(target=batcher.embed, args=(["first"],))
+    first.start()
+    while not calls:
+        time.sleep(0.001)
+    with ThreadPoolExecutor(10) as pool:
+        futures = [pool.submit(batcher.embed, [f"text-{i}"]) for i in range(10)]
+        time.sleep(0.05)
+        release.set()
+        assert [f.result(5)[0] for f in futures] == [_vector(f"text-{i}") for i in range(10)]
+    first.join(5)
+    # The ten requests made while the only worker was busy went out as one call
+    assert len(calls) == 2 and len(calls[1]) == 10
+
+
+def test_short_response_fails_every_caller():
+    batcher = EmbeddingBatcher(lambda texts: [[0.0]] * (len(texts) - 1), max_wait_ms=20)
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(batcher.embed, [t]) for t in ("a", "b", "c")]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(5)
+
+
+def test_errors_reach_callers_and_later_calls_recover():
+    fail = [True]
+
+    def embed(texts):
+        if fail[0]:
+            fail[0] = False
+            raise RuntimeError("rate limited")
+        return [_vector(t) for t in texts]
+
+    batcher = EmbeddingBatcher(embed, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.embed(["x"])
+    assert batcher.embed(["x"]) == [[1.0]]
@@ -0,0 +1,18 @@
+import fitz
+
+from app.services.chunking import chunk_text
+from app.services.file_processing import extract_pdf_chunks
+
+
+def test_pdf_pages_are_chunked_as_they_are_read(tmp_path):
+    path = str(tmp_path / "notes.pdf")
+    with fitz.open() as doc:
+        for text in ("Alveoli exchange gases.", "Surfactant lowers surface tension.", "Cilia clear mucus."):
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+
+    done = []
+    text, chunks, pages = extract_pdf_chunks(path, max_length=30, progress=done.append)
+    assert pages == 3 and done == [1, 2, 3]
+    assert "Surfactant" in text
+    assert chunks == chunk_text(text, max_length=30)
@@ -0,0 +1,98 @@
+import gzip
+
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.http_cache import CachedJSON, ResponseCache, _choose_encoding, cached_json_response
+
+
+def _client(cache: ResponseCache, state: dict) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/item")
+    def item(request: Request):
+        entry = cache.get("item", state["revision"], lambda: {"revision": state["revision"], "pad": "x" * 100})
+        return cached_json_response(request, entry)
+
+    return TestClient(app)
+
+
+def test_unchanged_poll_gets_304_and_a_new_revision_a_new_etag():
+    cache, state = ResponseCache(), {"revision": 1}
+    client = _client(cache, state)
+    first = client.get("/item", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200 and first.json()["revision"] == 1
+    etag = first.headers["etag"]
+
+    again = client.get("/item", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    assert cache.stats()["hits"] == 1
+
+    state["revision"] = 2
+    changed = client.get("/item", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_compressed_variant_has_its_own_etag_and_revalidates(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_COMPRESSION_MIN_BYTES", 10)
+    client = _client(ResponseCache(), {"revision": 1})
+    response = client.get("/item", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gz"')
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    again = client.get("/item", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_small_bodies_are_not_compressed(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_COMPRESSION_MIN_BYTES", 1 << 20)
+    response = _client(ResponseCache(), {"revision": 1}).get("/item", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert not response.headers["etag"].endswith('-gz"')
+
+
+def test_if_none_match_uses_weak_comparison():
+    entry = CachedJSON({"a": 1})
+    assert entry.matches(f'W/"{entry.etag}"')
+    assert entry.matches(f'"other", "{entry.etag}-gz"')
+    assert entry.matches("*")
+    assert not entry.matches('"other"')
+    assert not entry.matches(None)
+
+
+def test_encoded_body_is_built_once():
+    entry = CachedJSON({"a": "b" * 50})
+    body = entry.encoded("gzip")
+    assert entry.encoded("gzip") is body
+    assert orjson.loads(gzip.decompress(body)) == {"a": "b" * 50}
+
+
+def test_response_cache_serializes_once_per_revision_and_evicts_lru():
+    cache = ResponseCache(maxsize=2)
+    builds = []
+
+    def build(value):
+        return lambda: builds.append(value) or {"value": value}
+
+    first = cache.get("a", 1, build("a1"))
+    assert cache.get("a", 1, build("unused")) is first
+    assert cache.get("a", 2, build("a2")) is not first
+    cache.get("b", 1, build("b1"))
+    cache.get("c", 1, build("c1"))
+    cache.get("a", 2, build("a2 again"))
+    assert builds == ["a1", "a2", "b1", "c1", "a2 again"]
+
+    cache.invalidate("c")
+    cache.get("c", 1, build("c1 again"))
+    assert builds[-1] == "c1 again"
+
+
+def test_accept_encoding_honours_q_values():
+    assert _choose_encoding("gzip;q=0.5, identity") == "gzip"
+    assert _choose_encoding("gzip;q=0") is None
+    assert _choose_encoding("*") in ("br", "gzip")
+    assert _choose_encoding("") is None
@@ -0,0 +1,29 @@
+from app.services.json_stream import JSONArrayStream
+
+
+def test_elements_are_emitted_as_soon_as_they_close():
+    parser = JSONArrayStream()
+    assert parser.feed('```json\n[{"q": "What is') == []
+    assert parser.feed(' a {brace}?", "options": ["a", "b"]}, {"q"') == [
+        {"q": "What is a {brace}?", "options": ["a", "b"]}
+    ]
+    assert parser.feed(': "Second"}\n]\n```') == [{"q": "Second"}]
+    assert parser.done
+
+
+def test_escaped_quotes_and_nesting_split_anywhere():
+    text = '[{"q": "He said \\"hi\\" [x]", "n": {"deep": [1, {"k": "}"}]}}]'
+    parser = JSONArrayStream()
+    items = [item for ch in text for item in parser.feed(ch)]
+    assert items == [{"q": 'He said "hi" [x]', "n": {"deep": [1, {"k": "}"}]}}]
+
+
+def test_malformed_element_is_skipped_without_losing_the_next():
+    parser = JSONArrayStream()
+    assert parser.feed('[{"q": 1,}, {"q": 2}]') == [{"q": 2}]
+
+
+def test_text_after_the_array_is_ignored():
+    parser = JSONArrayStream()
+    assert parser.feed('[{"q": 1}] trailing {"q": 2}') == [{"q": 1}]
+    assert parser.feed('{"q": 3}') == []
@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.local_vector_index import LocalVectorIndex
+
+DIM = 16
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def _upsert(index, vectors, namespace="", start=0, **metadata):
+    index.upsert([(f"v{start + i}", v.tolist(), {"i": start + i, **metadata}) for i, v in enumerate(vectors)],
+                 namespace=namespace)
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8", "binary"])
+def test_query_finds_exact_match(quantization):
+    index = LocalVectorIndex(dimension=DIM, quantization=quantization)
+    vectors = _vectors(200)
+    _upsert(index, vectors)
+    result = index.query(vectors[17].tolist(), top_k=3, include_metadata=True)
+    assert result.matches[0].id == "v17"
+    assert result.matches[0].metadata == {"i": 17}
+    assert result.matches[0].score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_filters_and_namespaces():
+    index = LocalVectorIndex(dimension=DIM)
+    vectors = _vectors(20)
+    _upsert(index, vectors[:10], kind="a")
+    _upsert(index, vectors[10:], start=10, kind="b")
+    _upsert(index, vectors[:5], namespace="user-1", start=100)
+
+    result = index.query(vectors[3].tolist(), top_k=5, filter={"kind": "b"})
+    assert {m.id for m in result.matches} <= {f"v{i}" for i in range(10, 20)}
+    assert index.query(vectors[3].tolist(), top_k=1, namespace="user-1").matches[0].id == "v103"
+    assert index.describe_index_stats().namespaces == {"": {"vector_count": 20}, "user-1": {"vector_count": 5}}
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_reload_replays_log(tmp_path, quantization):
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(dimension=DIM, path=path, quantization=quantization)
+    vectors = _vectors(60)
+    for start in range(0, 60, 10):
+        _upsert(index, vectors[start:start + 10], start=start)
+    index.delete(["v3", "v42"])
+    _upsert(index, vectors[:1], start=5)
+
+    reloaded = LocalVectorIndex(dimension=DIM, path=path, quantization=quantization)
+    ids = [id for page in reloaded.list() for id in page]
+    assert len(ids) == 58 and "v3" not in ids and "v42" not in ids
+    assert reloaded.query(vectors[0].tolist(), top_k=2).matches[0].id in {"v0", "v5"}
+    assert reloaded.fetch(["v5"]).vectors["v5"].metadata == {"i": 5}
+
+
+def test_writes_append_instead_of_rewriting(tmp_path):
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(dimension=DIM, path=path)
+    vectors = _vectors(50)
+    _upsert(index, vectors[:1])
+    directory = os.path.join(path, "__default__")
+    snapshot = os.path.getmtime(os.path.join(directory, "records.json"))
+    for i in range(1, 50):
+        _upsert(index, vectors[i:i + 1], start=i)
+    assert os.path.getmtime(os.path.join(directory, "records.json")) == snapshot
+    with open(os.path.join(directory, "log-1.jsonl")) as f:
+        assert sum(1 for _ in f) == 49
+
+
+def test_reload_ignores_torn_log_tail(tmp_path):
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(dimension=DIM, path=path)
+    vectors = _vectors(3)
+    _upsert(index, vectors[:1])
+    _upsert(index, vectors[1:2], start=1)
+    with open(os.path.join(path, "__default__", "log-1.jsonl"), "a") as f:
+        f.write('{"id": "v2", "metad')
+
+    reloaded = LocalVectorIndex(dimension=DIM, path=path)
+    assert sorted(id for page in reloaded.list() for id in page) == ["v0", "v1"]
+
+
+def test_persisted_quantized_index_keeps_only_codes_in_memory(tmp_path):
+    vectors = _vectors(500)
+    dense = LocalVectorIndex(dimension=DIM)
+    quantized = LocalVectorIndex(dimension=DIM, path=str(tmp_path / "index"), quantization="int8")
+    _upsert(dense, vectors)
+    _upsert(quantized, vectors)
+    assert quantized.memory_usage() < dense.memory_usage() / 2
+    assert quantized.query(vectors[250].tolist(), top_k=1).matches[0].id == "v250"
+
+
+def test_snapshot_compacts_overwrites(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.local_vector_index._LOG_COMPACT_MIN", 8)
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(dimension=DIM, path=path)
+    vectors = _vectors(4)
+    for _ in range(10):
+        _upsert(index, vectors)
+    directory = os.path.join(path, "__default__")
+    assert not [name for name in os.listdir(directory) if name.startswith("log-1")]
+    assert len([name for name in os.listdir(directory) if name.startswith("vectors")]) == 1
+    reloaded = LocalVectorIndex(dimension=DIM, path=path)
+    assert reloaded.describe_index_stats().total_vector_count == 4
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_crash_before_records_are_replaced_keeps_the_previous_snapshot(tmp_path, monkeypatch, quantization):
+    monkeypatch.setattr("app.services.local_vector_index._LOG_COMPACT_MIN", 8)
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(dimension=DIM, path=path, quantization=quantization)
+    vectors = _vectors(10)
+    _upsert(index, vectors)
+    index.delete([f"v{i}" for i in range(5)])
+
+    replace = os.replace
+
+    def crash(src, dst):
+        if dst.endswith("records.json"):
+            raise OSError("crashed")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", crash)
+    # Compacts the partition, so its rows move
+    with pytest.raises(OSError):
+        _upsert(index, vectors[5:], start=5)
+    monkeypatch.setattr(os, "replace", replace)
+
+    reloaded = LocalVectorIndex(dimension=DIM, path=path, quantization=quantization)
+    assert reloaded.describe_index_stats().total_vector_count == 5
+    for i in range(5, 10):
+        assert reloaded.query(vectors[i].tolist(), top_k=1).matches[0].id == f"v{i}"
+
+
+def test_reload_converts_storage_mode(tmp_path):
+    path = str(tmp_path / "index")
+    vectors = _vectors(40)
+    index = LocalVectorIndex(dimension=DIM, path=path)
+    _upsert(index, vectors[:20])
+    _upsert(index, vectors[20:], start=20)
+
+    quantized = LocalVectorIndex(dimension=DIM, path=path, quantization="int8")
+    assert quantized.query(vectors[30].tolist(), top_k=1).matches[0].id == "v30"
+    _upsert(quantized, vectors[:1], start=40)
+    dense = LocalVectorIndex(dimension=DIM, path=path)
+    assert dense.describe_index_stats().total_vector_count == 41
+    assert dense.query(vectors[30].tolist(), top_k=1).matches[0].id == "v30"
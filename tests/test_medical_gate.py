@@ -0,0 +1,79 @@
+import json
+import threading
+
+import numpy as np
+
+from app.services.medical_gate import (
+    GATE_MEDICAL,
+    GATE_NON_MEDICAL,
+    GATE_UNCERTAIN,
+    MEDICAL_EXAMPLES,
+    MedicalQuestionGate,
+)
+
+DIM = 8
+MEDICAL = np.eye(DIM)[0]
+OTHER = np.eye(DIM)[1]
+
+
+def _embed(texts):
+    # Medical seeds point along one axis and the rest along another
+    return [(MEDICAL if t in MEDICAL_EXAMPLES else OTHER).tolist() for t in texts]
+
+
+def test_trains_at_construction_and_classifies(tmp_path):
+    gate = MedicalQuestionGate(_embed, "m", cache_path=str(tmp_path / "gate.json"))
+    assert gate.wait_ready(5)
+    assert gate.classify(MEDICAL.tolist()) == GATE_MEDICAL
+    assert gate.classify(OTHER.tolist()) == GATE_NON_MEDICAL
+    assert gate.classify((MEDICAL + OTHER).tolist()) == GATE_UNCERTAIN
+    assert gate.classify(None) == GATE_UNCERTAIN
+
+
+def test_uncertain_until_trained():
+    release = threading.Event()
+
+    def slow_embed(texts):
+        release.wait(5)
+        return _embed(texts)
+
+    gate = MedicalQuestionGate(slow_embed, "m", cache_path="")
+    assert gate.classify(MEDICAL.tolist()) == GATE_UNCERTAIN
+    gate.learn(MEDICAL.tolist(), True)  # ignored until trained
+    release.set()
+    assert gate.wait_ready(5)
+    assert gate.classify(MEDICAL.tolist()) == GATE_MEDICAL
+
+
+def test_reuses_cached_centroids(tmp_path):
+    path = str(tmp_path / "gate.json")
+    assert MedicalQuestionGate(_embed, "m", cache_path=path).wait_ready(5)
+    calls = []
+    gate = MedicalQuestionGate(lambda texts: calls.append(texts) or _embed(texts), "m", cache_path=path)
+    assert gate.wait_ready(5) and not calls
+    # A different embedding model retrains
+    assert MedicalQuestionGate(lambda texts: calls.append(texts) or _embed(texts), "other", cache_path=path).wait_ready(5)
+    assert len(calls) == 1
+
+
+def test_learning_is_bounded():
+    gate = MedicalQuestionGate(_embed, "m", cache_path="", max_learned=10)
+    assert gate.wait_ready(5)
+    for _ in range(1000):
+        gate.learn(OTHER.tolist(), True)
+    # The seeds keep their weight: a medical question is still medical
+    assert gate.classify(MEDICAL.tolist()) == GATE_MEDICAL
+    assert gate.score(MEDICAL.tolist()) > 0.2
+
+
+def test_learned_updates_are_saved_in_batches(tmp_path):
+    path = tmp_path / "gate.json"
+    gate = MedicalQuestionGate(_embed, "m", cache_path=str(path), save_interval=3600)
+    assert gate.wait_ready(5)
+    saved = path.read_text()
+    for _ in range(5):
+        gate.learn(MEDICAL.tolist(), True)
+    assert path.read_text() == saved
+    gate.flush()
+    centroids = json.loads(path.read_text())["centroids"]
+    assert centroids[GATE_MEDICAL]["learned_count"] == 5
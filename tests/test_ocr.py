@@ -0,0 +1,21 @@
+from app.services import ocr
+
+
+def test_pool_workers_ocr_inline(monkeypatch):
+    monkeypatch.setattr(ocr, "_ocr_image", lambda image_bytes, lang: "text of " + image_bytes.decode())
+    monkeypatch.setattr(ocr, "_inline", False)
+    monkeypatch.setattr(ocr, "_pool", None)
+    ocr.run_inline()
+    future = ocr._submit(b"page")
+    assert future.done() and future.result() == "text of page"
+    assert ocr._pool is None
+
+
+def test_cached_ocr_reuses_recognized_text(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(ocr, "_cache", ocr.OCRCache(str(tmp_path)))
+    monkeypatch.setattr(ocr, "_inline", True)
+    monkeypatch.setattr(ocr, "_ocr_image", lambda image_bytes, lang: calls.append(image_bytes) or "recognized")
+    assert ocr._cached_ocr(b"scan").result() == "recognized"
+    assert ocr._cached_ocr(b"scan").result() == "recognized"
+    assert calls == [b"scan"]
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.services.openai_governor import OpenAIGovernor, Priority, TokenBucket
+
+
+def _rate_limit_error(retry_after: str = "0") -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)
+    now = time.monotonic()
+    assert bucket.wait_time(2, now) == 0
+    bucket.take(2)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0, abs=0.05)
+
+
+def test_interactive_callers_are_admitted_before_bulk():
+    governor = OpenAIGovernor(limits={"m": (60, 10 ** 6)}, burst_seconds=1)
+    governor.acquire("m", 1)  # drain the one-request burst
+    order = []
+
+    def call(priority, name):
+        governor.acquire("m", 1, priority)
+        order.append(name)
+
+    bulk = threading.Thread(target=call, args=(Priority.BULK, "bulk"))
+    bulk.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=call, args=(Priority.INTERACTIVE, "interactive"))
+    interactive.start()
+    bulk.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "bulk"]
+
+
+def test_rate_limit_errors_are_retried_and_slow_the_model():
+    governor = OpenAIGovernor(limits={"m": (6000, 10 ** 6)}, base_delay=0.001)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _rate_limit_error()
+        return "ok"
+
+    assert governor.call("m", 10, fn) == "ok"
+    assert len(attempts) == 3
+    assert governor.stats["rate_limited"] == 2
+    assert governor._budget("m").requests.rate < 100
+
+
+def test_gives_up_after_max_retries():
+    governor = OpenAIGovernor(max_retries=2, base_delay=0.001)
+
+    def fn():
+        raise _rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        governor.call("m", 10, fn)
+    assert governor.stats["failed"] == 1 and governor.stats["retries"] == 2
+
+
+def test_other_errors_are_not_retried():
+    governor = OpenAIGovernor()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        governor.call("m", 10, fn)
+    assert len(calls) == 1
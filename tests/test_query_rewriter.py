@@ -0,0 +1,66 @@
+from app.services.query_rewriter import (
+    METHOD_FALLBACK,
+    METHOD_HEURISTIC,
+    METHOD_LLM,
+    METHOD_PASSTHROUGH,
+    QueryCondenser,
+)
+
+
+def test_first_and_standalone_questions_pass_through(fake_openai):
+    condenser = QueryCondenser()
+    assert condenser.condense("s", "What is heart failure?", 0).method == METHOD_PASSTHROUGH
+    # Short, but self-contained
+    result = condenser.condense("s", "What is asthma?", 1)
+    assert (result.text, result.method) == ("What is asthma?", METHOD_PASSTHROUGH)
+    result = condenser.condense("s", "Is there a vaccine for measles?", 2)
+    assert result.method == METHOD_PASSTHROUGH
+    assert not fake_openai.chat_calls
+
+
+def test_follow_ups_attach_the_previous_topic_without_nesting(fake_openai):
+    condenser = QueryCondenser()
+    condenser.condense("s", "What is heart failure?", 0)
+    first = condenser.condense("s", "What about treatment?", 1)
+    second = condenser.condense("s", "And prognosis?", 2)
+    assert (first.text, first.method) == ("treatment (What is heart failure)", METHOD_HEURISTIC)
+    assert second.text == "prognosis (What is heart failure)"
+    assert not fake_openai.chat_calls
+
+
+def test_pronouns_use_the_llm_and_results_are_memoized(fake_openai):
+    fake_openai.replies = ["How is heart failure treated?"]
+    condenser = QueryCondenser()
+    condenser.condense("s", "What is heart failure?", 0)
+    result = condenser.condense("s", "How is it treated?", 1)
+    assert (result.text, result.method) == ("How is heart failure treated?", METHOD_LLM)
+    assert condenser.condense("s", "How is it treated?", 1).cached
+    assert len(fake_openai.chat_calls) == 1
+    # The rewritten question becomes the topic for the next follow-up
+    assert condenser.condense("s", "What about in children?", 2).text == \
+        "in children (How is heart failure treated)"
+
+
+def test_llm_failure_falls_back_to_the_previous_topic(fake_openai):
+    fake_openai.chat.completions.create = lambda **kwargs: 1 / 0
+    condenser = QueryCondenser()
+    condenser.condense("s", "What is gout?", 0)
+    result = condenser.condense("s", "What causes it?", 1)
+    assert (result.text, result.method) == ("What causes it? (What is gout)", METHOD_FALLBACK)
+
+
+def test_forget_clears_the_session_topic(fake_openai):
+    condenser = QueryCondenser()
+    condenser.condense("s", "What is gout?", 0)
+    condenser.forget("s")
+    assert condenser.condense("s", "What about diet?", 0).method == METHOD_PASSTHROUGH
+
+
+def test_least_recently_asked_sessions_are_dropped(fake_openai):
+    condenser = QueryCondenser(max_sessions=2)
+    condenser.condense("a", "What is gout?", 0)
+    condenser.condense("b", "What is lupus?", 0)
+    condenser.condense("a", "What about diet?", 1)
+    condenser.condense("c", "What is anemia?", 0)
+    assert condenser.condense("a", "And exercise?", 2).method == METHOD_HEURISTIC
+    assert condenser.condense("b", "What about diet?", 1).method == METHOD_PASSTHROUGH
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from app.services import quiz_generation
+from app.services.completion_cache import CACHE_REUSE
+
+
+def _capture(monkeypatch, reply: str) -> list:
+    calls = []
+
+    def chat_completion(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    monkeypatch.setattr(quiz_generation, "chat_completion", chat_completion)
+    return calls
+
+
+def test_quiz_and_cards_are_fresh_unless_reuse_is_requested(monkeypatch):
+    calls = _capture(monkeypatch, '[{"Question": "Q", "Answer": "A"}]')
+    quiz_generation.generate_quiz_questions("context")
+    quiz_generation.generate_flash_cards("prompt")
+    assert [call["cache"] for call in calls] == [None, None]
+
+    quiz_generation.generate_quiz_questions("context", cache=CACHE_REUSE)
+    quiz_generation.generate_flash_cards("prompt", cache=CACHE_REUSE)
+    assert [call["cache"] for call in calls[2:]] == [CACHE_REUSE, CACHE_REUSE]
@@ -0,0 +1,66 @@
+from app.services.quiz_store import QuizRepository, decode_questions, encode_questions
+
+
+def _repository(tmp_path, **kwargs) -> QuizRepository:
+    # A long flush interval keeps the background writer out of the way; tests flush explicitly
+    return QuizRepository(str(tmp_path / "quizzes.db"), flush_interval=60.0, **kwargs)
+
+
+def test_encoding_round_trips_absent_and_null_fields():
+    questions = [
+        {"question": "Q1", "options": ["a", "b"], "answer": "a"},
+        {"question": "Q2", "explanation": None},
+    ]
+    assert decode_questions(*encode_questions(questions)) == questions
+
+
+def test_flushed_quizzes_load_back_from_disk(tmp_path):
+    repository = _repository(tmp_path)
+    repository.create("q1", [{"question": "Q1"}], generating=True)
+    repository.append("q1", {"question": "Q2"})
+    repository.finish("q1")
+    repository.flush()
+
+    reopened = _repository(tmp_path)
+    quiz = reopened.get("q1")
+    assert quiz.questions == [{"question": "Q1"}, {"question": "Q2"}] and not quiz.generating
+    assert reopened.get_stats()["cold_loads"] == 1
+
+
+def test_evicted_quiz_is_served_before_and_after_its_flush(tmp_path):
+    repository = _repository(tmp_path, capacity=1)
+    repository.create("q1", [{"question": "Q1"}])
+    repository.create("q2", [{"question": "Q2"}])
+    assert repository.get_stats()["evictions"] == 1
+    # Not written yet: the pending write still serves it
+    assert repository.get("q1").questions == [{"question": "Q1"}]
+    repository.flush()
+    repository.create("q3", [{"question": "Q3"}])
+    assert repository.get("q2").questions == [{"question": "Q2"}]
+
+
+def test_generating_quizzes_are_never_evicted(tmp_path):
+    repository = _repository(tmp_path, capacity=1)
+    repository.create("streaming", [], generating=True)
+    repository.create("q2", [{"question": "Q2"}])
+    repository.create("q3", [{"question": "Q3"}])
+    repository.append("streaming", {"question": "Q1"})
+    assert repository.get("streaming").questions == [{"question": "Q1"}]
+
+
+def test_deleted_quiz_is_gone_from_memory_and_disk(tmp_path):
+    repository = _repository(tmp_path)
+    repository.create("q1", [{"question": "Q1"}])
+    repository.flush()
+    repository.delete("q1")
+    assert repository.get("q1") is None
+    repository.flush()
+    assert _repository(tmp_path).get("q1") is None
+
+
+def test_revision_changes_with_every_write(tmp_path):
+    repository = _repository(tmp_path)
+    quiz = repository.create("q1", [])
+    first = quiz.revision
+    repository.append("q1", {"question": "Q1"})
+    assert quiz.revision > first
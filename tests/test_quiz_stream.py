@@ -0,0 +1,23 @@
+from app.routers import quiz
+from app.services.quiz_store import get_quiz_repository
+
+
+def test_quiz_is_created_when_streaming_starts(monkeypatch):
+    monkeypatch.setattr(quiz, "stream_quiz_questions", lambda *args: iter([{"question": "Q1"}]))
+    body = quiz._stream_quiz("stream-1", "context", 1, "basic", "mcq")
+    assert get_quiz_repository().get("stream-1") is None
+
+    first = next(body)
+    assert b"stream-1" in first
+    assert get_quiz_repository().get("stream-1").generating
+    list(body)
+    stored = get_quiz_repository().get("stream-1")
+    assert stored.questions == [{"question": "Q1"}] and not stored.generating
+
+
+def test_abandoned_stream_without_questions_leaves_no_quiz(monkeypatch):
+    monkeypatch.setattr(quiz, "stream_quiz_questions", lambda *args: iter([]))
+    body = quiz._stream_quiz("stream-2", "context", 1, "basic", "mcq")
+    next(body)
+    body.close()
+    assert get_quiz_repository().get("stream-2") is None
@@ -0,0 +1,76 @@
+from app.core.config import settings
+from app.services.chunk_store import ChunkStore
+from app.services.rag_pipeline_pinecone import RAGPipelinePinecone, SHARED_NAMESPACE, versioned_index_name
+from app.services.reembedding import ReembeddingJob
+
+from tests.conftest import fake_embedding
+
+
+def test_version_activated_by_another_process_is_followed(monkeypatch):
+    rag = RAGPipelinePinecone(index_name="flip-test")
+    target = versioned_index_name("flip-test", "text-embedding-3-large", 3072)
+    # What the re-embedding CLI leaves behind in the shared record
+    rag._metadata_store.set_index_version("flip-test", target, "text-embedding-3-large", 3072)
+    assert rag._active().index_name == "flip-test"
+
+    monkeypatch.setattr(settings, "INDEX_VERSION_TTL", 0)
+    version = rag._active()
+    assert (version.index_name, version.embed_model, version.dimension) == (target, "text-embedding-3-large", 3072)
+
+
+def test_manifest_keeps_no_text_and_reembedding_recovers_it(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_VERSION_TTL", 0)
+    rag = RAGPipelinePinecone(index_name="manifest-test")
+    rag.add_summaries([{"id": "summary-1", "text": "Asthma is reversible airway obstruction.",
+                        "metadata": {"user_id": "7"}}])
+    # A vector whose text only survives in its metadata
+    rag._active().index.upsert([("legacy-1", fake_embedding("Legacy"), {"text": "Legacy"})], namespace=SHARED_NAMESPACE)
+    rag._metadata_store.add_chunks([{"chunk_id": "legacy-1", "namespace": SHARED_NAMESPACE, "document_id": "legacy",
+                                     "content_hash": "h", "embed_model": rag._embed_model, "metadata": {}}])
+    rows = rag._metadata_store.list_chunks()
+    assert all("text" not in row for row in rows)
+
+    result = ReembeddingJob(rag, "text-embedding-ada-002").run()
+
+    assert result["migrated"] == 2
+    assert rag._active().index_name == result["target_index"]
+    assert rag._chunk_store.get("legacy-1") == "Legacy"
+    embedded = [text for call in fake_openai.embedding_calls for text in call]
+    assert embedded[-2:] == ["Asthma is reversible airway obstruction.", "Legacy"]
+
+
+def test_writes_to_the_old_index_after_the_flip_are_caught_up(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_VERSION_TTL", 0)
+    rag = RAGPipelinePinecone(index_name="catch-up-test")
+    rag.add_document("Platelets start clotting.")
+    old = rag._active()
+    ReembeddingJob(rag, "text-embedding-ada-002").run()
+    new = rag._active()
+
+    # A server that has not seen the flip yet keeps writing to the old index
+    old.index.upsert([("late-1", fake_embedding("Late"), {"text": "Late"})], namespace=SHARED_NAMESPACE)
+    rag._metadata_store.add_chunks([{"chunk_id": "late-1", "namespace": SHARED_NAMESPACE, "document_id": "late",
+                                     "content_hash": "h", "embed_model": old.embed_model, "metadata": {}}])
+    # A server that has, writes to the new one
+    rag.add_document("Fibrin stabilises the clot.")
+
+    result = ReembeddingJob(rag, "text-embedding-ada-002").run()
+
+    assert result["migrated"] == 1
+    assert new.index.fetch(ids=["late-1"], namespace=SHARED_NAMESPACE).vectors["late-1"].metadata["text"] == "Late"
+    assert rag._metadata_store.count_chunks(old.embed_model) == 0
+    assert ReembeddingJob(rag, "text-embedding-ada-002").run()["migrated"] == 0
+
+
+def test_texts_are_kept_in_vector_metadata_and_read_through_the_cache(fake_openai, tmp_path, monkeypatch):
+    rag = RAGPipelinePinecone(index_name="read-through-test")
+    rag.add_document("Nephrons filter blood plasma.", user_id="9")
+    vectors = rag._active().index.fetch(
+        ids=[row["chunk_id"] for row in rag._metadata_store.list_chunks()], namespace="user-9"
+    ).vectors
+    assert [v.metadata["text"] for v in vectors.values()] == ["Nephrons filter blood plasma."]
+
+    # Another server, or a lost cache, starts with an empty store
+    monkeypatch.setattr(rag, "_chunk_store", ChunkStore(str(tmp_path)))
+    assert rag.retrieve("kidney", user_id="9") == ["Nephrons filter blood plasma."]
+    assert len(rag._chunk_store) == 1
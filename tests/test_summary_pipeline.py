@@ -0,0 +1,55 @@
+import time
+
+from app.services.metadata_store import MetadataStore
+from app.services.summary_pipeline import SUMMARY_COMPLETE, SUMMARY_FAILED, SUMMARY_PENDING, SummaryPipeline
+
+
+class FakeRag:
+    def __init__(self):
+        self.records = []
+
+    def add_summaries(self, records):
+        self.records.extend(records)
+        return [[0.0] for _ in records]
+
+
+def _wait_for(store, summary_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = store.get_summary(summary_id)
+        if record["status"] == status:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"{summary_id} never became {status}: {store.get_summary(summary_id)}")
+
+
+def test_summaries_are_generated_and_indexed(fake_openai):
+    fake_openai.replies = ['{"summary": "Covered asthma.", "topics": ["asthma"]}']
+    store, rag = MetadataStore(":memory:"), FakeRag()
+    pipeline = SummaryPipeline(rag, store, max_wait=0.01)
+    summary_id = pipeline.submit("s1", "u1", "Student: asthma?\nTutor: ...")
+    record = _wait_for(store, summary_id, SUMMARY_COMPLETE)
+    assert record["text"] == "Covered asthma." and record["topics"] == ["asthma"]
+    assert record["conversation"] == ""
+    assert [r["id"] for r in rag.records] == [summary_id]
+
+
+def test_failed_generation_is_marked_failed_and_not_indexed(fake_openai):
+    fake_openai.chat.completions.create = lambda **kwargs: 1 / 0
+    store, rag = MetadataStore(":memory:"), FakeRag()
+    pipeline = SummaryPipeline(rag, store, max_wait=0.01)
+    summary_id = pipeline.submit("s1", "u1", "Student: asthma?")
+    record = _wait_for(store, summary_id, SUMMARY_FAILED)
+    assert record["text"] == ""
+    assert not rag.records
+    assert store.list_summaries("u1") == []
+
+
+def test_pending_summaries_are_requeued_on_start(fake_openai, tmp_path):
+    fake_openai.replies = ['{"summary": "Resumed.", "topics": []}']
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    store.add_summary("queued", "u1", "s1", "", status=SUMMARY_PENDING, conversation="Student: hi")
+    store.add_summary("legacy", "u1", "s2", "", status=SUMMARY_PENDING)
+    SummaryPipeline(FakeRag(), store, max_wait=0.01)
+    assert _wait_for(store, "queued", SUMMARY_COMPLETE)["text"] == "Resumed."
+    assert store.get_summary("legacy")["status"] == SUMMARY_FAILED
@@ -0,0 +1,29 @@
+from app.core.config import settings
+from app.services import transcription
+from app.services.transcription import plan_segments, worker_count
+
+
+def test_worker_count_fits_the_memory_budget(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCRIBE_WORKERS", 8)
+    monkeypatch.setattr(settings, "WHISPER_MODEL", "medium.en")
+    monkeypatch.setattr(settings, "TRANSCRIBE_MEMORY_MB", 4000)
+    assert worker_count() == 2
+    monkeypatch.setattr(settings, "TRANSCRIBE_MEMORY_MB", 100)
+    assert worker_count() == 1
+    monkeypatch.setattr(settings, "WHISPER_MODEL", "tiny")
+    monkeypatch.setattr(settings, "TRANSCRIBE_MEMORY_MB", 100000)
+    assert worker_count() == 8
+
+
+def test_unknown_physical_memory_leaves_workers_uncapped(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCRIBE_WORKERS", 3)
+    monkeypatch.setattr(settings, "TRANSCRIBE_MEMORY_MB", 0)
+    monkeypatch.setattr(transcription, "_physical_memory_mb", lambda: 0)
+    assert worker_count() == 3
+
+
+def test_segments_are_cut_at_silences_near_the_target():
+    segments = plan_segments(100.0, [(28.0, 30.0), (61.0, 63.0), (90.0, 91.0)])
+    assert segments == [(0.0, 29.0), (29.0, 62.0), (62.0, 100.0)]
+    # Speech that never pauses is cut hard at the maximum
+    assert plan_segments(130.0, []) == [(0.0, 60.0), (60.0, 120.0), (120.0, 130.0)]
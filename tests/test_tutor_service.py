@@ -0,0 +1,107 @@
+import asyncio
+
+from app.services.medical_gate import GATE_MEDICAL, GATE_NON_MEDICAL, GATE_UNCERTAIN
+from app.services.query_rewriter import CondensedQuery
+from app.services.rag_pipeline_pinecone import RAGPipelinePinecone
+from app.services.tutor_service import ANONYMOUS_USER, NOT_MEDICAL_MARKER, OFF_TOPIC_ANSWER, MedicalAITutorService
+
+
+def _service(gate: str) -> MedicalAITutorService:
+    service = MedicalAITutorService(RAGPipelinePinecone(index_name="tutor-test"))
+    service.medical_gate.classify = lambda embedding: gate
+    service.medical_gate.learn = lambda embedding, is_medical: None
+    return service
+
+
+def test_answers_and_records_history(fake_openai):
+    service = _service(GATE_MEDICAL)
+    fake_openai.replies = ["The heart pumps blood."]
+    answer, session_id, is_new = service.answer_question("How does the heart pump blood?", user_id="u1")
+    assert answer == "The heart pumps blood." and is_new
+    assert [turn["role"] for turn in service.get_conversation_history(session_id)] == ["user", "assistant"]
+    assert NOT_MEDICAL_MARKER not in fake_openai.chat_calls[-1]["messages"][0]["content"]
+
+
+def test_gate_rejection_skips_generation(fake_openai):
+    service = _service(GATE_NON_MEDICAL)
+    answer, _, _ = service.answer_question("Best pizza in town?", user_id="u1")
+    assert answer == OFF_TOPIC_ANSWER
+    assert not fake_openai.chat_calls
+
+
+def test_uncertain_gate_lets_the_model_decide(fake_openai):
+    service = _service(GATE_UNCERTAIN)
+    fake_openai.replies = [NOT_MEDICAL_MARKER]
+    answer, _, _ = service.answer_question("Tell me a joke", user_id="u1")
+    assert answer == OFF_TOPIC_ANSWER
+    assert NOT_MEDICAL_MARKER in fake_openai.chat_calls[-1]["messages"][0]["content"]
+
+
+def test_condensed_follow_up_also_retrieves_with_the_raw_question(fake_openai):
+    service = _service(GATE_MEDICAL)
+    service.query_condenser.condense = lambda *args, **kwargs: CondensedQuery("asthma treatment", "llm", 1.0)
+    calls = []
+    original = service.rag.retrieve_many
+
+    def retrieve_many(queries, **kwargs):
+        calls.append((queries, kwargs["embeddings"]))
+        return original(queries, **kwargs)
+
+    service.rag.retrieve_many = retrieve_many
+    service.medical_gate.wait_ready(10)
+    embedded_before = sum(len(call) for call in fake_openai.embedding_calls)
+    service.answer_question("What about treatment?", user_id="u1", session_id="s1")
+    (queries, embeddings), = calls
+    assert queries == ["asthma treatment", "What about treatment?"]
+    assert all(embedding is not None for embedding in embeddings)
+    # Both vectors were already made for the gate and the speculative embed
+    assert sum(len(call) for call in fake_openai.embedding_calls) - embedded_before == 2
+
+
+def test_uploaded_material_reaches_the_prompt(fake_openai):
+    service = _service(GATE_MEDICAL)
+    # What /tutor/upload-knowledge stores: shared, with no user or session
+    service.rag.add_document("Surfactant lowers alveolar surface tension.", metadata={"source": "lung.pdf"})
+    service.answer_question("Surfactant lowers alveolar surface tension.", user_id="u3", session_id="s3")
+    assert "Surfactant lowers alveolar surface tension." in fake_openai.chat_calls[-1]["messages"][0]["content"]
+    service.answer_question("Surfactant lowers alveolar surface tension.", user_id=ANONYMOUS_USER)
+    assert "Surfactant lowers alveolar surface tension." in fake_openai.chat_calls[-1]["messages"][0]["content"]
+
+
+def test_idle_and_excess_sessions_are_dropped(fake_openai):
+    service = _service(GATE_MEDICAL)
+    service.session_capacity = 2
+    for session_id in ("s1", "s2", "s3"):
+        service.answer_question("What is gout?", user_id="u1", session_id=session_id)
+    assert not service.get_conversation_history("s1")
+    assert "s1" not in service.turns and "s1" not in service.session_users
+    assert len(service.get_conversation_history("s3")) == 2
+
+    service.session_ttl = 0
+    service.answer_question("What is lupus?", user_id="u1", session_id="s4")
+    assert not service.get_conversation_history("s2") and not service.get_conversation_history("s3")
+    assert len(service.get_conversation_history("s4")) == 2
+
+
+def test_sync_wrapper_works_inside_a_running_loop(fake_openai):
+    service = _service(GATE_MEDICAL)
+
+    async def main():
+        return service.answer_question("What is a stroke?", user_id="u1")
+
+    answer, _, _ = asyncio.run(main())
+    assert answer == "An answer."
+
+
+def test_ask_endpoint_uses_the_service(fake_openai):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.routers.tutor import tutor_service
+
+    tutor_service.medical_gate.classify = lambda embedding: GATE_MEDICAL
+    client = TestClient(app)
+    response = client.post("/tutor/ask", json={"question": "What is asthma?", "user_id": "u2"})
+    assert response.status_code == 200
+    session_id = response.json()["session_id"]
+    history = client.get(f"/tutor/conversation-history/{session_id}").json()
+    assert history["total_count"] == 2
@@ -0,0 +1,19 @@
+from app.services.rag_pipeline_pinecone import RAGPipelinePinecone, SHARED_NAMESPACE, user_namespace
+
+
+def test_migrate_user_namespaces_moves_user_vectors():
+    rag = RAGPipelinePinecone(index_name="migration-test")
+    index = rag._active().index
+    dimension = rag._active().dimension
+    vector = [1.0] + [0.0] * (dimension - 1)
+    index.upsert([
+        ("shared", vector, {"source": "corpus"}),
+        ("upload", vector, {"user_id": "42"}),
+    ], namespace=SHARED_NAMESPACE)
+
+    assert rag.migrate_user_namespaces() == 1
+    assert [id for page in index.list(namespace=SHARED_NAMESPACE) for id in page] == ["shared"]
+    moved = index.fetch(["upload"], namespace=user_namespace("42")).vectors["upload"]
+    assert moved.metadata == {"user_id": "42"}
+    # Rerunning finds nothing left to move
+    assert rag.migrate_user_namespaces() == 0
@@ -0,0 +1,35 @@
+from app.services.metadata_store import MetadataStore
+from app.services.user_profile_cache import UserProfileCache
+
+
+def _store():
+    store = MetadataStore(":memory:")
+    for i, topics in enumerate([["asthma", "copd"], ["asthma"], ["sepsis"]]):
+        store.add_summary(f"s{i}", "u1", f"session{i}", f"summary {i}", topics=topics)
+    return store
+
+
+def test_context_quotes_recent_summaries_and_top_topics():
+    cache = UserProfileCache(_store(), max_summaries=2)
+    line = cache.get("u1").context_line()
+    assert line.count("summary") == 2
+    assert "Topics studied most often: asthma" in line
+    assert cache.get("nobody").context_line() == ""
+
+
+def test_completed_summaries_update_cached_profiles():
+    store = _store()
+    cache = UserProfileCache(store, max_summaries=1)
+    profile = cache.get("u1")
+    cache.record_summary({"user_id": "u1", "text": "newest", "topics": ["sepsis", "sepsis"]})
+    assert cache.get("u1") is profile
+    assert "newest" in profile.context_line()
+    assert profile.topic_counts.most_common(1)[0][0] == "sepsis"
+
+
+def test_least_recently_used_profiles_are_dropped():
+    cache = UserProfileCache(_store(), capacity=2)
+    first = cache.get("a")
+    cache.get("b")
+    cache.get("c")
+    assert cache.get("a") is not first